@@ -1,38 +1,534 @@
-from flask import Flask, jsonify, request, render_template
+"""
+Page publique des membres et son API JSON.
+
+Le fichier SQLite est celui que le bot écrit en continu, donc l'API le ménage :
+
+- une connexion en lecture seule réutilisée par thread ;
+- /api/members est paginé par curseur (ordre username, puuid) et filtrable
+  par guilde, file (solo / flex) et rang ;
+- chaque réponse porte un ETag tiré de la version des données (date de
+  modification et taille du fichier SQLite, qui changent à chaque commit du
+  bot) : un If-None-Match à jour reçoit un 304 sans aucune requête ;
+- les agrégats (comptes par rang, total filtré) sont gardés AGGREGATE_TTL
+  secondes tant que la version des données ne change pas ;
+- /api/export/<jeu de données> diffuse joueurs, historique LP (lignes des
+  recaps) et historique des matchs en NDJSON ou CSV, par blocs de
+  EXPORT_CHUNK_SIZE lignes : mémoire constante quelle que soit la taille ;
+- /api/events pousse en server-sent events les fins de partie et changements
+  de classement publiés par le bot dans la table change_feed. Un seul thread
+  lit cette table (une requête par FEED_POLL_INTERVAL) et distribue les
+  événements à tous les abonnés, quel que soit le nombre d'onglets ouverts.
+"""
+import base64
+import csv
+import io
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import Flask, Response, jsonify, request, render_template
 
-DB_PATH = "database.db"
+from storage import get_db_path
 
 app = Flask(__name__, template_folder='templates')
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Durée de vie (secondes) d'un agrégat en cache
+AGGREGATE_TTL = 30.0
+
+# Lignes lues par requête lors d'un export
+EXPORT_CHUNK_SIZE = 1000
+
+# Flux en direct : intervalle de lecture de change_feed, commentaire envoyé
+# aux clients inactifs, délai de reconnexion conseillé au navigateur (ms),
+# événements gardés pour les reconnexions (Last-Event-ID) et taille de la file
+# d'un abonné (au-delà, l'abonné trop lent est déconnecté)
+FEED_POLL_INTERVAL = 1.0
+FEED_HEARTBEAT = 15.0
+FEED_RETRY_MS = 3000
+FEED_BACKLOG = 200
+FEED_SUBSCRIBER_QUEUE = 100
+FEED_BATCH = 500
+
+# Colonnes (rang, division, LP) de chaque file
+QUEUE_COLUMNS = {
+    "solo": ("rank", "tier", "lp"),
+    "flex": ("flex_rank", "flex_tier", "flex_lp"),
+}
+
+_local = threading.local()
+_cache_lock = threading.Lock()
+# (nom, paramètres) -> (version, expire_à, valeur)
+_aggregate_cache: dict[tuple, tuple[str | None, float, object]] = {}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+@app.errorhandler(BadRequest)
+def bad_request(e):
+    return jsonify({"error": str(e)}), 400
+
+
+def get_conn() -> sqlite3.Connection:
+    """Connexion du thread courant, rouverte si le fichier configuré a changé."""
+    path = get_db_path()
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != path:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON;")
+        _local.conn, _local.path = conn, path
+    return conn
+
+
 def query_db(query, args=()):
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(query, args)
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-    return rows
+    return get_conn().execute(query, args).fetchall()
+
+
+def data_version() -> str | None:
+    """
+    Version des données : compteur de modifications de l'en-tête SQLite
+    (incrémenté à chaque commit), date de modification et taille du fichier et
+    de son éventuel WAL. None si la base n'existe pas encore.
+    """
+    path = get_db_path()
+    try:
+        with open(path, "rb") as f:
+            header = f.read(28)
+    except OSError:
+        return None
+    parts = [header[24:28].hex()]
+    for suffix in ("", "-wal"):
+        try:
+            stat = os.stat(path + suffix)
+        except OSError:
+            continue
+        parts.append(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+    return ".".join(parts)
+
+
+def cached_aggregate(name: str, params: tuple, version: str | None, compute):
+    key = (name, params)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _aggregate_cache.get(key)
+        if entry and version is not None and entry[0] == version and entry[1] > now:
+            return entry[2]
+    value = compute()
+    with _cache_lock:
+        # purge paresseuse des entrées expirées
+        for stale in [k for k, (_, expires, _) in _aggregate_cache.items() if expires <= now]:
+            del _aggregate_cache[stale]
+        _aggregate_cache[key] = (version, now + AGGREGATE_TTL, value)
+    return value
+
+
+def encode_cursor(username: str, puuid: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([username, puuid]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        username, puuid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise BadRequest("invalid cursor")
+    if not isinstance(username, str) or not isinstance(puuid, str):
+        raise BadRequest("invalid cursor")
+    return username, puuid
+
+
+def parse_filters() -> tuple[int | None, str, str | None]:
+    """(guild_id, file, rang) depuis la query string."""
+    guild_id = request.args.get('guild_id')
+    if guild_id is not None:
+        try:
+            guild_id = int(guild_id)
+        except ValueError:
+            raise BadRequest("guild_id must be an integer")
+    queue = request.args.get('queue', 'solo').lower()
+    if queue not in QUEUE_COLUMNS:
+        raise BadRequest(f"queue must be one of {', '.join(QUEUE_COLUMNS)}")
+    return guild_id, queue, request.args.get('rank') or None
+
+
+def parse_limit() -> int:
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest("limit must be an integer")
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+def filter_sql(guild_id: int | None, queue: str, rank: str | None) -> tuple[str, list[str], list]:
+    """Jointure, conditions et paramètres communs aux requêtes filtrées sur ``player p``."""
+    rank_col = QUEUE_COLUMNS[queue][0]
+    joins, conditions, args = "", [], []
+    if guild_id is not None:
+        joins = " JOIN player_guild pg ON pg.player_puuid = p.puuid AND pg.guild_id = ?"
+        args.append(guild_id)
+    if rank == 'Unranked':
+        conditions.append(f"p.{rank_col} IS NULL")
+    elif rank:
+        conditions.append(f"p.{rank_col} = ?")
+        args.append(rank)
+    return joins, conditions, args
+
+
+def where(conditions: list[str]) -> str:
+    return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def not_modified(version: str | None) -> Response | None:
+    if version is not None and request.if_none_match.contains(version):
+        response = Response(status=304)
+        response.set_etag(version)
+        return response
+    return None
+
+
+def versioned(payload, version: str | None) -> Response:
+    response = jsonify(payload)
+    if version is not None:
+        response.set_etag(version)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 
 @app.route('/api/members')
 def api_members():
-    rank = request.args.get('rank')
-    if rank:
-        rows = query_db("SELECT username, rank, tier FROM player WHERE rank = ?", (rank,))
-    else:
-        rows = query_db("SELECT username, rank, tier FROM player")
-    members = [dict(r) for r in rows]
-    return jsonify({"members": members, "count": len(members)})
+    guild_id, queue, rank = parse_filters()
+    limit = parse_limit()
+    cursor = request.args.get('cursor')
+    after = decode_cursor(cursor) if cursor else None
+
+    version = data_version()
+    cached = not_modified(version)
+    if cached:
+        return cached
+
+    rank_col, tier_col, lp_col = QUEUE_COLUMNS[queue]
+    params = (guild_id, queue, rank)
+    joins, conditions, args = filter_sql(*params)
+    page_conditions, page_args = list(conditions), list(args)
+    if after:
+        page_conditions.append("(p.username, p.puuid) > (?, ?)")
+        page_args.extend(after)
+    rows = query_db(
+        f"SELECT p.puuid, p.username, p.{rank_col} AS rank, p.{tier_col} AS tier, p.{lp_col} AS lp"
+        f" FROM player p{joins}{where(page_conditions)}"
+        " ORDER BY p.username, p.puuid LIMIT ?",
+        page_args + [limit + 1],
+    )
+
+    members = [dict(r) for r in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = members[-1]
+        next_cursor = encode_cursor(last['username'], last['puuid'])
+
+    count = cached_aggregate(
+        "members_count", params, version,
+        lambda: query_db(f"SELECT COUNT(*) FROM player p{joins}{where(conditions)}", args)[0][0],
+    )
+    return versioned({"members": members, "count": count, "next_cursor": next_cursor}, version)
+
 
 @app.route('/api/rank_counts')
 def api_rank_counts():
-    rows = query_db("SELECT COALESCE(rank, 'Unranked') as rank, COUNT(*) as count FROM player GROUP BY rank")
-    counts = {r['rank']: r['count'] for r in rows}
-    return jsonify(counts)
+    guild_id, queue, _ = parse_filters()
+    version = data_version()
+    cached = not_modified(version)
+    if cached:
+        return cached
+
+    rank_col = QUEUE_COLUMNS[queue][0]
+    joins, _, args = filter_sql(guild_id, queue, None)
+
+    def compute():
+        rows = query_db(
+            f"SELECT COALESCE(p.{rank_col}, 'Unranked') AS rank, COUNT(*) AS count"
+            f" FROM player p{joins} GROUP BY p.{rank_col}",
+            args,
+        )
+        return {r['rank']: r['count'] for r in rows}
+
+    counts = cached_aggregate("rank_counts", (guild_id, queue), version, compute)
+    return versioned(counts, version)
+
+class Export:
+    """
+    Jeu de données exportable : ``columns`` (nom -> expression SQL) lues
+    depuis ``source``, parcourues dans l'ordre de la clé unique ``key``.
+    ``filters`` associe un paramètre de la query string à sa condition.
+    """
+
+    def __init__(self, columns: dict[str, str], source: str, key: tuple[str, ...],
+                 filters: dict[str, tuple[str, type]]):
+        self.columns = columns
+        self.source = source
+        self.key = key
+        self.filters = filters
+
+    def parse_filters(self) -> tuple[list[str], list]:
+        conditions, args = [], []
+        for name, (condition, cast) in self.filters.items():
+            value = request.args.get(name)
+            if value is None:
+                continue
+            try:
+                args.append(cast(value))
+            except ValueError:
+                raise BadRequest(f"{name} must be of type {cast.__name__}")
+            conditions.append(condition)
+        return conditions, args
+
+    def chunks(self, conditions: list[str], args: list, chunk_size: int):
+        """
+        Blocs de lignes lus par pagination sur la clé : chaque bloc est une
+        requête courte, aucun verrou de lecture n'est gardé entre deux blocs
+        (le bot écrit dans le même fichier pendant un export).
+        """
+        keys = ", ".join(self.key)
+        select = ", ".join([*self.key, *self.columns.values()])
+        after = None
+        while True:
+            chunk_conditions, chunk_args = list(conditions), list(args)
+            if after is not None:
+                chunk_conditions.append(f"({keys}) > ({', '.join('?' * len(after))})")
+                chunk_args.extend(after)
+            rows = query_db(
+                f"SELECT {select} FROM {self.source}{where(chunk_conditions)} ORDER BY {keys} LIMIT ?",
+                chunk_args + [chunk_size],
+            )
+            if not rows:
+                return
+            yield [tuple(row)[len(self.key):] for row in rows]
+            if len(rows) < chunk_size:
+                return
+            after = tuple(rows[-1])[:len(self.key)]
+
+
+GUILD_MEMBER = "EXISTS (SELECT 1 FROM player_guild pg WHERE pg.player_puuid = {} AND pg.guild_id = ?)"
+
+EXPORTS = {
+    "players": Export(
+        {name: f"p.{name}" for name in (
+            "puuid", "username", "region", "rank", "tier", "lp",
+            "flex_rank", "flex_tier", "flex_lp", "lp_24h", "lp_7d",
+        )},
+        "player p",
+        ("p.puuid",),
+        {"guild_id": (GUILD_MEMBER.format("p.puuid"), int)},
+    ),
+    "lp_history": Export(
+        {
+            "snapshot_id": "s.snapshot_id", "guild_id": "s.guild_id", "period": "s.period",
+            "created_at": "s.created_at", "username": "r.username", "rank": "r.rank",
+            "tier": "r.tier", "lp": "r.lp", "lp_24h": "r.lp_24h", "lp_7d": "r.lp_7d",
+            "games": "r.games", "wins": "r.wins",
+        },
+        "recap_snapshot_row r JOIN recap_snapshot s ON s.snapshot_id = r.snapshot_id",
+        ("r.snapshot_id", "r.rowid"),
+        {"guild_id": ("s.guild_id = ?", int), "period": ("s.period = ?", str)},
+    ),
+    "match_history": Export(
+        {name: f"m.{name}" for name in (
+            "player_puuid", "match_id", "queue_id", "win", "champion", "champion_id",
+            "kills", "deaths", "assists", "damage", "duration", "lp_change",
+            "early_surrender", "played_at",
+        )},
+        "match_history m",
+        ("m.player_puuid", "m.match_id"),
+        {"puuid": ("m.player_puuid = ?", str), "guild_id": (GUILD_MEMBER.format("m.player_puuid"), int)},
+    ),
+}
+
+
+def ndjson_lines(columns: list[str], chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+def csv_lines(columns: list[str], chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # aucune ligne : seulement l'en-tête
+        yield buffer.getvalue()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv"),
+}
+
+
+@app.route('/api/export/<dataset>')
+def api_export(dataset):
+    export = EXPORTS.get(dataset)
+    if export is None:
+        return jsonify({"error": f"unknown dataset {dataset}"}), 404
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        raise BadRequest(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    conditions, args = export.parse_filters()
+
+    render, mimetype = EXPORT_FORMATS[fmt]
+    body = render(list(export.columns), export.chunks(conditions, args, EXPORT_CHUNK_SIZE))
+    response = Response(body, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{dataset}.{fmt}"'
+    return response
+
+class ChangeFeed:
+    """
+    Distribution des entrées de change_feed aux abonnés de /api/events.
+
+    Un thread unique, actif seulement tant qu'il y a des abonnés, lit les
+    nouvelles entrées et les dépose dans la file de chaque abonné sous la
+    forme (id, kind, payload JSON, guild_id). Les FEED_BACKLOG dernières sont
+    gardées pour rejouer ce qu'un client a manqué pendant une reconnexion.
+    """
+
+    def __init__(self, poll_interval: float = FEED_POLL_INTERVAL, backlog: int = FEED_BACKLOG):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers: set[queue.Queue] = set()
+        self._recent: deque = deque(maxlen=backlog)
+        self._last_id: int | None = None
+        self._thread: threading.Thread | None = None
+
+    def subscribe(self, last_event_id: int | None = None) -> queue.Queue:
+        events = queue.Queue(maxsize=FEED_SUBSCRIBER_QUEUE)
+        with self._lock:
+            if last_event_id is not None:
+                missed = [event for event in self._recent if event[0] > last_event_id]
+                for event in missed[-FEED_SUBSCRIBER_QUEUE:]:
+                    events.put_nowait(event)
+            self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def is_subscribed(self, events: queue.Queue) -> bool:
+        with self._lock:
+            return events in self._subscribers
+
+    def ensure_running(self) -> None:
+        """Démarre le thread de lecture s'il ne tourne pas."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            # reprise après une période sans abonné : on repart de la fin du flux
+            self._last_id = None
+            self._recent.clear()
+            self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+            self._thread.start()
+
+    def poll_once(self) -> int:
+        """Lit les nouvelles entrées et les distribue ; renvoie leur nombre."""
+        if self._last_id is None:
+            self._last_id = query_db("SELECT COALESCE(MAX(id), 0) FROM change_feed")[0][0]
+            return 0
+        rows = query_db(
+            "SELECT id, kind, payload FROM change_feed WHERE id > ? ORDER BY id LIMIT ?",
+            (self._last_id, FEED_BATCH),
+        )
+        if not rows:
+            return 0
+        events = []
+        for change_id, kind, payload in rows:
+            try:
+                guild_id = json.loads(payload).get("guild_id")
+            except (ValueError, AttributeError):
+                guild_id = None
+            events.append((change_id, kind, payload, guild_id))
+        self._last_id = events[-1][0]
+        with self._lock:
+            self._recent.extend(events)
+            for subscriber in list(self._subscribers):
+                try:
+                    for event in events:
+                        subscriber.put_nowait(event)
+                except queue.Full:
+                    # abonné trop lent : déconnecté, le navigateur se reconnecte
+                    # avec Last-Event-ID et rattrape via _recent
+                    self._subscribers.discard(subscriber)
+        return len(events)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                self.poll_once()
+            except sqlite3.Error as e:
+                app.logger.warning(f"[change_feed] Failed to read change_feed: {e}")
+            time.sleep(self.poll_interval)
+
+
+change_feed = ChangeFeed()
+
+
+def format_event(event_id: int, kind: str, payload: str) -> str:
+    return f"id: {event_id}\nevent: {kind}\ndata: {payload}\n\n"
+
+
+@app.route('/api/events')
+def api_events():
+    guild_id, _, _ = parse_filters()
+    kinds = {kind for kind in request.args.get('kinds', '').split(',') if kind} or None
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+
+    def stream():
+        events = change_feed.subscribe(last_event_id)
+        change_feed.ensure_running()
+        try:
+            yield f"retry: {FEED_RETRY_MS}\n\n"
+            while change_feed.is_subscribed(events):
+                try:
+                    event_id, kind, payload, event_guild = events.get(timeout=FEED_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if kinds is not None and kind not in kinds:
+                    continue
+                if guild_id is not None and event_guild != guild_id:
+                    continue
+                yield format_event(event_id, kind, payload)
+        finally:
+            change_feed.unsubscribe(events)
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # pas de mise en tampon par un proxy nginx
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/')
 def index():
     return render_template('members.html')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,697 @@
+"""
+Commandes slash du bot (inscription, import, paramètres de guilde, rang,
+historique, administration). ``setup_tree`` les ajoute à un CommandTree.
+"""
+import asyncio
+import io
+import logging
+import time
+from pathlib import Path
+
+import discord
+from discord import app_commands
+
+import memory_profile
+import metrics
+from fonction_bdd import (
+    insert_player,
+    get_player_by_username,
+    delete_player,
+    username_autocomplete,
+    get_player,
+    get_guild,
+    get_guild_usernames,
+    insert_guild,
+    import_players,
+    insert_player_guild,
+    get_leaderboard_by_guild,
+    delete_leaderboard_member,
+    count_players,
+    set_guild_flex_mode,
+    set_recap_mode,
+    set_recap_slot,
+    insert_match_history,
+    get_match_history,
+    get_known_match_ids,
+)
+from leaderboard_refresh import leaderboard_refresher
+from riot_api import (
+    PLATFORM_TO_CLUSTER,
+    REGION_MAP,
+    async_fetch_json,
+    async_get_last_match,
+    async_get_match_summary,
+    format_game_duration,
+    get_api_request_counts,
+    get_puuid,
+    get_summoner_rank_details_by_puuid,
+    riot_headers,
+)
+
+# Compte autorisé à utiliser les commandes d'administration (zadmin, zmemory)
+OWNER_ID = 143432756825817088
+
+CAREER_PAGE_SIZE = 10
+
+# Emblèmes de rang envoyés en pièce jointe par /rank, gardés en mémoire après
+# la première lecture (préchargés au démarrage par ``preload_emblems``)
+EMBLEM_DIR = Path(__file__).resolve().parent / "assets"
+TIER_EMBLEMS = {
+    "IRON": "iron.png",
+    "BRONZE": "bronze.png",
+    "SILVER": "silver.png",
+    "GOLD": "gold.png",
+    "PLATINUM": "platinium.png",
+    "EMERALD": "emerald.png",
+    "DIAMOND": "diamond.png",
+    "MASTER": "master.png",
+    "GRANDMASTER": "grandmaster.png",
+    "CHALLENGER": "challenger.png",
+}
+_emblems: dict[str, bytes] = {}
+
+# Import en masse (/import) : joueurs résolus en parallèle, charge Riot
+# (requêtes sur 60 s) au-delà de laquelle chaque appel attend, taille maximale
+# d'un import et intervalle minimal entre deux mises à jour de la progression.
+IMPORT_CONCURRENCY = 5
+IMPORT_MAX_LOAD = 80
+IMPORT_BACKOFF = 5
+IMPORT_MAX_PLAYERS = 200
+IMPORT_PROGRESS_INTERVAL = 2.0
+
+REGION_CHOICES = [
+    app_commands.Choice(name=key.upper(), value=key)
+    for key in REGION_MAP.keys()
+]
+
+@app_commands.command(
+    name="register",
+    description="Register a player in this server and activate alert"
+)
+@app_commands.describe(
+    gamename="The player's Riot in game name",
+    tagline="The player's #",
+    region="Player region"
+)
+@app_commands.choices(region=REGION_CHOICES)
+async def register(
+        interaction: discord.Interaction,
+        gamename: str,
+        tagline: str,
+        region: app_commands.Choice[str],
+):
+    await interaction.response.defer(ephemeral=True)
+    username = f"{gamename.upper()}#{tagline.upper()}"
+    region_key = region.value.lower()
+    mapping = REGION_MAP.get(region_key)
+    if not mapping:
+        return await interaction.followup.send(
+            "Invalid region. Choose from: euw, eune, na, kr, br, jp, lan, las, oce, ru, tr, vn.",
+            ephemeral=True,
+        )
+    platform, cluster = mapping
+    try:
+        riot_username, hashtag = username.split("#")
+    except ValueError:
+        return await interaction.followup.send(
+            "Invalid username format. Use USERNAME#HASHTAG.",
+            ephemeral=True
+        )
+
+    puuid = await asyncio.to_thread(get_puuid, riot_username, hashtag, cluster)
+    if not puuid:
+        return await interaction.followup.send(
+            f"Error fetching PUUID for {username}.", ephemeral=True
+        )
+
+    guild_id = interaction.guild.id
+    channel_id = interaction.channel.id
+
+    if not get_guild(guild_id):
+        insert_guild(guild_id, None, 0)
+
+    if get_player(puuid, guild_id):
+        return await interaction.followup.send(
+            f"Player {username} is already registered here!",
+            ephemeral=True
+        )
+
+    last_ids = await async_get_last_match(puuid, 1, cluster)
+    if not last_ids:
+        return await interaction.followup.send(
+            f"No ranked matches found for {username}.", ephemeral=True
+        )
+    last_match_id = last_ids[0]
+
+    solo_data = await asyncio.to_thread(get_summoner_rank_details_by_puuid, puuid, "RANKED_SOLO_5x5", platform)
+    flex_data = await asyncio.to_thread(get_summoner_rank_details_by_puuid, puuid, "RANKED_FLEX_SR", platform)
+    if not solo_data:
+        return await interaction.followup.send(
+            f"Unable to retrieve rank for {username}.", ephemeral=True
+        )
+
+    rank_str = solo_data["tier"]
+    tier_str = solo_data["rank"]
+    lp = int(solo_data["lp"])
+
+    flex_rank_str = flex_data["tier"] if flex_data else None
+    flex_tier_str = flex_data["rank"] if flex_data else None
+    flex_lp = int(flex_data["lp"]) if flex_data else None
+
+    insert_player(
+        puuid,
+        username,
+        tier_str,
+        rank_str,
+        lp,
+        platform,
+        flex_tier_str,
+        flex_rank_str,
+        flex_lp,
+    )
+
+    insert_player_guild(
+        puuid,
+        guild_id,
+        channel_id,
+        last_match_id
+    )
+
+    total = count_players()
+    user = interaction.user
+    logging.info(
+        f"[REGISTER] {username} --> User: {user} ({user.id}) --> Channel ID: {channel_id} --> Registered: {total}"
+    )
+
+
+    await interaction.followup.send(
+        f"> Player **{username}** registered in this server! ✅\n"
+        f"> Rank: **{rank_str} {tier_str}** — {lp} LP\n"
+        f"> Alerts will be sent in <#{channel_id}>",
+        ephemeral=True
+    )
+    return None
+
+
+def parse_riot_ids(text: str) -> tuple[list[str], list[str]]:
+    """
+    Découpe une liste de Riot IDs (une par ligne, ou séparées par des virgules
+    / points-virgules) en usernames normalisés ``NOM#TAG`` sans doublons, et
+    renvoie aussi les entrées invalides.
+    """
+    usernames, invalid = [], []
+    for entry in text.replace(";", "\n").replace(",", "\n").splitlines():
+        entry = entry.strip()
+        if not entry:
+            continue
+        gamename, sep, tagline = entry.rpartition("#")
+        if not sep or not gamename.strip() or not tagline.strip():
+            invalid.append(entry)
+            continue
+        username = f"{gamename.strip().upper()}#{tagline.strip().upper()}"
+        if username not in usernames:
+            usernames.append(username)
+    return usernames, invalid
+
+
+async def _import_fetch_json(url: str):
+    """async_fetch_json qui cède la place tant que la charge Riot dépasse IMPORT_MAX_LOAD."""
+    while get_api_request_counts()[1] >= IMPORT_MAX_LOAD:
+        await asyncio.sleep(IMPORT_BACKOFF)
+    return await async_fetch_json(url, headers=riot_headers())
+
+
+async def resolve_import_player(username: str, platform: str, cluster: str,
+                                registered: set[str]) -> tuple[dict | None, str | None]:
+    """
+    Résout un Riot ID pour /import : compte, puis dernier match classé et rangs
+    (une seule requête league-v4 pour solo et flex) en parallèle.
+    Renvoie ``(joueur, None)`` ou ``(None, raison)``.
+    """
+    gamename, tagline = username.rsplit("#", 1)
+    account = await _import_fetch_json(
+        f"https://{cluster}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{gamename}/{tagline}"
+    )
+    puuid = account.get("puuid") if account else None
+    if not puuid:
+        return None, "not found"
+    if puuid in registered:
+        return None, "already registered"
+
+    last_ids, entries = await asyncio.gather(
+        _import_fetch_json(
+            f"https://{cluster}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
+            f"?type=ranked&start=0&count=1"
+        ),
+        _import_fetch_json(
+            f"https://{platform}.api.riotgames.com/lol/league/v4/entries/by-puuid/{puuid}"
+        ),
+    )
+    if not isinstance(last_ids, list) or not last_ids:
+        return None, "no ranked matches"
+    queues = {e.get("queueType"): e for e in entries} if isinstance(entries, list) else {}
+    solo = queues.get("RANKED_SOLO_5x5")
+    flex = queues.get("RANKED_FLEX_SR")
+    if not solo:
+        return None, "unranked"
+
+    return {
+        "puuid": puuid,
+        "username": username,
+        "tier": solo.get("rank"),
+        "rank": solo.get("tier"),
+        "lp": int(solo.get("leaguePoints") or 0),
+        "region": platform,
+        "flex_tier": flex.get("rank") if flex else None,
+        "flex_rank": flex.get("tier") if flex else None,
+        "flex_lp": int(flex.get("leaguePoints") or 0) if flex else None,
+        "last_match_id": last_ids[0],
+    }, None
+
+
+@app_commands.command(
+    name="import",
+    description="Register several players at once in this server"
+)
+@app_commands.describe(
+    region="Region of the players",
+    players="Riot IDs (NAME#TAG) separated by commas or new lines",
+    file="Text file with one Riot ID per line"
+)
+@app_commands.choices(region=REGION_CHOICES)
+async def import_cmd(
+        interaction: discord.Interaction,
+        region: app_commands.Choice[str],
+        players: str | None = None,
+        file: discord.Attachment | None = None,
+):
+    await interaction.response.defer(ephemeral=True)
+    mapping = REGION_MAP.get(region.value.lower())
+    if not mapping:
+        return await interaction.followup.send("Invalid region.", ephemeral=True)
+    platform, cluster = mapping
+
+    text = players or ""
+    if file is not None:
+        text += "\n" + (await file.read()).decode("utf-8", errors="ignore")
+    usernames, invalid = parse_riot_ids(text)
+    if not usernames:
+        return await interaction.followup.send(
+            "No valid Riot ID found. Use NAME#TAG, one per line or separated by commas.",
+            ephemeral=True,
+        )
+    if len(usernames) > IMPORT_MAX_PLAYERS:
+        return await interaction.followup.send(
+            f"Too many players ({len(usernames)}), the limit is {IMPORT_MAX_PLAYERS}.",
+            ephemeral=True,
+        )
+
+    guild_id = interaction.guild.id
+    channel_id = interaction.channel.id
+    registered = {puuid for puuid, _ in await asyncio.to_thread(get_guild_usernames, guild_id)}
+
+    total = len(usernames)
+    progress = await interaction.followup.send(
+        f"Importing {total} players… 0/{total}", ephemeral=True, wait=True
+    )
+    semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
+
+    async def resolve(username: str):
+        async with semaphore:
+            return username, await resolve_import_player(username, platform, cluster, registered)
+
+    resolved, failed = [], [(entry, "invalid format") for entry in invalid]
+    last_edit = time.monotonic()
+    for done, future in enumerate(asyncio.as_completed([resolve(u) for u in usernames]), start=1):
+        username, (player, reason) = await future
+        if player:
+            resolved.append(player)
+        else:
+            failed.append((username, reason))
+        if done < total and time.monotonic() - last_edit >= IMPORT_PROGRESS_INTERVAL:
+            last_edit = time.monotonic()
+            await progress.edit(content=f"Importing {total} players… {done}/{total}")
+
+    # les joueurs importés ne sont pas ajoutés au leaderboard : rien à rafraîchir
+    added = await asyncio.to_thread(import_players, guild_id, channel_id, resolved) if resolved else []
+
+    user = interaction.user
+    logging.info(
+        f"[IMPORT] {len(added)}/{total} players --> User: {user} ({user.id}) --> Channel ID: {channel_id}"
+    )
+
+    lines = [f"> **{len(added)}** players registered in this server! ✅"]
+    if added:
+        lines.append(f"> Alerts will be sent in <#{channel_id}>")
+    if failed:
+        lines.append(f"> **{len(failed)}** skipped:")
+        lines += [f"> - {username}: {reason}" for username, reason in failed[:20]]
+        if len(failed) > 20:
+            lines.append(f"> …and {len(failed) - 20} more")
+    await progress.edit(content="\n".join(lines))
+    return None
+
+
+@app_commands.command(
+    name="unregister",
+    description="Unregister a player from this server (alerts + leaderboard)"
+)
+@app_commands.autocomplete(username=username_autocomplete)
+async def unregister(interaction: discord.Interaction, username: str):
+    guild_id = interaction.guild.id
+    username = username.upper()
+
+    player = get_player_by_username(username, guild_id)
+    if not player:
+        return await interaction.response.send_message(
+            f"❌ {username} is not registered on this server.",
+            ephemeral=True
+        )
+    puuid = player[0]
+
+    delete_player(puuid, guild_id)
+
+    lb_id = get_leaderboard_by_guild(guild_id)
+    if lb_id is not None:
+        delete_leaderboard_member(lb_id, puuid)
+
+        leaderboard_refresher.mark_dirty(guild_id)
+
+    await interaction.response.send_message(
+        f"✅ Player **{username}** unregistered " +
+        ("and removed from the leaderboard." if lb_id is not None else "."),
+        ephemeral=True
+    )
+    return None
+
+
+@app_commands.command(name="flex", description="Enable or disable Flex queue alerts")
+@app_commands.describe(mode="Choose 'enable' to track Flex queue games or 'disable' to monitor Solo queue")
+@app_commands.choices(mode=[
+    app_commands.Choice(name="enable", value="enable"),
+    app_commands.Choice(name="disable", value="disable"),
+])
+async def flex(interaction: discord.Interaction, mode: str):
+    guild_id = interaction.guild.id
+    row = get_guild(guild_id)
+
+    enable = mode.lower() == "enable"
+
+    if row is None:
+        insert_guild(guild_id, None, 1 if enable else 0)
+    else:
+        set_guild_flex_mode(guild_id, enable)
+
+    await interaction.response.send_message(
+        f"Flex mode {'enabled' if enable else 'disabled'}.",
+        ephemeral=True
+    )
+    return None
+
+@app_commands.command(name="recap", description="Enable or disable daily/weekly recaps")
+@app_commands.choices(period=[
+    app_commands.Choice(name="daily", value="daily"),
+    app_commands.Choice(name="weekly", value="weekly"),
+])
+@app_commands.choices(mode=[
+    app_commands.Choice(name="enable", value="enable"),
+    app_commands.Choice(name="disable", value="disable"),
+])
+@app_commands.describe(period="Choose daily or weekly recap", mode="Enable or disable the recap")
+async def recap(interaction: discord.Interaction, period: str, mode: str):
+    enable = mode.lower() == "enable"
+    set_recap_mode(interaction.guild.id, period, enable)
+    await interaction.response.send_message(
+        f"{period.capitalize()} recap {'enabled' if enable else 'disabled'}.",
+        ephemeral=True,
+    )
+    return None
+
+
+@app_commands.command(name="recapslot", description="Choose when this server's recaps are posted")
+@app_commands.describe(
+    minutes="Minutes after the midnight reset (leave empty for an automatic slot)"
+)
+async def recapslot(interaction: discord.Interaction,
+                    minutes: app_commands.Range[int, 0, 120] | None = None):
+    set_recap_slot(interaction.guild.id, minutes)
+    await interaction.response.send_message(
+        "Recap slot set to automatic." if minutes is None
+        else f"Recaps will be posted {minutes} min after the midnight reset.",
+        ephemeral=True,
+    )
+    return None
+
+
+@app_commands.command(name="help", description="Get a link to the help server")
+async def help_cmd(interaction: discord.Interaction):
+    await interaction.response.send_message(
+        "Need help? Join our support server: https://discord.gg/vZHPkBHmkC",
+        ephemeral=True,
+    )
+    return None
+
+
+@app_commands.command(name="howtosetup", description="Learn how to configure the bot")
+async def howtosetup_cmd(interaction: discord.Interaction):
+    await interaction.response.send_message(
+        (
+            "To set up the bot: \n"
+            "- /register --> adds players\n"
+            "- /leaderboard --> creates a leaderboard channel\n"
+            "- /recap daily|weekly enable --> enables recap messages\n"
+            "For more help join : https://discord.gg/vZHPkBHmkC"
+        ),
+        ephemeral=True,
+    )
+    return None
+
+
+def get_emblem(tier: str) -> tuple[str, bytes] | None:
+    """(nom de fichier, contenu) de l'emblème du tier, ou None s'il est absent."""
+    emblem_file = TIER_EMBLEMS.get(tier.upper())
+    if not emblem_file:
+        return None
+    data = _emblems.get(emblem_file)
+    if data is None:
+        try:
+            data = (EMBLEM_DIR / emblem_file).read_bytes()
+        except OSError:
+            return None
+        _emblems[emblem_file] = data
+    return emblem_file, data
+
+
+def preload_emblems() -> int:
+    """Charge en mémoire tous les emblèmes disponibles ; renvoie leur nombre."""
+    return sum(1 for tier in TIER_EMBLEMS if get_emblem(tier))
+
+
+@app_commands.command(name="rank", description="Display a player's current Solo/Duo rank")
+@app_commands.autocomplete(username=username_autocomplete)
+async def rank(interaction: discord.Interaction, username: str):
+    """Show current rank for a registered player."""
+    guild_id = interaction.guild.id
+    username = username.upper()
+    await interaction.response.defer()
+
+    player = get_player_by_username(username, guild_id)
+    if not player:
+        await interaction.followup.send("This player is not registered here.", ephemeral=True)
+        return
+
+    puuid = player[0]
+    region = player[4]
+    data = await asyncio.to_thread(get_summoner_rank_details_by_puuid, puuid, "RANKED_SOLO_5x5", region)
+    if not data:
+        await interaction.followup.send("Unable to retrieve rank data.", ephemeral=True)
+        return
+
+    wins = data['wins']
+    losses = data['losses']
+    total = wins + losses
+    winrate = (wins / total) * 100 if total > 0 else 0.0
+
+    tier = data['tier']
+    division = data['rank']
+    lp = data['lp']
+    emblem = get_emblem(tier)
+    if emblem:
+        emblem_file, _ = emblem
+        thumbnail_url = f"attachment://{emblem_file}"
+    else:
+        thumbnail_url = (
+            "https://raw.githubusercontent.com/RiotAPI/"
+            "Riot-Games-API-Developer-Assets/master/emblems/"
+            f"{tier.capitalize()}.png"
+        )
+
+    embed = discord.Embed(
+        title=f"{username} rank:",
+        description=f"{tier} {division} — {lp} LP",
+        color=discord.Color.blue(),
+    )
+    embed.add_field(name="Wins", value=str(wins), inline=True)
+    embed.add_field(name="Losses", value=str(losses), inline=True)
+    embed.add_field(name="Winrate", value=f"{winrate:.1f}%", inline=True)
+    embed.set_thumbnail(url=thumbnail_url)
+
+    if emblem:
+        emblem_file, data = emblem
+        await interaction.followup.send(embed=embed, file=discord.File(io.BytesIO(data), filename=emblem_file))
+    else:
+        await interaction.followup.send(embed=embed)
+
+
+async def backfill_match_history(puuid: str, cluster: str, count: int) -> None:
+    """
+    Complète l'historique local avec les ``count`` derniers matchs classés du
+    joueur : seuls les matchs absents de match_history sont demandés à Riot.
+    """
+    match_ids = await async_get_last_match(puuid, count, cluster)
+    if not match_ids:
+        return
+    known = get_known_match_ids(puuid, match_ids)
+    summaries = []
+    for match_id in match_ids:
+        metrics.record_cache("match_history", match_id in known)
+        if match_id in known:
+            continue
+        summary = await async_get_match_summary(match_id, puuid, cluster)
+        if summary:
+            summaries.append(summary)
+    insert_match_history(puuid, summaries)
+
+
+@app_commands.command(name="career", description="Display a player's ranked games, 10 per page")
+@app_commands.describe(page="Page of history to display (1 = last 10 games)")
+@app_commands.autocomplete(username=username_autocomplete)
+async def career(interaction: discord.Interaction, username: str,
+                 page: app_commands.Range[int, 1, 10] = 1):
+    """
+    Show ranked games of a registered player, 10 per page.
+
+    Games come from the local match_history table. The ranked match ids up
+    to the requested page are listed from Riot (one request) and only the
+    missing matches, including gaps left while the bot was down, are fetched.
+    """
+    guild_id = interaction.guild.id
+    username = username.upper()
+    await interaction.response.defer()
+    player = get_player_by_username(username, guild_id)
+    if not player:
+        await interaction.followup.send("This player is not registered!", ephemeral=True)
+        return
+    puuid = player[0]
+    region = player[4]
+    cluster = PLATFORM_TO_CLUSTER.get(region, "europe")
+
+    offset = (page - 1) * CAREER_PAGE_SIZE
+    await backfill_match_history(puuid, cluster, offset + CAREER_PAGE_SIZE)
+    matches = get_match_history(puuid, CAREER_PAGE_SIZE, offset)
+
+    if not matches:
+        await interaction.followup.send("No ranked games found for this page.", ephemeral=True)
+        return
+
+    rank_cat, division, lp = player[7], player[6], player[8]
+    rank_info = f"{rank_cat} {division} {lp} LP" if rank_cat else "Unranked"
+    title = (
+        f"Last {CAREER_PAGE_SIZE} Ranked Matches for {username}" if page == 1
+        else f"Ranked Matches {offset + 1}-{offset + len(matches)} for {username}"
+    )
+    embed = discord.Embed(
+        title=title,
+        description=f"Rank: {rank_info}",
+        color=discord.Color.blue()
+    )
+    for i, match in enumerate(matches):
+        result_icon = ":green_circle:" if match["win"] else ":red_circle:"
+        value = (f"**Champion:** {match['champion']}\n"
+                 f"**K/D/A:** {match['kills']}/{match['deaths']}/{match['assists']}\n"
+                 f"**Damage:** {match['damage']}\n"
+                 f"**Duration:** {format_game_duration(match['duration'] or 0)}\n")
+        if match["lp_change"] is not None:
+            value += f"**LP:** {'+' if match['lp_change'] > 0 else ''}{match['lp_change']}\n"
+        embed.add_field(name=f"Result: {result_icon}", value=value)
+        if (i + 1) % 2 == 0:
+            embed.add_field(name='\u200b', value='\u200b', inline=True)
+    embed.set_footer(text=f"Page {page}")
+    await interaction.followup.send(embed=embed)
+
+
+@app_commands.command(name="zadmin", description="Stats des requêtes API (toutes les 10s, fenêtre 1 minute)")
+async def zadmin(interaction: discord.Interaction):
+    """Commande admin réservée à l'ID spécifié. Met à jour toutes les 10s
+    le nombre de requêtes API effectuées et le total glissant sur 1 minute.
+    Durée d'observation: 60s (6 ticks)."""
+    if interaction.user.id != OWNER_ID:
+        await interaction.response.send_message("Vous n'avez pas l'autorisation d'utiliser cette commande.", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+
+    # Initial display
+    last10, last60 = get_api_request_counts()
+    content = (
+        "ZAdmin • Monitoring des requêtes API\n"
+        f"• Sur 10s: {last10}\n"
+        f"• Sur 60s: {last60}\n"
+        "(Actualisation toutes les 10s, arrêt après 1 minute)"
+    )
+    await interaction.edit_original_response(content=content)
+
+    # Update every 10s for 1 minute
+    for _ in range(6):
+        await asyncio.sleep(10)
+        last10, last60 = get_api_request_counts()
+        content = (
+            "ZAdmin • Monitoring des requêtes API\n"
+            f"• Sur 10s: {last10}\n"
+            f"• Sur 60s: {last60}\n"
+            "(Actualisation toutes les 10s, arrêt après 1 minute)"
+        )
+        try:
+            await interaction.edit_original_response(content=content)
+        except discord.DiscordException:
+            break
+
+
+@app_commands.command(name="zmemory", description="Profil mémoire : allocations entre deux instantanés")
+@app_commands.describe(
+    seconds="Intervalle entre les deux instantanés",
+    top="Nombre de lignes à afficher"
+)
+async def zmemory(interaction: discord.Interaction,
+                  seconds: app_commands.Range[int, 5, 600] = 60,
+                  top: app_commands.Range[int, 1, 25] = 10):
+    """Commande admin : active tracemalloc le temps de la mesure, puis
+    affiche les plus fortes variations d'allocation par fichier/ligne."""
+    if interaction.user.id != OWNER_ID:
+        await interaction.response.send_message("Vous n'avez pas l'autorisation d'utiliser cette commande.", ephemeral=True)
+        return
+    if memory_profile.is_profiling():
+        await interaction.response.send_message("Un profilage est déjà en cours.", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True)
+    await interaction.edit_original_response(
+        content=f"ZMemory • Traçage actif, second instantané dans {seconds}s…"
+    )
+    stats = await memory_profile.profile_allocations(seconds, top)
+
+    header = f"ZMemory • Top {len(stats)} des variations sur {seconds}s\n"
+    lines = [memory_profile.format_stat(stat) for stat in stats] or ["Aucune variation."]
+    body = ""
+    for line in lines:
+        line = line[-300:]  # chemins longs : garder la fin
+        if len(header) + len(body) + len(line) + 8 > 2000:
+            break
+        body += line + "\n"
+    await interaction.edit_original_response(content=f"{header}```\n{body}```")
+
+
+def setup_tree(tree_obj: app_commands.CommandTree):
+    for command in (register, import_cmd, unregister, flex, recap, recapslot,
+                    help_cmd, howtosetup_cmd, rank, career, zadmin, zmemory):
+        tree_obj.add_command(command)
@@ -0,0 +1,18 @@
+"""Lecture des réglages numériques passés par variables d'environnement."""
+import logging
+import os
+
+
+def env_number(name: str, default, cast=float):
+    """
+    Nombre positif ou nul lu dans la variable ``name`` (converti par ``cast``) ;
+    ``default`` si elle est absente ou invalide.
+    """
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return default
+    try:
+        return max(cast(raw), 0)
+    except ValueError:
+        logging.warning(f"[config] Invalid {name}={raw!r}, using {default}")
+        return default
@@ -1,11 +1,23 @@
 import logging
 import sqlite3
 
-DB_PATH = "Backend/database.db"
+import storage
+from rank_math import ladder_score
 
-def create_db():
+def _add_missing_column(c, table: str, column: str, definition: str) -> bool:
+    """Ajoute une colonne à une table existante si elle est absente."""
+    c.execute(f"PRAGMA table_info({table})")
+    if column in {row[1] for row in c.fetchall()}:
+        return False
+    c.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return True
+
+
+def create_db(db_path: str | None = None):
+    """Crée ou migre le schéma SQLite (par défaut sur le fichier configuré)."""
     logging.info("Starting DB creation...")
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path or storage.get_db_path())
+    conn.create_function("ladder_score", 3, ladder_score, deterministic=True)
     c = conn.cursor()
     c.execute("PRAGMA foreign_keys = ON;")
 
@@ -15,9 +27,12 @@ def create_db():
             leaderboard_channel_id INTEGER,
             flex_enabled INTEGER DEFAULT 0,
             daily_recap_enabled INTEGER DEFAULT 0,
-            weekly_recap_enabled INTEGER DEFAULT 0
+            weekly_recap_enabled INTEGER DEFAULT 0,
+            recap_slot INTEGER
         );
         """)
+    # Minutes après minuit pour les recaps de la guilde (NULL : réparti automatiquement)
+    _add_missing_column(c, "guild", "recap_slot", "INTEGER")
 
     c.execute("""
         CREATE TABLE IF NOT EXISTS player (
@@ -32,11 +47,25 @@ def create_db():
             flex_lp INTEGER,
             lp_24h INTEGER,
             lp_7d INTEGER,
+            score INTEGER,
+            flex_score INTEGER,
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
         );
         """)
 
+    # Score absolu sur l'échelle classée (solo / flex), voir rank_math
+    added_score = _add_missing_column(c, "player", "score", "INTEGER")
+    added_flex_score = _add_missing_column(c, "player", "flex_score", "INTEGER")
+    if added_score or added_flex_score:
+        c.execute("""
+            UPDATE player
+            SET score      = ladder_score(rank, tier, lp),
+                flex_score = ladder_score(flex_rank, flex_tier, flex_lp)
+            """)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_player_score ON player (score DESC);")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_player_flex_score ON player (flex_score DESC);")
+
     c.execute("""
         CREATE TABLE IF NOT EXISTS player_guild (
             player_puuid TEXT    NOT NULL,
@@ -57,6 +86,28 @@ def create_db():
             );
         """)
 
+    # Un message Discord par page du leaderboard, avec l'empreinte du contenu publié
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS leaderboard_page (
+            leaderboard_id INTEGER NOT NULL,
+            page           INTEGER NOT NULL,
+            message_id     INTEGER NOT NULL,
+            content_hash   TEXT,
+            PRIMARY KEY (leaderboard_id, page),
+            FOREIGN KEY (leaderboard_id) REFERENCES leaderboard(leaderboard_id)
+            );
+        """)
+    # Anciennes colonnes leaderboard.message_id / content_hash : deviennent la page 0
+    c.execute("PRAGMA table_info(leaderboard)")
+    if "message_id" in {row[1] for row in c.fetchall()}:
+        c.execute("""
+            INSERT OR IGNORE INTO leaderboard_page (leaderboard_id, page, message_id, content_hash)
+            SELECT leaderboard_id, 0, message_id, content_hash
+            FROM leaderboard
+            WHERE message_id IS NOT NULL
+            """)
+        c.execute("UPDATE leaderboard SET message_id = NULL, content_hash = NULL")
+
     c.execute("""
         CREATE TABLE IF NOT EXISTS leaderboard_player (
             leaderboard_id INTEGER NOT NULL,
@@ -67,6 +118,89 @@ def create_db():
             );
         """)
 
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS recap_snapshot (
+            snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id    INTEGER NOT NULL,
+            period      TEXT    NOT NULL,
+            created_at  DATETIME DEFAULT CURRENT_TIMESTAMP,
+            sent_at     DATETIME,
+            FOREIGN KEY (guild_id) REFERENCES guild(guild_id)
+            );
+        """)
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS recap_snapshot_row (
+            snapshot_id INTEGER NOT NULL,
+            username    TEXT    NOT NULL,
+            tier        TEXT,
+            rank        TEXT,
+            lp          INTEGER,
+            lp_24h      INTEGER,
+            lp_7d       INTEGER,
+            games       INTEGER DEFAULT 0,
+            wins        INTEGER DEFAULT 0,
+            FOREIGN KEY (snapshot_id) REFERENCES recap_snapshot(snapshot_id)
+            );
+        """)
+    _add_missing_column(c, "recap_snapshot_row", "games", "INTEGER DEFAULT 0")
+    _add_missing_column(c, "recap_snapshot_row", "wins", "INTEGER DEFAULT 0")
+
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS match_history (
+            match_id        TEXT    NOT NULL,
+            player_puuid    TEXT    NOT NULL,
+            queue_id        INTEGER,
+            win             INTEGER,
+            champion        TEXT,
+            champion_id     INTEGER,
+            kills           INTEGER,
+            deaths          INTEGER,
+            assists         INTEGER,
+            damage          INTEGER,
+            duration        INTEGER,
+            lp_change       INTEGER,
+            early_surrender INTEGER DEFAULT 0,
+            played_at       INTEGER,
+            PRIMARY KEY (match_id, player_puuid),
+            FOREIGN KEY (player_puuid) REFERENCES player(puuid)
+            );
+        """)
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_match_history_player
+            ON match_history (player_puuid, played_at DESC);
+        """)
+
+    # Dernière exécution des tâches planifiées (scheduler.py), en secondes Unix
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS scheduled_job (
+            name        TEXT PRIMARY KEY,
+            last_run_at REAL NOT NULL
+            );
+        """)
+
+    # État persistant du bot (empreinte des commandes synchronisées...)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key   TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+            );
+        """)
+
+    # Flux des changements (fins de partie, classements) diffusé en direct par
+    # l'API web (app.py, /api/events) ; seules les dernières entrées sont gardées
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS change_feed (
+            id         INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind       TEXT NOT NULL,
+            payload    TEXT NOT NULL,
+            created_at REAL NOT NULL
+            );
+        """)
+
+    # Pagination par curseur de l'API web (app.py) : ordre (username, puuid)
+    c.execute("CREATE INDEX IF NOT EXISTS idx_player_username ON player (username, puuid);")
+
     conn.commit()
     conn.close()
     logging.info("Database created!")
@@ -1,55 +1,46 @@
-import sqlite3
-from discord import app_commands, Interaction
+"""
+Opérations de persistance du bot.
+
+Chaque fonction délègue au backend courant (``storage.get_storage()``,
+SQLite sur disque ou mémoire selon la configuration) et tient à jour les
+index en mémoire qui en dépendent (``username_index``).
+"""
+import json
+import time
 
-DB_PATH = "Backend/database.db"
+from discord import app_commands, Interaction
 
-def get_connection():
-    """Retourne une connexion SQLite avec les FK activées."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+from storage import get_storage
+from username_index import username_index
 
 
 # ----- Guild queries -----
 
 def get_all_guild_ids() -> list[int]:
     """Return list of guild IDs."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT guild_id FROM guild")
-    rows = c.fetchall()
-    conn.close()
-    return [row[0] for row in rows]
+    return get_storage().get_all_guild_ids()
 
 
 # ----- Recap settings per guild -----
 
 def is_recap_enabled(guild_id: int, period: str) -> bool:
     """Check if daily or weekly recap is enabled for a guild."""
-    column = "daily_recap_enabled" if period == "daily" else "weekly_recap_enabled"
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(f"SELECT {column} FROM guild WHERE guild_id = ?", (guild_id,))
-    row = c.fetchone()
-    conn.close()
-    return bool(row and row[0])
+    return get_storage().is_recap_enabled(guild_id, period)
 
 
 def set_recap_mode(guild_id: int, period: str, enabled: bool) -> None:
     """Enable or disable daily or weekly recaps for a guild."""
-    column = "daily_recap_enabled" if period == "daily" else "weekly_recap_enabled"
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        f"""
-        INSERT INTO guild(guild_id, {column})
-        VALUES(?, ?)
-        ON CONFLICT(guild_id) DO UPDATE SET {column}=excluded.{column}
-        """,
-        (guild_id, 1 if enabled else 0),
-    )
-    conn.commit()
-    conn.close()
+    get_storage().set_recap_mode(guild_id, period, enabled)
+
+
+def get_recap_slot(guild_id: int) -> int | None:
+    """Minutes après minuit choisies pour les recaps de la guilde (None : automatique)."""
+    return get_storage().get_recap_slot(guild_id)
+
+
+def set_recap_slot(guild_id: int, minutes: int | None) -> None:
+    """Fixe (ou remet en automatique avec None) le créneau des recaps d'une guilde."""
+    get_storage().set_recap_slot(guild_id, minutes)
 
 
 def insert_player(puuid: str,
@@ -64,35 +55,8 @@ def insert_player(puuid: str,
     """
     Insert or update des données globales du joueur.
     """
-    conn = get_connection()
-    c = conn.cursor()
-    # Insert initial si absent
-    c.execute(
-        """
-        INSERT OR IGNORE INTO player
-          (puuid, username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp, lp_24h, lp_7d, created_at, updated_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-        """,
-        (puuid, username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp),
-    )
-    c.execute(
-        """
-        UPDATE player
-        SET username = ?,
-            tier = ?,
-            rank = ?,
-            lp = ?,
-            region = ?,
-            flex_tier = ?,
-            flex_rank = ?,
-            flex_lp = ?,
-            updated_at = CURRENT_TIMESTAMP
-        WHERE puuid = ?
-        """,
-        (username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp, puuid),
-    )
-    conn.commit()
-    conn.close()
+    get_storage().insert_player(puuid, username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp)
+    username_index.rename(puuid, username)
 
 def update_player_global(puuid: str,
                          tier: str = None,
@@ -111,56 +75,36 @@ def update_player_global(puuid: str,
     - Sinon, lp_24h et lp_7d ne sont pas modifiés (on ne les écrase pas).
     - Les autres champs (tier, rank, lp, username) sont mis à jour uniquement s'ils sont non-None.
     """
-    updates = []
-    params = []
-
+    get_storage().update_player_global(
+        puuid, tier=tier, rank=rank, lp=lp, lp_change=lp_change, username=username,
+        region=region, flex_tier=flex_tier, flex_rank=flex_rank, flex_lp=flex_lp,
+    )
     if username is not None:
-        updates.append("username = ?")
-        params.append(username)
-    if tier is not None:
-        updates.append("tier = ?")
-        params.append(tier)
-    if rank is not None:
-        updates.append("rank = ?")
-        params.append(rank)
-    if lp is not None:
-        updates.append("lp = ?")
-        params.append(lp)
-    if region is not None:
-        updates.append("region = ?")
-        params.append(region)
-    if flex_tier is not None:
-        updates.append("flex_tier = ?")
-        params.append(flex_tier)
-    if flex_rank is not None:
-        updates.append("flex_rank = ?")
-        params.append(flex_rank)
-    if flex_lp is not None:
-        updates.append("flex_lp = ?")
-        params.append(flex_lp)
-
-    # Cas de cumul : si lp_change fourni, on fait « lp_24h = lp_24h + lp_change » et même pour lp_7d
-    if lp_change is not None:
-        updates.append("lp_24h = COALESCE(lp_24h, 0) + ?")
-        params.append(lp_change)
-        updates.append("lp_7d  = COALESCE(lp_7d, 0)  + ?")
-        params.append(lp_change)
-
-    if not updates:
-        # Rien à mettre à jour → on sort
-        return
-
-    # Ajout de l’horodatage de mise à jour
-    updates.append("updated_at = CURRENT_TIMESTAMP")
-
-    query = f"UPDATE player SET {', '.join(updates)} WHERE puuid = ?"
-    params.append(puuid)
-
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(query, tuple(params))
-    conn.commit()
-    conn.close()
+        username_index.rename(puuid, username)
+
+def import_players(guild_id: int, channel_id: int, players: list[dict]) -> list[str]:
+    """
+    Inscrit plusieurs joueurs dans une guilde en une seule transaction.
+
+    Chaque dict contient puuid, username, tier, rank, lp, region et
+    optionnellement flex_tier, flex_rank, flex_lp, last_match_id. Les données
+    globales des joueurs sont mises à jour ; un joueur déjà inscrit dans la
+    guilde garde son inscription. Renvoie les puuids nouvellement inscrits.
+    """
+    added = get_storage().import_players(guild_id, channel_id, players)
+    for p in players:
+        username_index.rename(p["puuid"], p["username"])
+    if username_index.is_loaded(guild_id):
+        usernames = {p["puuid"]: p["username"] for p in players}
+        for puuid in added:
+            username_index.add(guild_id, puuid, usernames[puuid])
+    return added
+
+def rename_players(renames: list[tuple[str, str]]):
+    """Applique une liste de (puuid, nouveau username) en une seule transaction."""
+    get_storage().rename_players(renames)
+    for puuid, username in renames:
+        username_index.rename(puuid, username)
 
 # ----- Opérations sur la table player_guild (liaisons serveur) -----
 
@@ -171,15 +115,12 @@ def insert_player_guild(puuid: str,
     """
     Associe un joueur à une guilde et au salon d'alerte, avec son dernier match.
     """
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("""
-        INSERT OR REPLACE INTO player_guild
-          (player_puuid, guild_id, channel_id, last_match_id)
-        VALUES (?, ?, ?, ?)
-    """, (puuid, guild_id, channel_id, last_match_id))
-    conn.commit()
-    conn.close()
+    storage = get_storage()
+    storage.insert_player_guild(puuid, guild_id, channel_id, last_match_id)
+    if username_index.is_loaded(guild_id):
+        row = storage.get_player(puuid, guild_id)
+        if row:
+            username_index.add(guild_id, puuid, row[1])
 
 def update_player_guild(puuid: str,
                         guild_id: int,
@@ -189,121 +130,44 @@ def update_player_guild(puuid: str,
     Met à jour les champs de la table player_guild pour une paire joueur↔guilde.
     Seuls channel_id et last_match_id non-None sont pris en compte.
     """
-    updates = []
-    params = []
-
-    if channel_id is not None:
-        updates.append("channel_id = ?")
-        params.append(channel_id)
-    if last_match_id is not None:
-        updates.append("last_match_id = ?")
-        params.append(last_match_id)
-
-    if not updates:
-        return
-
-    query = f"UPDATE player_guild SET {', '.join(updates)} WHERE player_puuid = ? AND guild_id = ?"
-    params.extend([puuid, guild_id])
-
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(query, tuple(params))
-    conn.commit()
-    conn.close()
+    get_storage().update_player_guild(puuid, guild_id, channel_id, last_match_id)
 
 def delete_player(puuid: str, guild_id: int):
     """Supprime l'inscription d'un joueur dans une guilde."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM player_guild WHERE player_puuid = ? AND guild_id = ?", (puuid, guild_id))
-    conn.commit()
-    conn.close()
+    get_storage().delete_player(puuid, guild_id)
+    username_index.remove(guild_id, puuid)
 
 # ----- Requêtes de consultation -----
 
 def get_player(puuid: str, guild_id: int):
     """Récupère un joueur pour une guilde via jointure."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT
-            p.puuid, p.username,
-            pg.guild_id, pg.channel_id, p.region, pg.last_match_id,
-            p.tier, p.rank, p.lp, p.lp_24h, p.lp_7d,
-            p.flex_tier, p.flex_rank, p.flex_lp
-        FROM player p
-            JOIN player_guild pg ON p.puuid = pg.player_puuid
-        WHERE p.puuid = ? AND pg.guild_id = ?
-        """,
-        (puuid, guild_id),
-    )
-    row = c.fetchone()
-    conn.close()
-    return row
+    return get_storage().get_player(puuid, guild_id)
 
 def get_all_players():
     """Liste tous les joueurs et leurs associations."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT
-            p.puuid, p.username,
-            pg.guild_id, pg.channel_id, p.region, pg.last_match_id,
-            p.tier, p.rank, p.lp, p.lp_24h, p.lp_7d,
-            p.flex_tier, p.flex_rank, p.flex_lp
-        FROM player p
-            JOIN player_guild pg ON p.puuid = pg.player_puuid
-        """
-    )
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return get_storage().get_all_players()
 
 def get_player_by_username(username: str, guild_id: int = None):
     """Récupère un joueur par username, optionnellement filtré par guilde."""
-    conn = get_connection()
-    c = conn.cursor()
-    if guild_id is not None:
-        c.execute(
-            """
-            SELECT
-                p.puuid, p.username,
-                pg.guild_id, pg.channel_id, p.region, pg.last_match_id,
-                p.tier, p.rank, p.lp, p.lp_24h, p.lp_7d,
-                p.flex_tier, p.flex_rank, p.flex_lp
-            FROM player p
-                JOIN player_guild pg ON p.puuid = pg.player_puuid
-            WHERE p.username = ? AND pg.guild_id = ?
-            """,
-            (username, guild_id),
-        )
-        result = c.fetchone()
-    else:
-        c.execute("SELECT puuid, username, region FROM player WHERE username = ?", (username,))
-        result = c.fetchone()
-    conn.close()
-    return result
+    return get_storage().get_player_by_username(username, guild_id)
+
+def get_guild_usernames(guild_id: int):
+    """Liste (puuid, username) des joueurs inscrits dans une guilde."""
+    return get_storage().get_guild_usernames(guild_id)
 
 async def username_autocomplete(interaction: Interaction, current: str):
-    """Autocomplétion des usernames pour une guilde donnée."""
+    """
+    Autocomplétion des usernames pour une guilde donnée.
+
+    Servie depuis ``username_index`` : la base n'est lue qu'au premier appel
+    pour une guilde, l'index étant ensuite tenu à jour par les écritures.
+    """
     guild_id = interaction.guild.id
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("""
-              SELECT p.username
-              FROM player p
-                       JOIN player_guild pg ON p.puuid = pg.player_puuid
-              WHERE pg.guild_id = ?
-              """, (guild_id,))
-    rows = c.fetchall()
-    conn.close()
-    choices = [row[0] for row in rows]
-    filtered = [choice for choice in choices if current.lower() in choice.lower()]
+    if not username_index.is_loaded(guild_id):
+        username_index.load(guild_id, get_guild_usernames(guild_id))
     return [
         app_commands.Choice(name=choice, value=choice)
-        for choice in filtered[:25]
+        for choice in username_index.search(guild_id, current, limit=25)
     ]
 
 # ----- Opérations sur la table guild -----
@@ -313,204 +177,158 @@ def insert_guild(guild_id: int,
                  flex_enabled: int | None = 0):
     """Insert or update guild configuration.
 
-    Uses ``INSERT OR IGNORE`` followed by an ``UPDATE`` so that existing
-    rows aren't replaced, which previously could violate foreign key
+    Existing rows aren't replaced (SQLite uses ``INSERT OR IGNORE`` followed
+    by an ``UPDATE``), which previously could violate foreign key
     constraints for related tables.
     """
-    conn = get_connection()
-    c = conn.cursor()
-
-    # Ensure a row exists for this guild
-    c.execute(
-        """
-        INSERT OR IGNORE INTO guild (guild_id, leaderboard_channel_id, flex_enabled)
-        VALUES (?, ?, COALESCE(?, 0))
-        """,
-        (guild_id, leaderboard_channel_id, flex_enabled),
-    )
-
-    # Update provided fields without clobbering existing data
-    updates = []
-    params: list[object] = []
-    if leaderboard_channel_id is not None:
-        updates.append("leaderboard_channel_id = ?")
-        params.append(leaderboard_channel_id)
-    if flex_enabled is not None:
-        updates.append("flex_enabled = ?")
-        params.append(flex_enabled)
-    if updates:
-        params.append(guild_id)
-        c.execute(
-            f"UPDATE guild SET {', '.join(updates)} WHERE guild_id = ?",
-            params,
-        )
-
-    conn.commit()
-    conn.close()
+    return get_storage().insert_guild(guild_id, leaderboard_channel_id, flex_enabled)
 
 def set_guild_flex_mode(guild_id: int, enabled: bool) -> None:
     """Toggle flex mode for a guild."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "UPDATE guild SET flex_enabled = ? WHERE guild_id = ?",
-        (1 if enabled else 0, guild_id)
-    )
-    conn.commit()
-    conn.close()
+    get_storage().set_guild_flex_mode(guild_id, enabled)
 
 def get_guild(guild_id: int):
     """Retrieve guild info if present."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT guild_id, leaderboard_channel_id, flex_enabled FROM guild WHERE guild_id = ?",
-        (guild_id,)
-    )
-    result = c.fetchone()
-    conn.close()
-    return result
+    return get_storage().get_guild(guild_id)
 
 # ----- Opérations sur la table leaderboard -----
 
 def get_leaderboard_by_guild(guild_id: int):
     """Renvoie le leaderboard_id pour une guilde si créé, sinon None."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT leaderboard_id FROM leaderboard WHERE guild_id = ?", (guild_id,))
-    row = c.fetchone()
-    conn.close()
-    return row[0] if row else None
+    return get_storage().get_leaderboard_by_guild(guild_id)
 
 def insert_leaderboard(guild_id: int) -> int:
     """Crée un nouveau leaderboard pour la guilde et renvoie son ID."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("INSERT INTO leaderboard (guild_id) VALUES (?)", (guild_id,))
-    lb_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    return lb_id
+    return get_storage().insert_leaderboard(guild_id)
 
 def delete_leaderboard(guild_id: int):
     """Supprime le leaderboard d'une guilde et réinitialise son channel."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "SELECT leaderboard_id FROM leaderboard WHERE guild_id = ?",
-        (guild_id,)
-    )
-    row = c.fetchone()
-    if row:
-        c.execute(
-            "DELETE FROM leaderboard_player WHERE leaderboard_id = ?",
-            (row[0],),
-        )
-    c.execute("DELETE FROM leaderboard WHERE guild_id = ?", (guild_id,))
-    c.execute(
-        "UPDATE guild SET leaderboard_channel_id = NULL WHERE guild_id = ?",
-        (guild_id,)
-    )
-    conn.commit()
-    conn.close()
+    get_storage().delete_leaderboard(guild_id)
 
 def insert_leaderboard_member(leaderboard_id: int, player_puuid: str):
     """Ajoute un joueur au leaderboard."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "INSERT OR IGNORE INTO leaderboard_player (leaderboard_id, player_puuid) VALUES (?, ?)",
-        (leaderboard_id, player_puuid)
-    )
-    conn.commit()
-    conn.close()
+    get_storage().insert_leaderboard_member(leaderboard_id, player_puuid)
 
 def delete_leaderboard_member(leaderboard_id: int, player_puuid: str):
     """Retire un joueur du leaderboard."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        "DELETE FROM leaderboard_player WHERE leaderboard_id = ? AND player_puuid = ?",
-        (leaderboard_id, player_puuid)
-    )
-    conn.commit()
-    conn.close()
+    get_storage().delete_leaderboard_member(leaderboard_id, player_puuid)
 
-def get_leaderboard_data(leaderboard_id: int, guild_id: int):
+def get_leaderboard_data(leaderboard_id: int, guild_id: int, limit: int | None = None):
     """
     Récupère les données à afficher pour le leaderboard :
     username, tier, rank, current LP, LP 24h, LP 7j
+    triées par score décroissant (joueurs non classés en dernier).
     """
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        SELECT
-            p.username,
-            p.tier,
-            p.rank,
-            p.lp,
-            p.lp_24h,
-            p.lp_7d
-        FROM leaderboard    AS lb
-                 JOIN leaderboard_player AS lp_player
-                      ON lb.leaderboard_id = lp_player.leaderboard_id
-                 JOIN player        AS p
-                      ON lp_player.player_puuid = p.puuid
-        WHERE lb.guild_id       = ?
-          AND lb.leaderboard_id = ?
-        """,
-        (guild_id, leaderboard_id),
-    )
-    rows = c.fetchall()
-    conn.close()
-    return rows
+    return get_storage().get_leaderboard_data(leaderboard_id, guild_id, limit)
+
+
+def get_leaderboard_pages(leaderboard_id: int) -> list[tuple[int, int, str | None]]:
+    """
+    Liste les messages Discord publiés pour le leaderboard :
+    (page, message_id, content_hash), triés par page.
+    """
+    return get_storage().get_leaderboard_pages(leaderboard_id)
+
+def set_leaderboard_page(leaderboard_id: int, page: int, message_id: int,
+                         content_hash: str | None) -> None:
+    """Enregistre le message d'une page et l'empreinte du contenu publié."""
+    get_storage().set_leaderboard_page(leaderboard_id, page, message_id, content_hash)
+
+def delete_leaderboard_pages(leaderboard_id: int, from_page: int = 0) -> None:
+    """Oublie les pages à partir de ``from_page`` (toutes par défaut)."""
+    get_storage().delete_leaderboard_pages(leaderboard_id, from_page)
 
 
 # ----- Remise à zéro des LP -----
 
-def reset_lp_24h_for_guild(guild_id: int):
-    """Reset lp_24h for players belonging to a guild."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        UPDATE player
-        SET lp_24h = 0
-        WHERE puuid IN (
-            SELECT player_puuid FROM player_guild WHERE guild_id = ?
-        )
-        """,
-        (guild_id,),
-    )
-    conn.commit()
-    conn.close()
-
-
-def reset_lp_7d_for_guild(guild_id: int):
-    """Reset lp_7d for players belonging to a guild."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute(
-        """
-        UPDATE player
-        SET lp_7d = 0
-        WHERE puuid IN (
-            SELECT player_puuid FROM player_guild WHERE guild_id = ?
-        )
-        """,
-        (guild_id,),
-    )
-    conn.commit()
-    conn.close()
+def reset_lp_for_period(period: str) -> list[int]:
+    """Snapshot the recaps and reset lp_24h / lp_7d for every tracked player.
+
+    The recap snapshot of each guild with the recap enabled and the reset are
+    written in one transaction: either both are committed or neither is, so a
+    crash between the two cannot lose a recap. Each player row is updated at
+    most once, whatever the number of guilds it belongs to.
+
+    Returns the IDs of the created snapshots (see ``get_unsent_recap_snapshots``).
+    """
+    return get_storage().reset_lp_for_period(period)
+
+
+def get_unsent_recap_snapshots(period: str | None = None):
+    """Liste les snapshots de recap pas encore envoyés : (snapshot_id, guild_id, period)."""
+    return get_storage().get_unsent_recap_snapshots(period)
+
+
+def get_recap_aggregate(snapshot_id: int) -> dict | None:
+    """
+    Agrégat figé d'un snapshot de recap : {"snapshot_id", "guild_id", "period",
+    "players"}, les joueurs (dicts de RECAP_ROW_COLUMNS) triés par gain de LP
+    décroissant sur la période. Les parties jouées viennent de match_history,
+    comptées au moment du reset.
+    """
+    return get_storage().get_recap_aggregate(snapshot_id)
+
+
+def mark_recap_snapshot_sent(snapshot_id: int) -> None:
+    """Marque un snapshot de recap comme traité."""
+    get_storage().mark_recap_snapshot_sent(snapshot_id)
+
+# ----- Historique des matchs -----
+
+def insert_match_history(puuid: str, matches: list[dict]) -> None:
+    """
+    Enregistre le résumé de plusieurs matchs d'un joueur en une transaction.
+
+    Chaque dict contient les clés de MATCH_HISTORY_COLUMNS (lp_change peut
+    être None). Un match déjà connu est mis à jour, sans effacer un
+    lp_change connu par une valeur inconnue.
+    """
+    get_storage().insert_match_history(puuid, matches)
+
+
+def get_match_history(puuid: str, limit: int = 10, offset: int = 0) -> list[dict]:
+    """Renvoie les matchs connus d'un joueur, du plus récent au plus ancien."""
+    return get_storage().get_match_history(puuid, limit, offset)
+
+
+def get_known_match_ids(puuid: str, match_ids: list[str]) -> set[str]:
+    """Parmi ``match_ids``, renvoie ceux déjà présents dans l'historique du joueur."""
+    return get_storage().get_known_match_ids(puuid, match_ids)
+
+# ----- Tâches planifiées -----
+
+def get_job_last_run(name: str) -> float | None:
+    """Horodatage Unix de la dernière exécution réussie d'une tâche, ou None."""
+    return get_storage().get_job_last_run(name)
+
+
+def set_job_last_run(name: str, timestamp: float) -> None:
+    """Enregistre l'horodatage Unix de la dernière exécution d'une tâche."""
+    get_storage().set_job_last_run(name, timestamp)
+
+# ----- État du bot -----
+
+def get_bot_state(key: str) -> str | None:
+    """Valeur persistante associée à ``key`` (empreinte des commandes...), ou None."""
+    return get_storage().get_bot_state(key)
+
+
+def set_bot_state(key: str, value: str) -> None:
+    """Enregistre une valeur persistante du bot."""
+    get_storage().set_bot_state(key, value)
+
+
+# ----- Flux des changements (diffusé par l'API web) -----
+
+def record_change(kind: str, payload: dict) -> int:
+    """
+    Publie un événement (``match_finished``, ``leaderboard``...) dans le flux
+    des changements lu par /api/events ; renvoie son id.
+    """
+    return get_storage().append_change(kind, json.dumps(payload, ensure_ascii=False), time.time())
 
 # ----- Helpers -----
 
 def count_players() -> int:
     """Return the total number of registered players."""
-    conn = get_connection()
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM player")
-    row = c.fetchone()
-    conn.close()
-    return row[0] if row else 0
+    return get_storage().count_players()
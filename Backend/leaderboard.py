@@ -1,8 +1,9 @@
 import discord
 from discord import app_commands
+import hashlib
 import logging
-import io
 
+import metrics
 from fonction_bdd import (
     get_guild,
     insert_guild,
@@ -12,8 +13,20 @@ from fonction_bdd import (
     insert_leaderboard_member,
     delete_leaderboard_member,
     delete_leaderboard,
-    get_leaderboard_data, username_autocomplete
+    get_leaderboard_data,
+    get_leaderboard_pages,
+    set_leaderboard_page,
+    delete_leaderboard_pages,
+    record_change,
+    username_autocomplete
 )
+from leaderboard_refresh import leaderboard_refresher
+
+# Taille maximale d'un message Discord
+MESSAGE_LIMIT = 2000
+
+# Pages publiées par guilde : {page: (message_id, content_hash)} (copie de leaderboard_page)
+_published_pages: dict[int, dict[int, tuple[int, str | None]]] = {}
 
 # ─── /leaderboard ───────────────────────────────────────────────────────────────
 @app_commands.command(
@@ -44,6 +57,10 @@ async def leaderboard_cmd(
     lb_id = get_leaderboard_by_guild(guild_id)
     if lb_id is None:
         lb_id = insert_leaderboard(guild_id)
+    else:
+        # Les anciens messages sont dans l'ancien salon
+        delete_leaderboard_pages(lb_id)
+    _published_pages.pop(guild_id, None)
 
     await update_leaderboard_message(new_channel.id, interaction.client, guild_id)
 
@@ -90,8 +107,7 @@ async def add_leaderboard_cmd(
     insert_leaderboard_member(lb_id, puuid)
     logging.info(f"[BDD] Added {puuid} to leaderboard #{lb_id}")
 
-    channel_id = get_guild(guild_id)[1]
-    await update_leaderboard_message(channel_id, interaction.client, guild_id)
+    leaderboard_refresher.mark_dirty(guild_id)
 
     await interaction.response.send_message(
         f"✅ Joueur **{username}** ajouté au leaderboard.",
@@ -134,8 +150,7 @@ async def remove_leaderboard_cmd(
     delete_leaderboard_member(lb_id, puuid)
     logging.info(f"[BDD] Removed {puuid} from leaderboard #{lb_id}")
 
-    channel_id = get_guild(guild_id)[1]
-    await update_leaderboard_message(channel_id, interaction.client, guild_id)
+    leaderboard_refresher.mark_dirty(guild_id)
 
     await interaction.response.send_message(
         f"✅ Joueur **{username}** retiré du leaderboard.",
@@ -143,37 +158,55 @@ async def remove_leaderboard_cmd(
     )
 
 # ─── Fonction de mise à jour d’embed ────────────────────────────────────────────
+def _load_published_pages(guild_id: int, lb_id: int) -> dict[int, tuple[int, str | None]]:
+    if guild_id not in _published_pages:
+        _published_pages[guild_id] = {
+            page: (message_id, content_hash)
+            for page, message_id, content_hash in get_leaderboard_pages(lb_id)
+        }
+    return _published_pages[guild_id]
+
+
+def _paginate(lines: list[str]) -> list[str]:
+    """
+    Découpe le tableau en blocs de code tenant chacun dans un message,
+    l'en-tête (deux premières lignes) étant répété sur chaque page.
+    """
+    head, body = lines[:2], lines[2:]
+    pages, current = [], list(head)
+    size = len("```" + "\n".join(current) + "```")
+    for line in body:
+        if len(current) > len(head) and size + 1 + len(line) > MESSAGE_LIMIT:
+            pages.append("```" + "\n".join(current) + "```")
+            current = list(head)
+            size = len("```" + "\n".join(current) + "```")
+        current.append(line)
+        size += 1 + len(line)
+    pages.append("```" + "\n".join(current) + "```")
+    return pages
+
+
+async def refresh_leaderboard(bot: discord.Client, guild_id: int):
+    """Met à jour le leaderboard d'une guilde si un salon est configuré."""
+    guild_row = get_guild(guild_id)
+    if not guild_row or guild_row[1] is None:
+        return
+    await update_leaderboard_message(guild_row[1], bot, guild_id)
+
+
 async def update_leaderboard_message(channel_id: int, bot: discord.Client, guild_id: int):
     """
-    Met à jour ou envoie un message texte monospace contenant
-    le classement trié des joueurs du leaderboard.
+    Met à jour ou envoie les messages texte monospace contenant
+    le classement trié des joueurs du leaderboard, réparti sur autant de
+    messages persistants que nécessaire (un par page de 2000 caractères).
     """
     # 1) Récupère le leaderboard_id et les données
     lb_id = get_leaderboard_by_guild(guild_id)
     if lb_id is None:
         return
     rows = get_leaderboard_data(lb_id, guild_id)
-    # rows = List[ (username, tier, rank, current_lp, lp24h, lp7d) ]
-
-    # 1.5) Tri du classement : catégorie → division → LP courant
-    rank_order = [
-        'IRON', 'BRONZE', 'SILVER', 'GOLD',
-        'PLATINUM', 'EMERALD', 'DIAMOND', 'MASTER',
-        'GRANDMASTER', 'CHALLENGER'
-    ]
-    tier_order = ['IV', 'III', 'II', 'I']  # I = meilleur
-
-    def rank_idx(val: str | None) -> int:
-        return rank_order.index(val) if val in rank_order else -1
-
-    def tier_idx(val: str | None) -> int:
-        return tier_order.index(val) if val in tier_order else -1
-
-    rows.sort(key=lambda x: (
-        -rank_idx(x[2]),    # meilleur rang en premier, "Unranked" en dernier
-        -tier_idx(x[1]),    # meilleure division en premier
-        -(x[3] if x[3] is not None else float('-inf'))
-    ))
+    # rows = List[ (username, tier, rank, current_lp, lp24h, lp7d) ],
+    # déjà triées par score (catégorie → division → LP) côté SQLite
 
     # 2) Prépare header et séparateur
     header    = "Username                      | Rank              | LP (24h) | LP (7d)"
@@ -197,17 +230,10 @@ async def update_leaderboard_message(channel_id: int, bot: discord.Client, guild
         lp7_col  = str(lp7d).rjust(lp7_w)
         lines.append(f"{user_col}|{rank_col}|{lp24_col}|{lp7_col}")
 
-    # 5) Assemble le bloc de code Markdown et gère la taille
-    code_block = "```" + "\n".join(lines) + "```"
-    is_too_long = len(code_block) > 2000
-    file = None
-    if is_too_long:
-        file = discord.File(
-            io.BytesIO("\n".join(lines).encode("utf-8")),
-            filename="leaderboard.txt",
-        )
+    # 5) Découpe en pages d'au plus un message chacune
+    pages = _paginate(lines)
 
-    # 6) Recherche un ancien message à éditer ou à supprimer
+    # 6) Vérifie que le salon existe toujours
     guild_obj = bot.get_guild(guild_id)
     if guild_obj is None:
         logging.error(
@@ -221,48 +247,91 @@ async def update_leaderboard_message(channel_id: int, bot: discord.Client, guild
             f"[update_leaderboard_message] Channel with id {channel_id} not found"
         )
         delete_leaderboard(guild_id)
+        _published_pages.pop(guild_id, None)
         logging.info(
             f"[update_leaderboard_message] Dropped leaderboard for guild {guild_id}" \
             f" because channel {channel_id} is missing"
         )
         return
 
-    existing_msg = None
-    async for msg in channel.history(limit=50):
-        if (
-                msg.author == guild_obj.me
-                and (msg.content.startswith("```") or msg.content.startswith("Leaderboard is too long"))
-        ):
-            existing_msg = msg
-            break
-
-    if not is_too_long:
-        if existing_msg:
-            await existing_msg.edit(content=code_block)
-        else:
-            await channel.send(code_block)
-        return
-
-    # Contenu trop long: supprime l'ancien message et envoie un fichier
-    if existing_msg:
-        await existing_msg.delete()
+    # 7) N'édite que les pages dont le contenu a changé
+    published = _load_published_pages(guild_id, lb_id)
+    changed = False
+    for page, content in enumerate(pages):
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        message_id, published_hash = published.get(page, (None, None))
+        unchanged = message_id is not None and published_hash == content_hash
+        metrics.record_cache("leaderboard_page", unchanged)
+        if unchanged:
+            continue
+        changed = True
+
+        if message_id is not None:
+            try:
+                with metrics.discord_send.time(kind="leaderboard"):
+                    await channel.get_partial_message(message_id).edit(content=content)
+            except discord.NotFound:
+                logging.info(
+                    f"[update_leaderboard_message] Stored message {message_id} (page {page}) "
+                    f"is gone in channel {channel_id}"
+                )
+                message_id = None
+
+        if message_id is None:
+            existing_msg = None
+            if page == 0 and len(published) <= 1:
+                # Leaderboard d'avant l'enregistrement des messages
+                existing_msg = await _find_leaderboard_message(channel, guild_obj)
+            with metrics.discord_send.time(kind="leaderboard"):
+                if existing_msg:
+                    await existing_msg.edit(content=content, attachments=[])
+                else:
+                    existing_msg = await channel.send(content)
+            message_id = existing_msg.id
+
+        published[page] = (message_id, content_hash)
+        set_leaderboard_page(lb_id, page, message_id, content_hash)
+
+    # 8) Supprime les pages en trop quand le classement a raccourci
+    extra_pages = sorted(page for page in published if page >= len(pages))
+    for page in extra_pages:
+        message_id, _ = published.pop(page)
         try:
-            await existing_msg.delete()
+            await channel.get_partial_message(message_id).delete()
         except discord.NotFound:
-            logging.warning(
-                f"[update_leaderboard_message] Missing leaderboard message in "
-                f"channel {channel.name} ({channel_id}) on guild {guild_obj.name} ({guild_id})"
-            )
+            pass
         except discord.DiscordException as e:
             logging.error(
-                f"[update_leaderboard_message] Failed to delete leaderboard message in "
+                f"[update_leaderboard_message] Failed to delete leaderboard page {page} in "
                 f"channel {channel.name} ({channel_id}) on guild {guild_obj.name} ({guild_id}): {e}"
             )
-    try:
-        await channel.send("Leaderboard is too long; see attached file.", file=file)
-    except discord.DiscordException as e:
-        logging.error(f"[update_leaderboard_message] Failed to send leaderboard: {e}")
-
+    if extra_pages:
+        delete_leaderboard_pages(lb_id, len(pages))
+
+    # 9) Publie le nouveau classement pour la page web (/api/events)
+    if changed or extra_pages:
+        record_change("leaderboard", {
+            "guild_id": guild_id,
+            "rows": [
+                {"username": username, "rank": rank_val, "tier": tier, "lp": current_lp,
+                 "lp_24h": lp24h, "lp_7d": lp7d}
+                for username, tier, rank_val, current_lp, lp24h, lp7d in rows
+            ],
+        })
+
+
+async def _find_leaderboard_message(channel, guild_obj):
+    """
+    Repli quand l'ID du message n'est pas connu (leaderboards créés avant
+    son enregistrement) : cherche le dernier message du bot dans le salon.
+    """
+    async for msg in channel.history(limit=50):
+        if (
+                msg.author == guild_obj.me
+                and (msg.content.startswith("```") or msg.content.startswith("Leaderboard is too long"))
+        ):
+            return msg
+    return None
 
 def setup_tree(tree_obj: app_commands.CommandTree):
     tree_obj.add_command(leaderboard_cmd)
@@ -0,0 +1,176 @@
+"""
+Rafraîchissement différé des messages de leaderboard.
+
+Les écritures (fin de match, /addleaderboard, /removeleaderboard,
+/unregister, remises à zéro) ne modifient plus le message Discord elles-mêmes :
+elles marquent la guilde comme « sale ». Une seule tâche de fond regroupe ces
+marques et édite au plus une fois par fenêtre le leaderboard de chaque guilde,
+si bien que cinq joueurs d'une même premade qui terminent ensemble ne
+produisent qu'une seule édition.
+
+Équité : les guildes sont traitées dans l'ordre où elles sont devenues sales,
+et une guilde très active ne peut pas être rééditée avant la fin de sa
+fenêtre, ce qui laisse passer les autres.
+
+Les guildes dues au même moment (typiquement toutes, après la remise à zéro
+de minuit) sont rafraîchies en parallèle par un nombre borné de workers, avec
+un débit global limité. Une guilde n'étant jamais traitée par deux workers à
+la fois, son salon reçoit ses éditions en série ; les buckets par salon de
+Discord restent gérés par discord.py.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+import metrics
+from config import env_number
+
+# Intervalle minimal entre deux éditions du leaderboard d'une même guilde
+DEFAULT_REFRESH_WINDOW = 10.0
+# Délai laissé après la première marque pour regrouper une rafale
+DEFAULT_REFRESH_SETTLE = 2.0
+# Nombre de guildes rafraîchies en parallèle
+DEFAULT_REFRESH_CONCURRENCY = 4
+# Rafraîchissements de guilde démarrés par seconde, toutes guildes confondues
+DEFAULT_REFRESH_RATE = 5.0
+
+
+class LeaderboardRefresher:
+    """Ensemble de guildes à rafraîchir et boucle qui les traite."""
+
+    def __init__(self, window: float | None = None, settle: float | None = None,
+                 concurrency: int | None = None, rate: float | None = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.settle = settle
+        self.concurrency = concurrency
+        self.rate = rate
+        self._clock = clock
+        self._dirty: dict[int, float] = {}  # guild_id -> marquée depuis (ordre d'insertion)
+        self._last_flush: dict[int, float] = {}
+        self._wake: asyncio.Event | None = None
+        self._next_start = 0.0
+        # (nombre de guildes, durée en secondes) du dernier passage
+        self.last_fan_out: tuple[int, float] | None = None
+
+    def _window(self) -> float:
+        if self.window is None:
+            return env_number("LEADERBOARD_REFRESH_WINDOW", DEFAULT_REFRESH_WINDOW)
+        return self.window
+
+    def _settle(self) -> float:
+        if self.settle is None:
+            return min(env_number("LEADERBOARD_REFRESH_SETTLE", DEFAULT_REFRESH_SETTLE), self._window())
+        return self.settle
+
+    def _concurrency(self) -> int:
+        if self.concurrency is None:
+            return max(int(env_number("LEADERBOARD_REFRESH_CONCURRENCY", DEFAULT_REFRESH_CONCURRENCY)), 1)
+        return max(self.concurrency, 1)
+
+    def _rate(self) -> float:
+        if self.rate is None:
+            return env_number("LEADERBOARD_REFRESH_RATE", DEFAULT_REFRESH_RATE)
+        return self.rate
+
+    def mark_dirty(self, guild_id: int) -> None:
+        """Demande un rafraîchissement du leaderboard de la guilde."""
+        if guild_id not in self._dirty:
+            self._dirty[guild_id] = self._clock()
+        if self._wake is not None:
+            self._wake.set()
+
+    def mark_all_dirty(self, guild_ids) -> None:
+        for guild_id in guild_ids:
+            self.mark_dirty(guild_id)
+
+    def pending(self) -> list[int]:
+        return list(self._dirty)
+
+    def _due_at(self, guild_id: int, dirty_since: float) -> float:
+        last = self._last_flush.get(guild_id)
+        due = dirty_since + self._settle()
+        if last is not None:
+            due = max(due, last + self._window())
+        return due
+
+    def pop_due(self, now: float | None = None) -> tuple[list[int], float | None]:
+        """
+        Retire et renvoie les guildes à rafraîchir maintenant, de la plus
+        anciennement marquée à la plus récente, ainsi que le délai avant la
+        prochaine échéance (None si plus rien n'est en attente).
+        """
+        now = self._clock() if now is None else now
+        due, next_delay = [], None
+        for guild_id, since in list(self._dirty.items()):
+            due_at = self._due_at(guild_id, since)
+            if due_at <= now:
+                del self._dirty[guild_id]
+                due.append(guild_id)
+            else:
+                delay = due_at - now
+                next_delay = delay if next_delay is None else min(next_delay, delay)
+        return due, next_delay
+
+    async def _throttle(self):
+        """Espace les démarrages de rafraîchissement selon le débit global."""
+        rate = self._rate()
+        if rate <= 0:
+            return
+        now = self._clock()
+        start = max(now, self._next_start)
+        self._next_start = start + 1 / rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def fan_out(self, guild_ids: list[int], flush: Callable[[int], Awaitable[None]]) -> float:
+        """
+        Rafraîchit ``guild_ids`` en parallèle (workers bornés, débit limité),
+        dans l'ordre de la liste, et renvoie la durée totale en secondes.
+        """
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self._concurrency())
+
+        async def worker(guild_id: int):
+            async with semaphore:
+                await self._throttle()
+                self._last_flush[guild_id] = self._clock()
+                try:
+                    await flush(guild_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.error(
+                        f"[leaderboard_refresh] Failed to refresh leaderboard of guild {guild_id}: {e}",
+                        exc_info=True,
+                    )
+
+        await asyncio.gather(*(worker(guild_id) for guild_id in guild_ids))
+        elapsed = time.perf_counter() - started
+        self.last_fan_out = (len(guild_ids), elapsed)
+        metrics.loop_duration.observe(elapsed, loop="leaderboard_refresh")
+        if len(guild_ids) > 1:
+            logging.info(
+                f"[leaderboard_refresh] Refreshed {len(guild_ids)} leaderboards in {elapsed:.2f}s"
+            )
+        return elapsed
+
+    async def run(self, flush: Callable[[int], Awaitable[None]]):
+        """Tâche de fond : appelle ``flush(guild_id)`` pour chaque guilde à rafraîchir."""
+        self._wake = asyncio.Event()
+        while True:
+            self._wake.clear()
+            guild_ids, next_delay = self.pop_due()
+            if guild_ids:
+                await self.fan_out(guild_ids, flush)
+                continue
+            if next_delay is None:
+                await self._wake.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=next_delay)
+                except asyncio.TimeoutError:
+                    pass
+
+leaderboard_refresher = LeaderboardRefresher()
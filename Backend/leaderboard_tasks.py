@@ -1,22 +1,43 @@
 import asyncio
+import logging
+import zlib
 from datetime import datetime, time, timedelta
+import discord
 import pytz
+
+import metrics
+from config import env_number
 from fonction_bdd import (
-    get_all_players,
     get_all_guild_ids,
-    reset_lp_24h_for_guild,
-    reset_lp_7d_for_guild,
-    is_recap_enabled,
+    reset_lp_for_period,
+    get_unsent_recap_snapshots,
+    get_recap_aggregate,
+    mark_recap_snapshot_sent,
     get_guild,
-    get_leaderboard_by_guild,
-    get_leaderboard_data,
+    get_recap_slot,
 )
-from leaderboard import update_leaderboard_message
-from recap import build_recap_embed
+from leaderboard_refresh import leaderboard_refresher
+from recap import build_recap_embeds, group_embeds_for_messages
+from scheduler import JobScheduler, job_scheduler
 
-leaderboard_update_event = asyncio.Event()
 PARIS_TZ = pytz.timezone("Europe/Paris")
 
+# Fenêtre (minutes après le reset) sur laquelle les recaps et leaderboards des
+# guildes sans créneau explicite sont répartis, et nombre de guildes traitées
+# en même temps.
+DEFAULT_RECAP_SPREAD_MINUTES = 30
+DEFAULT_RECAP_CONCURRENCY = 3
+
+# Nouvelles tentatives pour les recaps non envoyés après le passage étalé
+RECAP_DELIVERY_RETRIES = 3
+RECAP_RETRY_DELAY = 300
+
+# Livraisons en cours après un reset (références gardées jusqu'à la fin)
+_deliveries: set[asyncio.Task] = set()
+# Snapshots de recap en cours d'envoi
+_sending: set[int] = set()
+
+
 def _next_midnight(now: datetime | None = None) -> datetime:
     """Return the next midnight Europe/Paris (timezone-aware)."""
     now_paris = datetime.now(PARIS_TZ) if now is None else now.astimezone(PARIS_TZ)
@@ -32,101 +53,151 @@ def _next_monday(now: datetime | None = None) -> datetime:
     return PARIS_TZ.localize(datetime.combine(next_monday_date, time.min))
 
 
-async def notify_leaderboard_update(bot):
-    """
-    Attend que l'événement soit déclenché pour mettre à jour le leaderboard dans tous les guilds concernés.
+def guild_recap_offset(guild_id: int, slot: int | None, spread_minutes: int) -> int:
+    """Décalage en secondes après le reset : créneau explicite, sinon hash de la guilde."""
+    if slot is not None:
+        return slot * 60
+    if spread_minutes <= 0:
+        return 0
+    return zlib.crc32(str(guild_id).encode()) % (spread_minutes * 60)
+
+
+async def send_pending_recaps(bot, guild_id: int | None = None, period: str | None = None):
+    """Send every recap snapshot not yet delivered (optionally for one guild
+    and/or one period).
+
+    Snapshots are written together with the LP reset, so this also delivers
+    the recaps of a reset that completed right before a crash or restart.
+    The pending list is re-read before each snapshot and the snapshot is
+    claimed until it is marked sent, so concurrent deliveries (daily and
+    weekly resets on Monday, startup catch-up) never post it twice.
     """
+    failed: set[int] = set()
     while True:
-        await leaderboard_update_event.wait()
-        leaderboard_update_event.clear()
-        players = get_all_players()
-        guild_ids = {player[3] for player in players}
-        for guild_id in guild_ids:
-            await update_leaderboard_message(guild_id, bot)
-        await asyncio.sleep(1)
-
-async def run_leaderboard_update_pump(bot):
-    """Background task: when an update event is set, refresh leaderboards
-    for all guilds that have a leaderboard channel configured."""
-    while True:
-        await leaderboard_update_event.wait()
-        leaderboard_update_event.clear()
-
-        for guild_id in get_all_guild_ids():
-            guild_row = get_guild(guild_id)
-            if not guild_row:
-                continue
-            channel_id = guild_row[1]
-            if channel_id is None:
-                continue
-            await update_leaderboard_message(channel_id, bot, guild_id)
-
-        await asyncio.sleep(1)
-
-async def reset_lp_scheduler(bot):
-    """Schedule LP resets for all guilds using Europe/Paris timezone."""
-
-    async def send_recap(guild_id: int, period: str):
-        lb_id = get_leaderboard_by_guild(guild_id)
-        if lb_id is None:
+        pending = [
+            (snapshot_id, snapshot_guild_id, snapshot_period)
+            for snapshot_id, snapshot_guild_id, snapshot_period in get_unsent_recap_snapshots(period)
+            if (guild_id is None or snapshot_guild_id == guild_id)
+            and snapshot_id not in _sending and snapshot_id not in failed
+        ]
+        if not pending:
             return
-        rows = get_leaderboard_data(lb_id, guild_id)
-        if not rows:
-            return
-        guild_row = get_guild(guild_id)
-        if not guild_row:
-            return
-        channel_id = guild_row[1]
-        if channel_id is None:
-            return
-        channel = bot.get_channel(channel_id)
-        if channel is None:
-            return
-        embed = build_recap_embed(rows, period)
-        if embed.fields:
-            await channel.send(embed=embed)
-
-    async def refresh_leaderboard(guild_id: int):
-        """Refresh the leaderboard message for a guild if a channel exists."""
-        guild_row = get_guild(guild_id)
-        if not guild_row:
-            return
-        channel_id = guild_row[1]
-        if channel_id is None:
+        snapshot_id, snapshot_guild_id, snapshot_period = pending[0]
+        _sending.add(snapshot_id)
+        try:
+            if await _send_recap(bot, snapshot_id, snapshot_guild_id, snapshot_period):
+                mark_recap_snapshot_sent(snapshot_id)
+            else:
+                failed.add(snapshot_id)
+        finally:
+            _sending.discard(snapshot_id)
+
+
+async def _send_recap(bot, snapshot_id: int, guild_id: int, period: str) -> bool:
+    """Poste un recap ; False si l'envoi a échoué et doit être retenté.
+
+    Un salon inaccessible (Forbidden / NotFound) est un échec définitif : le
+    snapshot est considéré comme traité.
+    """
+    aggregate = get_recap_aggregate(snapshot_id)
+    guild_row = get_guild(guild_id)
+    channel_id = guild_row[1] if guild_row else None
+    channel = bot.get_channel(channel_id) if channel_id is not None else None
+    if not aggregate or not aggregate["players"] or channel is None:
+        return True
+    try:
+        for embeds in group_embeds_for_messages(build_recap_embeds(aggregate)):
+            with metrics.discord_send.time(kind="recap"):
+                await channel.send(embeds=embeds)
+    except (discord.Forbidden, discord.NotFound) as e:
+        # Salon supprimé ou permissions retirées : on abandonne ce recap
+        # plutôt que de l'accumuler et de tout poster au retour des droits.
+        logging.warning(f"[send_pending_recaps] Dropping {period} recap for guild {guild_id}: {e}")
+        return True
+    except discord.DiscordException as e:
+        logging.error(f"[send_pending_recaps] Failed to send {period} recap for guild {guild_id}: {e}")
+        return False
+    return True
+
+
+async def run_staggered(guild_ids, job, spread_minutes: int | None = None,
+                        concurrency: int | None = None):
+    """
+    Lance ``job(guild_id)`` pour chaque guilde à son décalage (voir
+    ``guild_recap_offset``), avec au plus ``concurrency`` guildes en cours.
+    """
+    if spread_minutes is None:
+        spread_minutes = env_number("RECAP_SPREAD_MINUTES", DEFAULT_RECAP_SPREAD_MINUTES, int)
+    if concurrency is None:
+        concurrency = env_number("RECAP_CONCURRENCY", DEFAULT_RECAP_CONCURRENCY, int)
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def one(guild_id: int):
+        offset = guild_recap_offset(guild_id, get_recap_slot(guild_id), spread_minutes)
+        delay = start + offset - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        async with semaphore:
+            try:
+                await job(guild_id)
+            except Exception as e:
+                logging.error(f"[run_staggered] Guild {guild_id} failed: {e}", exc_info=True)
+
+    await asyncio.gather(*(one(guild_id) for guild_id in guild_ids))
+
+
+async def deliver_period(bot, period: str, retries: int = RECAP_DELIVERY_RETRIES,
+                         retry_delay: float = RECAP_RETRY_DELAY):
+    """Recaps et leaderboards de chaque guilde après un reset, à leur créneau.
+
+    Les recaps restés non envoyés (erreur Discord passagère) sont retentés
+    jusqu'à ``retries`` fois, sans jamais rejouer le reset lui-même.
+    """
+    async def deliver(guild_id: int):
+        await send_pending_recaps(bot, guild_id, period)
+        leaderboard_refresher.mark_dirty(guild_id)
+
+    await run_staggered(get_all_guild_ids(), deliver)
+    for _ in range(retries):
+        if not get_unsent_recap_snapshots(period):
             return
-        await update_leaderboard_message(channel_id, bot, guild_id)
-
-    async def daily_reset():
-        while True:
-            target = _next_midnight()
-            while True:
-                now = datetime.now(PARIS_TZ)
-                delta = (target - now).total_seconds()
-                if delta <= 0:
-                    break
-                await asyncio.sleep(min(delta, 3600))
-            for guild_id in get_all_guild_ids():
-                if is_recap_enabled(guild_id, "daily"):
-                    await send_recap(guild_id, "daily")
-                reset_lp_24h_for_guild(guild_id)
-                await refresh_leaderboard(guild_id)
-            leaderboard_update_event.set()
-
-    async def weekly_reset():
-        while True:
-            target = _next_monday()
-            while True:
-                now = datetime.now(PARIS_TZ)
-                delta = (target - now).total_seconds()
-                if delta <= 0:
-                    break
-                await asyncio.sleep(min(delta, 3600))
-            for guild_id in get_all_guild_ids():
-                if is_recap_enabled(guild_id, "weekly"):
-                    await send_recap(guild_id, "weekly")
-                reset_lp_7d_for_guild(guild_id)
-                await refresh_leaderboard(guild_id)
-            leaderboard_update_event.set()
-
-    bot.loop.create_task(daily_reset())
-    bot.loop.create_task(weekly_reset())
+        await asyncio.sleep(retry_delay)
+        try:
+            await send_pending_recaps(bot, period=period)
+        except Exception as e:
+            logging.error(f"[deliver_period] {period} recap retry failed: {e}", exc_info=True)
+
+
+async def _deliver_in_background(bot, period: str):
+    try:
+        await deliver_period(bot, period)
+    except Exception as e:
+        logging.error(f"[deliver_period] {period} delivery failed: {e}", exc_info=True)
+
+
+async def run_lp_reset(bot, period: str):
+    """Global reset for ``period`` ('daily' or 'weekly'), then recaps and boards.
+
+    ``lp_24h`` / ``lp_7d`` live on the shared player rows, so the reset itself
+    stays a single transaction at Paris midnight for every guild. The scheduled
+    job ends as soon as it is committed: the per-guild work (recap message,
+    leaderboard refresh), spread over the guilds' slots, runs in a separate
+    task so a crash during the stagger never replays the reset.
+    """
+    reset_lp_for_period(period)
+    task = asyncio.create_task(_deliver_in_background(bot, period))
+    _deliveries.add(task)
+    task.add_done_callback(_deliveries.discard)
+
+
+async def reset_lp_scheduler(bot, scheduler: JobScheduler = job_scheduler):
+    """Schedule LP resets for all guilds using Europe/Paris timezone.
+
+    The resets are persistent jobs: a midnight or Monday missed while the bot
+    was down is caught up once at startup.
+    """
+    await send_pending_recaps(bot)
+    scheduler.add_job("daily_reset", _next_midnight, lambda: run_lp_reset(bot, "daily"))
+    scheduler.add_job("weekly_reset", _next_monday, lambda: run_lp_reset(bot, "weekly"))
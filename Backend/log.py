@@ -1,18 +1,144 @@
+"""
+Envoi des logs dans un salon Discord.
+
+``emit`` peut être appelé depuis n'importe quel thread (boucle asyncio,
+workers ``asyncio.to_thread``...) : il ne fait que déposer l'entrée formatée
+dans une file bornée. Une tâche asyncio vide la file toutes les
+FLUSH_INTERVAL secondes et envoie les entrées regroupées en blocs de code d'au
+plus MESSAGE_LIMIT caractères.
+
+Pendant une rafale d'erreurs, les lignes identiques d'un même envoi sont
+fusionnées (« (xN) »), la file ne dépasse pas MAX_QUEUE entrées et un envoi ne
+produit pas plus de MAX_MESSAGES_PER_FLUSH messages ; ce qui dépasse est
+compté comme perdu et signalé dans le message suivant.
+"""
+import asyncio
 import logging
+import queue
+import threading
+
+# Limite Discord de caractères par message
+MESSAGE_LIMIT = 2000
+# Intervalle entre deux envois (secondes)
+FLUSH_INTERVAL = 5.0
+# Entrées en attente au-delà desquelles les nouvelles sont perdues
+MAX_QUEUE = 1000
+# Messages envoyés au plus par intervalle
+MAX_MESSAGES_PER_FLUSH = 5
+
+_BLOCK_START = "```\n"
+_BLOCK_END = "\n```"
+_LINE_LIMIT = MESSAGE_LIMIT - len(_BLOCK_START) - len(_BLOCK_END)
+
 
 class DiscordLogHandler(logging.Handler):
-    def __init__(self, bot, channel_id):
+    def __init__(self, bot, channel_id, flush_interval: float = FLUSH_INTERVAL,
+                 max_queue: int = MAX_QUEUE, max_messages: int = MAX_MESSAGES_PER_FLUSH):
         super().__init__()
         self.bot = bot
         self.channel_id = channel_id
+        self.flush_interval = flush_interval
+        self.max_messages = max_messages
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._dropped_lock = threading.Lock()
+        self.dropped = 0
 
     def emit(self, record):
-        log_entry = self.format(record)
-        async def send_log():
-            channel = self.bot.get_channel(self.channel_id)
-            if channel:
-                try:
-                    await channel.send(log_entry)
-                except Exception as e:
-                    print("Error sending log to Discord:", e)
-        self.bot.loop.create_task(send_log())
+        try:
+            key = (record.levelname, record.funcName, record.getMessage())
+            entry = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        try:
+            self._queue.put_nowait((key, entry))
+        except queue.Full:
+            self._count_dropped(1)
+
+    def queue_size(self) -> int:
+        return self._queue.qsize()
+
+    def _count_dropped(self, count: int) -> None:
+        with self._dropped_lock:
+            self.dropped += count
+
+    def _take_dropped(self) -> int:
+        with self._dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+            return dropped
+
+    def _drain(self) -> list[str]:
+        """Vide la file et fusionne les entrées identiques (ordre de première apparition)."""
+        counts: dict[tuple, list] = {}
+        while True:
+            try:
+                key, entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if key in counts:
+                counts[key][1] += 1
+            else:
+                counts[key] = [entry, 1]
+        return [entry if n == 1 else f"{entry} (x{n})" for entry, n in counts.values()]
+
+    def build_messages(self) -> list[str]:
+        """Prépare les messages du prochain envoi à partir des entrées en attente."""
+        lines = self._drain()
+        messages, current = [], []
+        size = 0
+        for line in lines:
+            line = line[:_LINE_LIMIT]
+            if current and size + 1 + len(line) > _LINE_LIMIT:
+                messages.append(current)
+                current, size = [], 0
+            size += len(line) + (1 if current else 0)
+            current.append(line)
+        if current:
+            messages.append(current)
+
+        if len(messages) > self.max_messages:
+            self._count_dropped(sum(len(m) for m in messages[self.max_messages:]))
+            messages = messages[:self.max_messages]
+
+        dropped = self._take_dropped()
+        if dropped:
+            if not messages:
+                messages.append([])
+            elif len("\n".join(messages[-1])) + 64 > _LINE_LIMIT:
+                if len(messages) < self.max_messages:
+                    messages.append([])
+                else:
+                    # place pour l'avis : les dernières lignes sont perdues aussi
+                    while messages[-1] and len("\n".join(messages[-1])) + 64 > _LINE_LIMIT:
+                        messages[-1].pop()
+                        dropped += 1
+            messages[-1].append(f"... {dropped} log entries dropped")
+        return [_BLOCK_START + "\n".join(m) + _BLOCK_END for m in messages]
+
+    async def flush_once(self) -> int:
+        """
+        Envoie les entrées en attente ; renvoie le nombre de messages envoyés.
+        Tant que le salon n'est pas résolu (cache pas encore rempli), les
+        entrées restent dans la file.
+        """
+        channel = self.bot.get_channel(self.channel_id)
+        if channel is None:
+            return 0
+        messages = self.build_messages()
+        if not messages:
+            return 0
+        sent = 0
+        for content in messages:
+            try:
+                await channel.send(content)
+                sent += 1
+            except Exception as e:
+                # pas de logging ici : l'erreur reviendrait dans la file
+                print("Error sending log to Discord:", e)
+        return sent
+
+    async def run(self):
+        """Tâche de fond : envoie les logs toutes les ``flush_interval`` secondes."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush_once()
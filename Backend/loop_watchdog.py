@@ -0,0 +1,110 @@
+"""
+Surveillance du retard de la boucle asyncio.
+
+Une coroutine « battement » se réveille toutes les ``interval`` secondes et
+mesure son retard de réveil (histogramme ``event_loop_lag_seconds``). Un
+thread de garde vérifie en parallèle l'âge du dernier battement : si la boucle
+ne l'a pas produit depuis plus de ``threshold`` secondes, c'est qu'un appel
+bloquant l'occupe ; la pile du thread de la boucle est alors capturée et
+journalisée, au plus une fois par ``log_interval`` pour un même site d'appel.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+import metrics
+from config import env_number
+
+# Retard (secondes) au-delà duquel la boucle est considérée comme bloquée
+DEFAULT_LAG_THRESHOLD = 0.25
+# Période du battement
+DEFAULT_BEAT_INTERVAL = 0.5
+# Intervalle minimal entre deux logs d'un même site d'appel
+DEFAULT_LOG_INTERVAL = 300.0
+# Nombre de frames gardées dans le log
+STACK_DEPTH = 12
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+loop_lag = metrics.registry.histogram(
+    "event_loop_lag_seconds", "Delay of the event loop heartbeat", buckets=LAG_BUCKETS)
+loop_blocked = metrics.registry.counter(
+    "event_loop_blocked_total", "Event loop stalls above the lag threshold")
+
+
+class LoopWatchdog:
+    def __init__(self, threshold: float | None = None, interval: float = DEFAULT_BEAT_INTERVAL,
+                 log_interval: float = DEFAULT_LOG_INTERVAL):
+        self.threshold = (
+            env_number("LOOP_LAG_THRESHOLD", DEFAULT_LAG_THRESHOLD) if threshold is None else threshold
+        )
+        self.interval = interval
+        self.log_interval = log_interval
+        self._beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._stall_reported = False
+        self._last_logged: dict[tuple[str, int], float] = {}
+        self._stop = threading.Event()
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Démarre le battement et le thread de garde ; sans effet si déjà démarré."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            loop_lag.observe(max(now - expected, 0.0))
+            self._beat = now
+            self._stall_reported = False
+
+    def _watch(self):
+        while not self._stop.wait(self.interval / 2):
+            self.check()
+
+    def check(self, now: float | None = None) -> bool:
+        """
+        Capture la pile de la boucle si le dernier battement est trop ancien
+        (une fois par blocage). Renvoie True si un blocage vient d'être relevé.
+        """
+        now = time.monotonic() if now is None else now
+        stalled_for = now - self._beat - self.interval
+        if stalled_for <= self.threshold or self._stall_reported:
+            return False
+        self._stall_reported = True
+        loop_blocked.inc()
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return True
+        stack = traceback.extract_stack(frame)[-STACK_DEPTH:]
+        site = (stack[-1].filename, stack[-1].lineno) if stack else ("?", 0)
+        last = self._last_logged.get(site)
+        if last is None or now - last >= self.log_interval:
+            self._last_logged[site] = now
+            logging.warning(
+                f"[loop_watchdog] Event loop blocked for {stalled_for:.2f}s+ at "
+                f"{site[0]}:{site[1]}\n" + "".join(traceback.format_list(stack))
+            )
+        return True
+
+
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,57 @@
+"""
+Profilage mémoire à la demande.
+
+tracemalloc n'est plus actif en permanence (il ralentit chaque allocation) :
+``profile_allocations`` l'active, prend deux instantanés espacés de
+``interval`` secondes, renvoie les plus fortes différences par fichier/ligne
+puis le désactive. Si le traçage était déjà actif (PYTHONTRACEMALLOC), il est
+laissé tel quel.
+"""
+import asyncio
+import tracemalloc
+
+# Un seul profilage à la fois
+_profile_lock = asyncio.Lock()
+
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def is_profiling() -> bool:
+    return _profile_lock.locked()
+
+
+async def profile_allocations(interval: float, limit: int = 10) -> list[tracemalloc.StatisticDiff]:
+    """
+    Renvoie les ``limit`` lignes dont l'allocation a le plus varié pendant
+    ``interval`` secondes (triées par variation de taille décroissante).
+    """
+    async with _profile_lock:
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start()
+        try:
+            before = await asyncio.to_thread(_snapshot)
+            await asyncio.sleep(interval)
+            after = await asyncio.to_thread(_snapshot)
+        finally:
+            if started_here:
+                tracemalloc.stop()
+        stats = await asyncio.to_thread(after.compare_to, before, "lineno")
+        return stats[:limit]
+
+
+def format_stat(stat: tracemalloc.StatisticDiff) -> str:
+    frame = stat.traceback[0]
+    return (
+        f"{frame.filename}:{frame.lineno} "
+        f"{stat.size_diff / 1024:+.1f} KiB ({stat.count_diff:+d} blocks), "
+        f"now {stat.size / 1024:.1f} KiB"
+    )
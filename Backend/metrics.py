@@ -0,0 +1,289 @@
+"""
+Métriques internes du bot (compteurs, jauges, histogrammes).
+
+Le registre est toujours actif et ne coûte qu'un verrou par mesure.
+``render()`` produit le format texte de Prometheus ; si METRICS_PORT est
+défini, ``start_http_server`` l'expose sur ``http://METRICS_HOST:METRICS_PORT/metrics``
+(127.0.0.1 par défaut) depuis un thread dédié.
+"""
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+# Bornes (secondes) des histogrammes de latence
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> list[str]: ...
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, description, labels=()):
+        super().__init__(name, description, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, description, labels=()):
+        super().__init__(name, description, labels)
+        self._values: dict[tuple, float] = {}
+        self._functions: dict[tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, func: Callable[[], float], **labels) -> None:
+        """Valeur lue au moment de l'exposition (taille d'une file...)."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = func
+
+    def value(self, **labels) -> float:
+        key = self._key(labels)
+        with self._lock:
+            func = self._functions.get(key)
+            if func is None:
+                return self._values.get(key, 0)
+        return func()
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, func in functions.items():
+            try:
+                values[key] = func()
+            except Exception as e:
+                logging.warning(f"[metrics] Gauge {self.name} failed: {e}")
+        return [
+            f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}"
+            for k, v in sorted(values.items())
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # clé -> [compte par borne..., somme, total]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Mesure la durée du bloc, même s'il lève une exception."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            data = self._values.get(self._key(labels))
+            return data[-1] if data else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, data in items:
+            for bound, count in zip(self.buckets, data):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {count}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, inf)} {data[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {data[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labels=()) -> Counter:
+        return self._register(Counter(name, description, labels))
+
+    def gauge(self, name: str, description: str, labels=()) -> Gauge:
+        return self._register(Gauge(name, description, labels))
+
+    def histogram(self, name: str, description: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Métriques partagées par les modules du bot
+riot_requests = registry.counter(
+    "riot_requests_total", "Riot API HTTP attempts", ("endpoint", "region", "status"))
+riot_latency = registry.histogram(
+    "riot_request_duration_seconds", "Riot API request latency", ("endpoint", "region"))
+riot_rate_limited = registry.counter(
+    "riot_rate_limited_total", "Riot API 429 responses", ("endpoint", "region"))
+cache_requests = registry.counter(
+    "cache_requests_total", "Cache lookups", ("cache", "result"))
+loop_duration = registry.histogram(
+    "loop_iteration_duration_seconds", "Duration of one background loop pass", ("loop",))
+queue_depth = registry.gauge(
+    "queue_depth", "Items waiting in internal queues", ("queue",))
+db_connection = registry.histogram(
+    "db_connection_duration_seconds", "SQLite connection lifetime (open to close) per storage operation", ("op",))
+discord_send = registry.histogram(
+    "discord_send_duration_seconds", "Discord message send/edit latency", ("kind",))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server: ThreadingHTTPServer | None = None
+
+
+def start_http_server(port: int | None = None, host: str | None = None) -> ThreadingHTTPServer | None:
+    """
+    Expose ``/metrics`` si un port est donné (ou METRICS_PORT défini) ;
+    sans effet si le serveur tourne déjà. Renvoie le serveur ou None.
+    """
+    global _server
+    if _server is not None:
+        return _server
+    if port is None:
+        raw = os.getenv("METRICS_PORT", "").strip()
+        if not raw:
+            return None
+        try:
+            port = int(raw)
+        except ValueError:
+            logging.warning(f"[metrics] Invalid METRICS_PORT {raw!r}, endpoint disabled")
+            return None
+    host = host or os.getenv("METRICS_HOST", "127.0.0.1").strip() or "127.0.0.1"
+    try:
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        # endpoint optionnel : ne doit pas bloquer le reste du démarrage
+        logging.warning(f"[metrics] Cannot bind {host}:{port} ({e}), endpoint disabled")
+        return None
+    threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+    logging.info(f"[metrics] Serving metrics on http://{host}:{_server.server_port}/metrics")
+    return _server
+
+
+def stop_http_server() -> None:
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
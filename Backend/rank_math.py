@@ -0,0 +1,65 @@
+"""
+Conversions entre un rang Riot (catégorie, division, LP) et un score absolu
+sur l'échelle classée, utilisé pour trier les leaderboards en SQL et pour
+calculer les gains de LP.
+
+Vocabulaire de la base : ``rank`` est la catégorie (GOLD), ``tier`` la
+division (II). Les fonctions ci-dessous prennent toujours (rank, division, lp).
+"""
+
+RANK_ORDER = [
+    'IRON', 'BRONZE', 'SILVER', 'GOLD',
+    'PLATINUM', 'EMERALD', 'DIAMOND',
+    'MASTER', 'GRANDMASTER', 'CHALLENGER'
+]
+DIVISION_ORDER = ['IV', 'III', 'II', 'I']  # I = meilleure division
+APEX_RANKS = ('MASTER', 'GRANDMASTER', 'CHALLENGER')
+
+DIVISION_SPAN = 100
+RANK_SPAN = DIVISION_SPAN * len(DIVISION_ORDER)
+APEX_BASE = RANK_ORDER.index('MASTER') * RANK_SPAN
+
+# Les LP de Master+ ne sont pas bornés : chaque palier apex occupe une plage
+# assez large pour que l'ordre (catégorie, LP) soit toujours respecté.
+APEX_SPAN = 100_000
+
+# Pour les gains de LP, passer d'un palier apex au suivant compte pour 200 LP.
+APEX_PROMOTION_LP = 200
+
+
+def ladder_score(rank: str | None, division: str | None, lp: int | None) -> int | None:
+    """Score absolu d'un rang, ou None si le joueur n'est pas classé / rang invalide."""
+    if lp is None or rank not in RANK_ORDER:
+        return None
+    if rank in APEX_RANKS:
+        return APEX_BASE + APEX_RANKS.index(rank) * APEX_SPAN + lp
+    if division not in DIVISION_ORDER:
+        return None
+    return RANK_ORDER.index(rank) * RANK_SPAN + DIVISION_ORDER.index(division) * DIVISION_SPAN + lp
+
+
+def from_score(score: int) -> tuple[str, str, int]:
+    """Inverse de ``ladder_score`` : renvoie (rank, division, lp)."""
+    if score >= APEX_BASE:
+        apex_idx = min((score - APEX_BASE) // APEX_SPAN, len(APEX_RANKS) - 1)
+        return APEX_RANKS[apex_idx], 'I', score - APEX_BASE - apex_idx * APEX_SPAN
+    rank_idx, rest = divmod(max(score, 0), RANK_SPAN)
+    division_idx, lp = divmod(rest, DIVISION_SPAN)
+    return RANK_ORDER[rank_idx], DIVISION_ORDER[division_idx], lp
+
+
+def _climb_lp(rank: str | None, division: str | None, lp: int | None) -> int | None:
+    """Comme ``ladder_score`` mais avec des paliers apex espacés de APEX_PROMOTION_LP."""
+    if rank in APEX_RANKS and lp is not None:
+        return APEX_BASE + APEX_RANKS.index(rank) * APEX_PROMOTION_LP + lp
+    return ladder_score(rank, division, lp)
+
+
+def lp_change(old_rank: str | None, old_division: str | None, old_lp: int | None,
+              new_rank: str | None, new_division: str | None, new_lp: int | None) -> int:
+    """LP gagnés (ou perdus) entre deux rangs, 0 si l'un des deux est inconnu."""
+    old = _climb_lp(old_rank, old_division, old_lp)
+    new = _climb_lp(new_rank, new_division, new_lp)
+    if old is None or new is None:
+        return 0
+    return new - old
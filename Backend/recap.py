@@ -1,46 +1,111 @@
 import discord
 
+# Limites Discord : champs par embed, caractères par embed et par message
+# (somme de tous ses embeds), embeds par message
+EMBED_FIELD_LIMIT = 25
+EMBED_CHAR_LIMIT = 6000
+MESSAGE_EMBED_LIMIT = 10
 
-def build_recap_embed(rows, period: str) -> discord.Embed:
-    """Build an embed summarizing LP changes for ``rows``.
+# Nombre de joueurs listés dans les tops du résumé
+TOP_COUNT = 3
 
-    rows schema: (username, tier, rank, lp, lp_24h, lp_7d)
-    - Always display both 24h and 7d gains.
-    - Include current rank (e.g., "GOLD I — 57 LP").
-    - Sort by 24h for daily, by 7d for weekly.
-    """
-    idx_sort = 4 if period == "daily" else 5
-    title = "Daily" if period == "daily" else "Weekly"
 
-    # Sort players by the selected period change, descending
-    sorted_rows = sorted(rows, key=lambda r: (r[idx_sort] or 0), reverse=True)
+def _signed(value: int) -> str:
+    return f"+{value}" if value >= 0 else str(value)
 
-    embed = discord.Embed(title=f"{title} recap")
 
-    for i, row in enumerate(sorted_rows, start=1):
-        username, tier, rank_cat, current_lp, lp_24h, lp_7d = row
+def _rank_line(player: dict) -> str:
+    if player["rank"] and player["tier"]:
+        return f"{player['rank']} {player['tier']} — {player['lp']} LP"
+    return "Unranked"
 
-        # Current rank line
-        if rank_cat and tier:
-            rank_line = f"{rank_cat} {tier} — {current_lp} LP"
-        else:
-            rank_line = "Unranked"
 
-        # Normalize LP deltas
-        lp24 = lp_24h or 0
-        lp7 = lp_7d or 0
-        s24 = "+" if lp24 >= 0 else ""
-        s7 = "+" if lp7 >= 0 else ""
+def _player_field(position: int, player: dict) -> tuple[str, str]:
+    games, wins = player["games"], player["wins"]
+    value = (
+        f"Rank: {_rank_line(player)}\n"
+        f"LP 24h: {_signed(player['lp_24h'] or 0)} | LP 7d: {_signed(player['lp_7d'] or 0)}"
+    )
+    if games:
+        value += f"\nGames: {games} ({wins}W {games - wins}L)"
+    return f"{position}. {player['username']}", value
 
-        value = (
-            f"Rank: {rank_line}\n"
-            f"LP 24h: {s24}{lp24} | LP 7d: {s7}{lp7}"
-        )
 
+def _summary_embed(aggregate: dict, title: str) -> discord.Embed:
+    players = aggregate["players"]
+    games = sum(p["games"] for p in players)
+    wins = sum(p["wins"] for p in players)
+    embed = discord.Embed(title=f"{title} recap")
+    embed.description = (
+        f"{len(players)} players · {games} games ({wins}W {games - wins}L)"
+    )
+
+    gainers = [p for p in players if p["delta"] > 0][:TOP_COUNT]
+    losers = [p for p in reversed(players) if p["delta"] < 0][:TOP_COUNT]
+    most_active = sorted(
+        (p for p in players if p["games"]), key=lambda p: -p["games"]
+    )[:TOP_COUNT]
+    if gainers:
         embed.add_field(
-            name=f"{i}. {username}",
-            value=value,
-            inline=False,
+            name="Top gainers",
+            value="\n".join(f"{p['username']} {_signed(p['delta'])} LP" for p in gainers),
+            inline=True,
+        )
+    if losers:
+        embed.add_field(
+            name="Top losers",
+            value="\n".join(f"{p['username']} {_signed(p['delta'])} LP" for p in losers),
+            inline=True,
+        )
+    if most_active:
+        embed.add_field(
+            name="Most games",
+            value="\n".join(f"{p['username']} {p['games']}" for p in most_active),
+            inline=True,
         )
-
     return embed
+
+
+def build_recap_embeds(aggregate: dict) -> list[discord.Embed]:
+    """Render a recap aggregate (see ``fonction_bdd.get_recap_aggregate``).
+
+    The first embed is a summary (totals, top gainers / losers, most games),
+    followed by one field per player in the aggregate's order (LP gained over
+    the period, descending), split so that no embed exceeds
+    EMBED_FIELD_LIMIT fields or EMBED_CHAR_LIMIT characters.
+    """
+    title = "Daily" if aggregate["period"] == "daily" else "Weekly"
+    embeds = [_summary_embed(aggregate, title)]
+
+    page = None
+    for position, player in enumerate(aggregate["players"], start=1):
+        name, value = _player_field(position, player)
+        if (
+                page is None
+                or len(page.fields) >= EMBED_FIELD_LIMIT
+                # marge pour le suffixe " (n/N)" ajouté au titre ensuite
+                or len(page) + len(name) + len(value) > EMBED_CHAR_LIMIT - 16
+        ):
+            page = discord.Embed(title=f"{title} recap — players")
+            embeds.append(page)
+        page.add_field(name=name, value=value, inline=False)
+
+    if len(embeds) > 2:
+        for number, embed in enumerate(embeds[1:], start=1):
+            embed.title = f"{title} recap — players ({number}/{len(embeds) - 1})"
+    return embeds
+
+
+def group_embeds_for_messages(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+    """Group embeds into messages of at most MESSAGE_EMBED_LIMIT embeds and
+    EMBED_CHAR_LIMIT characters in total."""
+    messages, current, size = [], [], 0
+    for embed in embeds:
+        if current and (len(current) >= MESSAGE_EMBED_LIMIT or size + len(embed) > EMBED_CHAR_LIMIT):
+            messages.append(current)
+            current, size = [], 0
+        current.append(embed)
+        size += len(embed)
+    if current:
+        messages.append(current)
+    return messages
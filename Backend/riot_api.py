@@ -0,0 +1,395 @@
+"""
+Client de l'API Riot et de Data Dragon.
+
+Requêtes HTTP (avec retries, compteur de requêtes et métriques), lecture des
+comptes, rangs, matchs et parties en cours, cache de la version Data Dragon et
+table des champions. Aucun état Discord ici.
+"""
+import asyncio
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+import aiohttp
+import requests
+
+import metrics
+
+RETRY_STATUS_CODES = {502, 503, 504}
+
+# Global request counters (timestamps of each outgoing HTTP request)
+API_REQUEST_TIMESTAMPS: deque[float] = deque()
+API_REQ_LOCK = threading.Lock()
+
+def record_api_request() -> None:
+    """Record an outgoing HTTP request timestamp (thread-safe)."""
+    now = time.time()
+    with API_REQ_LOCK:
+        API_REQUEST_TIMESTAMPS.append(now)
+
+def get_api_request_counts() -> tuple[int, int]:
+    """Return (count_last_10s, count_last_60s) and prune old entries."""
+    now = time.time()
+    ten_secs_ago = now - 10
+    one_min_ago = now - 60
+    with API_REQ_LOCK:
+        # prune older than 60s
+        while API_REQUEST_TIMESTAMPS and API_REQUEST_TIMESTAMPS[0] < one_min_ago:
+            API_REQUEST_TIMESTAMPS.popleft()
+        last_60s = len(API_REQUEST_TIMESTAMPS)
+        last_10s = sum(1 for t in API_REQUEST_TIMESTAMPS if t >= ten_secs_ago)
+    return last_10s, last_60s
+
+
+def riot_headers() -> dict:
+    """En-têtes d'authentification Riot (clé lue à l'appel, après load_dotenv)."""
+    return {"X-Riot-Token": os.getenv("RIOT_API_KEY", "").strip()}
+
+
+# Mapping of simple region codes to platform and cluster
+REGION_MAP = {
+    "euw": ("euw1", "europe"),
+    "eune": ("eun1", "europe"),
+    "na": ("na1", "americas"),
+    "kr": ("kr", "asia"),
+    "br": ("br1", "americas"),
+    "jp": ("jp1", "asia"),
+    "lan": ("la1", "americas"),
+    "las": ("la2", "americas"),
+    "oce": ("oc1", "americas"),
+    "ru": ("ru", "europe"),
+    "tr": ("tr1", "europe"),
+    "vn": ("vn2", "sea"),
+}
+
+PLATFORM_TO_CLUSTER = {platform: cluster for platform, cluster in REGION_MAP.values()}
+
+# Gabarits des routes Riot, pour étiqueter les métriques sans identifiants
+RIOT_ENDPOINTS = [
+    (re.compile(r"/riot/account/v1/accounts/by-riot-id/"), "account-v1.by-riot-id"),
+    (re.compile(r"/riot/account/v1/accounts/by-puuid/"), "account-v1.by-puuid"),
+    (re.compile(r"/lol/match/v5/matches/by-puuid/[^/]+/ids"), "match-v5.ids"),
+    (re.compile(r"/lol/match/v5/matches/[^/]+/timeline"), "match-v5.timeline"),
+    (re.compile(r"/lol/match/v5/matches/"), "match-v5.match"),
+    (re.compile(r"/lol/league/v4/"), "league-v4.entries"),
+    (re.compile(r"/lol/spectator/v5/"), "spectator-v5.active-game"),
+]
+
+
+def riot_endpoint(url: str) -> tuple[str, str]:
+    """Return (endpoint, region) labels for a Riot / Data Dragon URL."""
+    host, _, path = url.split("://", 1)[-1].partition("/")
+    path = "/" + path.split("?", 1)[0]
+    if host.endswith(".api.riotgames.com"):
+        region = host.split(".", 1)[0]
+        for pattern, endpoint in RIOT_ENDPOINTS:
+            if pattern.match(path):
+                return endpoint, region
+        return "other", region
+    if host == "ddragon.leagueoflegends.com":
+        return "ddragon", "global"
+    return "other", host
+
+
+def record_riot_call(endpoint: str, region: str, status, elapsed: float) -> None:
+    metrics.riot_requests.inc(endpoint=endpoint, region=region, status=status)
+    metrics.riot_latency.observe(elapsed, endpoint=endpoint, region=region)
+    if status == 429:
+        metrics.riot_rate_limited.inc(endpoint=endpoint, region=region)
+
+
+def fetch_json(url: str, headers: dict | None = None,
+               retries: int = 3, backoff: float = 1.0):
+    """GET JSON data with simple retry logic for 5xx errors."""
+    if headers:
+        headers = {str(k): str(v) for k, v in headers.items()
+                   if k is not None and v is not None}
+
+    endpoint, region = riot_endpoint(url)
+    for attempt in range(1, retries + 1):
+        try:
+            # Count each actual HTTP attempt
+            record_api_request()
+            started = time.perf_counter()
+            try:
+                resp = requests.get(url, headers=headers, timeout=10)
+            except requests.exceptions.RequestException:
+                record_riot_call(endpoint, region, "error", time.perf_counter() - started)
+                raise
+            record_riot_call(endpoint, region, resp.status_code, time.perf_counter() - started)
+            if resp.status_code in RETRY_STATUS_CODES:
+                raise requests.exceptions.HTTPError(f"{resp.status_code}")
+            if resp.status_code == 404:
+                return None
+            resp.raise_for_status()
+            return resp.json()
+        except requests.exceptions.RequestException as e:
+            if attempt == retries:
+                logging.error(f"Error fetching {url}: {e}")
+                return None
+            time.sleep(backoff * attempt)
+
+
+async def async_fetch_json(url: str, headers: dict | None = None,
+                           retries: int = 3, backoff: float = 1.0):
+    if headers:
+        headers = {str(k): str(v) for k, v in headers.items()
+                   if k is not None and v is not None}
+
+    endpoint, region = riot_endpoint(url)
+    for attempt in range(1, retries + 1):
+        try:
+            async with aiohttp.ClientSession() as session:
+                # Count each actual HTTP attempt
+                record_api_request()
+                started = time.perf_counter()
+                status = None
+                try:
+                    async with session.get(url, headers=headers, timeout=10) as resp:
+                        status = resp.status
+                        record_riot_call(endpoint, region, status, time.perf_counter() - started)
+                        if resp.status in RETRY_STATUS_CODES:
+                            raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status)
+                        if resp.status == 404:
+                            return None
+                        resp.raise_for_status()
+                        return await resp.json()
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if status is None:
+                        record_riot_call(endpoint, region, "error", time.perf_counter() - started)
+                    raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == retries:
+                logging.error(f"Error fetching {url}: {e}")
+                return None
+            await asyncio.sleep(backoff * attempt)
+
+##############################################################################
+# Fonctions d'accès à l'API Riot (appel synchrones via requests)
+##############################################################################
+
+def get_puuid(username, hashtag, cluster: str):
+    url = f"https://{cluster}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{username}/{hashtag}"
+    headers = riot_headers()
+    data = fetch_json(url, headers=headers)
+    return data.get('puuid') if data else None
+
+def get_summoner_rank_details_by_puuid(puuid: str, queue: str = "RANKED_SOLO_5x5", platform: str = "euw1"):
+    """Return detailed rank info for a specific queue using the PUUID directly."""
+    url = (
+        f"https://{platform}.api.riotgames.com/lol/league/v4/entries/by-puuid/"
+        f"{puuid}"
+    )
+    headers = riot_headers()
+    data = fetch_json(url, headers=headers)
+    if isinstance(data, list):
+        for entry in data:
+            if entry.get("queueType") == queue:
+                return {
+                    "tier": entry.get("tier"),
+                    "rank": entry.get("rank"),
+                    "lp": entry.get("leaguePoints"),
+                    "wins": entry.get("wins"),
+                    "losses": entry.get("losses"),
+                }
+    return None
+
+def get_last_match(puuid, nb_last_match, cluster: str, start: int = 0):
+    url = (
+        f"https://{cluster}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        f"?type=ranked&start={start}&count={nb_last_match}"
+    )
+    headers = riot_headers()
+    matches = fetch_json(url, headers=headers)
+    if isinstance(matches, list) and matches:
+        return matches
+    return None
+
+
+
+DDRAGON_VERSION_TTL = 3600  # seconds
+DDRAGON_VERSION_CACHE: list = [None, 0.0]  # [version, fetched_at]
+CHAMPION_MAPPING: dict[int, str] = {}
+
+
+def get_ddragon_latest_version() -> str:
+    """
+    Récupère la liste des versions Data Dragon depuis Riot,
+    et retourne la première (la plus récente)".
+    La version est gardée en cache DDRAGON_VERSION_TTL secondes.
+    """
+    cached_version, fetched_at = DDRAGON_VERSION_CACHE
+    fresh = bool(cached_version) and time.time() - fetched_at < DDRAGON_VERSION_TTL
+    metrics.record_cache("ddragon_version", fresh)
+    if fresh:
+        return cached_version
+
+    versions_url = "https://ddragon.leagueoflegends.com/api/versions.json"
+    versions = fetch_json(versions_url)
+    if isinstance(versions, list) and versions:
+        DDRAGON_VERSION_CACHE[:] = [versions[0], time.time()]
+        return versions[0]
+    logging.error("Failed to retrieve Data Dragon version: unexpected response.")
+    return cached_version or "25.11"
+
+
+def init_champion_mapping() -> None:
+    """
+    Utilise get_ddragon_latest_version() pour récupérer la dernière version,
+    puis charge le champ 'champion.json' correspondant, afin de remplir
+    CHAMPION_MAPPING = { int(key) : name } pour chaque champion.
+    """
+    version = get_ddragon_latest_version()
+
+    url_champs = f"https://ddragon.leagueoflegends.com/cdn/{version}/data/en_US/champion.json"
+    resp = fetch_json(url_champs)
+    data = resp.get("data", {}) if isinstance(resp, dict) else {}
+
+    CHAMPION_MAPPING.clear()
+    for champ_name, champ_info in data.items():
+        try:
+            champ_id_int = int(champ_info["key"])
+            CHAMPION_MAPPING[champ_id_int] = champ_info["id"]
+        except Exception:
+            continue
+
+
+def format_game_duration(game_duration_seconds: int) -> str:
+    """Durée de la partie au format mm:ss ou hh:mm:ss."""
+    if game_duration_seconds >= 3600:
+        return str(timedelta(seconds=game_duration_seconds))
+    minutes = game_duration_seconds // 60
+    seconds = game_duration_seconds % 60
+    return f"{minutes}:{seconds:02d}"
+
+
+def get_champion_image_url(champion_id: int | None, champion: str) -> str:
+    """URL de l'icône du champion sur Data Dragon."""
+    champ_slug = CHAMPION_MAPPING.get(champion_id, champion)
+    return (
+        f"https://ddragon.leagueoflegends.com/cdn/"
+        f"{get_ddragon_latest_version()}/img/champion/{champ_slug}.png"
+    )
+
+
+def summarize_match(match_data: dict, puuid: str) -> dict | None:
+    """
+    Résume un match classé (match/v5) pour un joueur, au format de la table
+    match_history (sans lp_change). Renvoie None si le match n'est pas en
+    Solo/Duo ou Flex, ou si le joueur n'y figure pas.
+    """
+    info = match_data.get("info", {}) if match_data else {}
+    queue_id = info.get("queueId")
+    if queue_id not in (420, 440):
+        return None
+
+    participants = info.get("participants", [])
+    for participant in participants:
+        if participant.get("puuid") == puuid:
+            duration = info.get("gameDuration", 0)
+            played_at = info.get("gameEndTimestamp") or (
+                info.get("gameCreation", 0) + duration * 1000
+            )
+            return {
+                "match_id": match_data.get("metadata", {}).get("matchId"),
+                "queue_id": queue_id,
+                "win": bool(participant.get("win")),
+                "champion": participant.get("championName", ""),
+                "champion_id": participant.get("championId"),
+                "kills": participant.get("kills", 0),
+                "deaths": participant.get("deaths", 0),
+                "assists": participant.get("assists", 0),
+                "damage": participant.get("totalDamageDealtToChampions", 0),
+                "duration": duration,
+                "lp_change": None,
+                "early_surrender": any(p.get("gameEndedInEarlySurrender") for p in participants),
+                "played_at": played_at,
+            }
+    return None
+
+
+def get_match_summary(match_id: str, puuid: str, cluster: str) -> dict | None:
+    """Récupère un match et renvoie son résumé pour ``puuid`` (voir summarize_match)."""
+    if not match_id:
+        logging.error("No match ID provided.")
+        return None
+
+    url = f"https://{cluster}.api.riotgames.com/lol/match/v5/matches/{match_id}"
+    headers = riot_headers()
+    summary = summarize_match(fetch_json(url, headers=headers), puuid)
+    if summary and not summary["match_id"]:
+        summary["match_id"] = match_id
+    return summary
+
+
+def get_match_details(match_id: str, puuid: str, cluster: str):
+    """
+    Récupère les détails d'un match classé (.match/v5) pour un joueur donné (par son PUUID).
+    Construit aussi l’URL de l’image du champion en utilisant la version Data Dragon la plus récente.
+    """
+    summary = get_match_summary(match_id, puuid, cluster)
+    if not summary:
+        return None
+
+    return (
+        ":green_circle:" if summary["win"] else ":red_circle:",
+        summary["champion"],
+        summary["kills"],
+        summary["deaths"],
+        summary["assists"],
+        format_game_duration(summary["duration"]),
+        get_champion_image_url(summary["champion_id"], summary["champion"]),
+        summary["damage"],
+    )
+
+
+async def is_in_game(puuid: str, region: str, flex: bool = False) -> int | None:
+    """Retourne le championId si le joueur est actuellement en ranked.
+
+    L'API spectator peut fournir des parties Flex (queue 440) ou Solo/Duo
+    (queue 420). Certains comptes sont identifiés par ``puuid`` ou par
+    ``summonerId`` selon l'endpoint. Pour couvrir tous les cas, on vérifie
+    la présence des deux champs et on accepte les deux codes de file.
+
+    Le paramètre ``flex`` est conservé pour compatibilité mais n'influence
+    plus la détection.
+    """
+
+    url = (
+        f"https://{region}.api.riotgames.com/lol/spectator/v5/active-games/by-summoner/"
+        f"{puuid}"
+    )
+    headers = riot_headers()
+
+    data = await async_fetch_json(url, headers=headers)
+    if not data:
+        return None
+
+    queue_id = data.get("gameQueueConfigId")
+    if queue_id not in (420, 440):
+        return None
+
+    for participant in data.get("participants", []):
+        pid = participant.get("puuid") or participant.get("summonerId")
+        if pid == puuid:
+            return participant.get("championId")
+    return None
+
+###############################################################################
+# Wrappers asynchrones pour les appels bloquants
+###############################################################################
+async def async_is_in_game(puuid, region, flex: bool = False):
+    return await is_in_game(puuid, region, flex)
+
+async def async_get_last_match(puuid, nb_last_match, cluster, start: int = 0):
+    return await asyncio.to_thread(get_last_match, puuid, nb_last_match, cluster, start)
+
+async def async_get_match_details(match_id, puuid, cluster):
+    return await asyncio.to_thread(get_match_details, match_id, puuid, cluster)
+
+async def async_get_match_summary(match_id, puuid, cluster):
+    return await asyncio.to_thread(get_match_summary, match_id, puuid, cluster)
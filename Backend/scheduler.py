@@ -0,0 +1,120 @@
+"""
+Planificateur persistant des tâches de maintenance.
+
+Chaque tâche est une fonction asynchrone globale (un seul passage pour toutes
+les guildes) associée à une règle ``next_run(dernière exécution) -> échéance``.
+L'horodatage de la dernière exécution réussie est conservé en base
+(table ``scheduled_job``) : au démarrage, une tâche dont l'échéance est passée
+pendant que le bot était arrêté est rattrapée une fois, immédiatement.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+import metrics
+from fonction_bdd import get_job_last_run, set_job_last_run
+
+# Attente maximale entre deux vérifications (changements d'heure, veille...)
+MAX_SLEEP = 3600
+# Délai avant une nouvelle tentative après un échec
+DEFAULT_RETRY_DELAY = 300
+
+
+def every(interval: timedelta) -> Callable[[datetime], datetime]:
+    """Règle « à intervalle fixe après la dernière exécution »."""
+    return lambda last_run: last_run + interval
+
+
+class Job:
+    def __init__(self, name: str, next_run: Callable[[datetime], datetime],
+                 func: Callable[[], Awaitable[None]], run_on_first_start: bool = False,
+                 retry_delay: float = DEFAULT_RETRY_DELAY):
+        self.name = name
+        self.next_run = next_run
+        self.func = func
+        self.run_on_first_start = run_on_first_start
+        self.retry_delay = retry_delay
+
+
+class JobScheduler:
+    """Tâches enregistrées et boucles asyncio qui les exécutent à échéance."""
+
+    def __init__(self, now: Callable[[], datetime] = lambda: datetime.now(timezone.utc)):
+        self._now = now
+        self._jobs: dict[str, Job] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._started = False
+
+    def add_job(self, name: str, next_run: Callable[[datetime], datetime],
+                func: Callable[[], Awaitable[None]], run_on_first_start: bool = False,
+                retry_delay: float = DEFAULT_RETRY_DELAY) -> Job:
+        """
+        Enregistre (ou remplace) une tâche. Sans exécution connue, elle est
+        lancée au démarrage si ``run_on_first_start``, sinon à sa prochaine
+        échéance.
+        """
+        job = Job(name, next_run, func, run_on_first_start, retry_delay)
+        self._jobs[name] = job
+        if self._started and name not in self._tasks:
+            self._tasks[name] = asyncio.create_task(self._job_loop(job))
+        return job
+
+    def start(self) -> None:
+        """Démarre une boucle par tâche ; sans effet si déjà démarré."""
+        if self._started:
+            return
+        self._started = True
+        for name, job in self._jobs.items():
+            self._tasks[name] = asyncio.create_task(self._job_loop(job))
+
+    def next_due(self, name: str) -> datetime:
+        """Prochaine échéance d'une tâche d'après sa dernière exécution enregistrée."""
+        job = self._jobs[name]
+        now = self._now()
+        last_run = get_job_last_run(name)
+        if last_run is None:
+            if job.run_on_first_start:
+                return now
+            # Première mise en service : on part de maintenant, sans rattrapage
+            set_job_last_run(name, now.timestamp())
+            return job.next_run(now)
+        return job.next_run(datetime.fromtimestamp(last_run, timezone.utc))
+
+    async def run_job(self, name: str) -> bool:
+        """Exécute une tâche et enregistre l'exécution si elle réussit."""
+        job = self._jobs[name]
+        started = self._now()
+        try:
+            with metrics.loop_duration.time(loop=name):
+                await job.func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"[scheduler] Job {name} failed: {e}", exc_info=True)
+            return False
+        set_job_last_run(name, started.timestamp())
+        return True
+
+    async def run_due(self) -> list[str]:
+        """Exécute une fois chaque tâche échue et renvoie leurs noms."""
+        ran = []
+        for name in list(self._jobs):
+            if self.next_due(name) <= self._now():
+                await self.run_job(name)
+                ran.append(name)
+        return ran
+
+    async def _job_loop(self, job: Job):
+        while True:
+            delay = (self.next_due(job.name) - self._now()).total_seconds()
+            if delay > 0:
+                await asyncio.sleep(min(delay, MAX_SLEEP))
+                continue
+            if delay < -60:
+                logging.info(f"[scheduler] Catching up missed run of {job.name}")
+            if not await self.run_job(job.name):
+                await asyncio.sleep(job.retry_delay)
+
+
+job_scheduler = JobScheduler()
@@ -0,0 +1,127 @@
+"""
+Démarrage unique du bot et supervision des tâches de fond.
+
+``on_ready`` est rappelé après chaque reconnexion à la gateway. Le démarrage
+(migrations, chargement Data Dragon, synchronisation des commandes, tâches
+planifiées) ne s'exécute qu'au premier appel ; les suivants ne font rien.
+
+Chaque tâche de fond est lancée une seule fois par ``ServiceSupervisor`` sous
+un nom : si elle plante (ou se termine), elle est relancée après un délai qui
+double à chaque échec rapproché, jusqu'à MAX_RESTART_DELAY.
+
+Les commandes ne sont synchronisées avec Discord que si leur empreinte
+(définitions sérialisées) diffère de celle enregistrée au dernier
+``tree.sync()`` pour cette application.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable
+
+from discord import app_commands
+
+import metrics
+from fonction_bdd import get_bot_state, set_bot_state
+
+# Délai avant la première relance d'une tâche tombée, et plafond
+DEFAULT_RESTART_DELAY = 5.0
+MAX_RESTART_DELAY = 300.0
+# Durée de fonctionnement après laquelle le délai de relance est réinitialisé
+STABLE_AFTER = 600.0
+
+service_restarts = metrics.registry.counter(
+    "service_restarts_total", "Background service restarts after a crash or exit", ("service",))
+
+
+class ServiceSupervisor:
+    """Tâches de fond nommées, lancées une fois et relancées si elles tombent."""
+
+    def __init__(self, restart_delay: float = DEFAULT_RESTART_DELAY,
+                 max_restart_delay: float = MAX_RESTART_DELAY):
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.restarts: dict[str, int] = {}
+
+    def start(self, name: str, factory: Callable[[], Awaitable[None]]) -> bool:
+        """Lance ``factory()`` sous supervision ; renvoie False s'il tourne déjà."""
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            return False
+        self.restarts.setdefault(name, 0)
+        self._tasks[name] = asyncio.create_task(self._supervise(name, factory), name=name)
+        return True
+
+    def running(self) -> list[str]:
+        return [name for name, task in self._tasks.items() if not task.done()]
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _supervise(self, name: str, factory: Callable[[], Awaitable[None]]):
+        delay = self.restart_delay
+        while True:
+            started = time.monotonic()
+            try:
+                await factory()
+                logging.warning(f"[startup] Service {name} exited, restarting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"[startup] Service {name} crashed: {e}", exc_info=True)
+            if time.monotonic() - started >= STABLE_AFTER:
+                delay = self.restart_delay
+            self.restarts[name] += 1
+            service_restarts.inc(service=name)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_restart_delay)
+
+
+def command_tree_hash(tree: app_commands.CommandTree) -> str:
+    """Empreinte des commandes globales telles qu'envoyées à Discord."""
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands()),
+                     key=lambda command: command["name"])
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+async def sync_commands_if_changed(tree: app_commands.CommandTree, application_id) -> bool:
+    """``tree.sync()`` seulement si les définitions ont changé ; renvoie True si synchronisé."""
+    key = f"command_hash:{application_id}"
+    digest = command_tree_hash(tree)
+    if await asyncio.to_thread(get_bot_state, key) == digest:
+        logging.info("[startup] Commands unchanged, skipping sync")
+        return False
+    await tree.sync()
+    await asyncio.to_thread(set_bot_state, key, digest)
+    logging.info("[startup] Commands synced")
+    return True
+
+
+class Startup:
+    """Exécute ``steps`` une seule fois, même si ``run`` est appelé à chaque on_ready."""
+
+    def __init__(self, steps: Callable[[], Awaitable[None]]):
+        self._steps = steps
+        self._lock = asyncio.Lock()
+        self.done = False
+        self.ready_count = 0
+
+    async def run(self) -> bool:
+        """Renvoie True si ce passage a effectué le démarrage."""
+        self.ready_count += 1
+        async with self._lock:
+            if self.done:
+                logging.info(f"[startup] Gateway ready again (#{self.ready_count}), nothing to start")
+                return False
+            started = time.perf_counter()
+            await self._steps()
+            self.done = True
+            logging.info(f"[startup] Startup completed in {time.perf_counter() - started:.2f}s")
+            return True
@@ -0,0 +1,237 @@
+"""
+Interface de persistance du bot et sélection du backend.
+
+Toutes les opérations exposées par ``fonction_bdd`` passent par un objet
+``Storage``. Deux implémentations sont fournies :
+
+- ``SQLiteStorage`` (storage_sqlite.py) : base SQLite sur disque, par défaut ;
+- ``MemoryStorage`` (storage_memory.py) : structures Python en mémoire, sans
+  aucune I/O disque, pour les tests et les benchmarks.
+
+Le backend est choisi par les variables d'environnement ``STORAGE_BACKEND``
+(``sqlite`` ou ``memory``) et ``DB_PATH`` (chemin du fichier SQLite, par
+défaut ``Backend/database.db`` quel que soit le répertoire courant).
+"""
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+DEFAULT_DB_PATH = str(Path(__file__).resolve().parent / "database.db")
+
+# Colonnes d'une ligne de match_history, dans l'ordre des dicts renvoyés
+MATCH_HISTORY_COLUMNS = (
+    "match_id", "queue_id", "win", "champion", "champion_id",
+    "kills", "deaths", "assists", "damage", "duration",
+    "lp_change", "early_surrender", "played_at",
+)
+
+# Colonnes des lignes d'agrégat de recap (get_recap_aggregate), delta = gain de
+# LP sur la période du recap ; games / wins : parties classées de la période
+RECAP_ROW_COLUMNS = (
+    "username", "tier", "rank", "lp", "delta", "lp_24h", "lp_7d", "games", "wins",
+)
+
+# Durée couverte par un recap, pour compter les parties jouées
+RECAP_PERIOD_SECONDS = {"daily": 86400, "weekly": 7 * 86400}
+
+# Entrées gardées dans le flux des changements (change_feed)
+CHANGE_FEED_RETENTION = 1000
+
+
+class Storage(ABC):
+    """
+    Opérations de persistance utilisées par le bot.
+
+    Les lignes renvoyées sont des tuples au format historique des requêtes
+    SQL (voir les docstrings de ``fonction_bdd``), quel que soit le backend.
+    """
+
+    def initialize(self) -> None:
+        """Crée ou migre le schéma si nécessaire."""
+
+    # ----- Guildes -----
+
+    @abstractmethod
+    def get_all_guild_ids(self) -> list[int]: ...
+
+    @abstractmethod
+    def is_recap_enabled(self, guild_id: int, period: str) -> bool: ...
+
+    @abstractmethod
+    def set_recap_mode(self, guild_id: int, period: str, enabled: bool) -> None: ...
+
+    @abstractmethod
+    def get_recap_slot(self, guild_id: int) -> int | None: ...
+
+    @abstractmethod
+    def set_recap_slot(self, guild_id: int, minutes: int | None) -> None: ...
+
+    @abstractmethod
+    def insert_guild(self, guild_id: int, leaderboard_channel_id: int | None,
+                     flex_enabled: int | None = 0) -> None: ...
+
+    @abstractmethod
+    def set_guild_flex_mode(self, guild_id: int, enabled: bool) -> None: ...
+
+    @abstractmethod
+    def get_guild(self, guild_id: int): ...
+
+    # ----- Joueurs -----
+
+    @abstractmethod
+    def insert_player(self, puuid: str, username: str, tier: str, rank: str, lp: int,
+                      region: str, flex_tier: str = None, flex_rank: str = None,
+                      flex_lp: int = None) -> None: ...
+
+    @abstractmethod
+    def update_player_global(self, puuid: str, tier: str = None, rank: str = None,
+                             lp: int = None, lp_change: int = None, username: str = None,
+                             region: str = None, flex_tier: str = None,
+                             flex_rank: str = None, flex_lp: int = None) -> None: ...
+
+    @abstractmethod
+    def import_players(self, guild_id: int, channel_id: int, players: list[dict]) -> list[str]: ...
+
+    @abstractmethod
+    def rename_players(self, renames: list[tuple[str, str]]) -> None: ...
+
+    @abstractmethod
+    def count_players(self) -> int: ...
+
+    @abstractmethod
+    def get_player(self, puuid: str, guild_id: int): ...
+
+    @abstractmethod
+    def get_all_players(self): ...
+
+    @abstractmethod
+    def get_player_by_username(self, username: str, guild_id: int = None): ...
+
+    @abstractmethod
+    def get_guild_usernames(self, guild_id: int): ...
+
+    # ----- Liaisons joueur ↔ guilde -----
+
+    @abstractmethod
+    def insert_player_guild(self, puuid: str, guild_id: int, channel_id: int,
+                            last_match_id: str = None) -> None: ...
+
+    @abstractmethod
+    def update_player_guild(self, puuid: str, guild_id: int, channel_id: int = None,
+                            last_match_id: str = None) -> None: ...
+
+    @abstractmethod
+    def delete_player(self, puuid: str, guild_id: int) -> None: ...
+
+    # ----- Leaderboards -----
+
+    @abstractmethod
+    def get_leaderboard_by_guild(self, guild_id: int) -> int | None: ...
+
+    @abstractmethod
+    def insert_leaderboard(self, guild_id: int) -> int: ...
+
+    @abstractmethod
+    def delete_leaderboard(self, guild_id: int) -> None: ...
+
+    @abstractmethod
+    def insert_leaderboard_member(self, leaderboard_id: int, player_puuid: str) -> None: ...
+
+    @abstractmethod
+    def delete_leaderboard_member(self, leaderboard_id: int, player_puuid: str) -> None: ...
+
+    @abstractmethod
+    def get_leaderboard_data(self, leaderboard_id: int, guild_id: int,
+                             limit: int | None = None): ...
+
+    @abstractmethod
+    def get_leaderboard_pages(self, leaderboard_id: int) -> list[tuple[int, int, str | None]]: ...
+
+    @abstractmethod
+    def set_leaderboard_page(self, leaderboard_id: int, page: int, message_id: int,
+                             content_hash: str | None) -> None: ...
+
+    @abstractmethod
+    def delete_leaderboard_pages(self, leaderboard_id: int, from_page: int = 0) -> None: ...
+
+    # ----- Remises à zéro et recaps -----
+
+    @abstractmethod
+    def reset_lp_for_period(self, period: str) -> list[int]: ...
+
+    @abstractmethod
+    def get_unsent_recap_snapshots(self, period: str | None = None): ...
+
+    @abstractmethod
+    def get_recap_aggregate(self, snapshot_id: int) -> dict | None: ...
+
+    @abstractmethod
+    def mark_recap_snapshot_sent(self, snapshot_id: int) -> None: ...
+
+    # ----- Historique des matchs -----
+
+    @abstractmethod
+    def insert_match_history(self, puuid: str, matches: list[dict]) -> None: ...
+
+    @abstractmethod
+    def get_match_history(self, puuid: str, limit: int = 10, offset: int = 0) -> list[dict]: ...
+
+    @abstractmethod
+    def get_known_match_ids(self, puuid: str, match_ids: list[str]) -> set[str]: ...
+
+    # ----- Tâches planifiées -----
+
+    @abstractmethod
+    def get_job_last_run(self, name: str) -> float | None: ...
+
+    @abstractmethod
+    def set_job_last_run(self, name: str, timestamp: float) -> None: ...
+
+    # ----- État du bot -----
+
+    @abstractmethod
+    def get_bot_state(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    def set_bot_state(self, key: str, value: str) -> None: ...
+
+    # ----- Flux des changements -----
+
+    @abstractmethod
+    def append_change(self, kind: str, payload: str, created_at: float,
+                      retention: int = CHANGE_FEED_RETENTION) -> int: ...
+
+
+def get_db_path() -> str:
+    """Chemin du fichier SQLite configuré (lu à l'appel, après load_dotenv)."""
+    return os.getenv("DB_PATH", "").strip() or DEFAULT_DB_PATH
+
+
+def create_storage(backend: str | None = None, db_path: str | None = None) -> Storage:
+    """Instancie le backend demandé (par défaut celui de la configuration)."""
+    backend = (backend or os.getenv("STORAGE_BACKEND", "").strip() or "sqlite").lower()
+    if backend == "memory":
+        from storage_memory import MemoryStorage
+        return MemoryStorage()
+    if backend == "sqlite":
+        from storage_sqlite import SQLiteStorage
+        return SQLiteStorage(db_path or get_db_path())
+    raise ValueError(f"Unknown storage backend: {backend!r}")
+
+
+_storage: Storage | None = None
+
+
+def get_storage() -> Storage:
+    """Renvoie le backend courant, créé à la première utilisation."""
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage: Storage | None) -> Storage | None:
+    """Remplace le backend courant et renvoie le précédent (tests, benchmarks)."""
+    global _storage
+    previous, _storage = _storage, storage
+    return previous
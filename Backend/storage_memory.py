@@ -0,0 +1,437 @@
+import threading
+import time
+
+from rank_math import ladder_score
+from storage import (
+    CHANGE_FEED_RETENTION,
+    MATCH_HISTORY_COLUMNS,
+    RECAP_PERIOD_SECONDS,
+    RECAP_ROW_COLUMNS,
+    Storage,
+)
+
+
+class MemoryStorage(Storage):
+    """
+    Backend entièrement en mémoire (dicts Python, aucune I/O disque).
+
+    Reproduit la sémantique des requêtes de ``SQLiteStorage`` (formats de
+    lignes, tris, atomicité des remises à zéro) mais n'applique pas les
+    contraintes de clés étrangères. Les données sont perdues à l'arrêt.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._guilds: dict[int, dict] = {}
+        self._players: dict[str, dict] = {}
+        # (puuid, guild_id) -> {"channel_id": ..., "last_match_id": ...}
+        self._player_guilds: dict[tuple[str, int], dict] = {}
+        # leaderboard_id -> guild_id ; leaderboard_id -> {puuid: None} (ensemble ordonné)
+        self._leaderboards: dict[int, int] = {}
+        self._leaderboard_players: dict[int, dict[str, None]] = {}
+        self._leaderboard_pages: dict[int, dict[int, tuple[int, str | None]]] = {}
+        self._next_leaderboard_id = 1
+        self._recap_snapshots: dict[int, dict] = {}
+        self._recap_rows: dict[int, list[tuple]] = {}
+        self._next_snapshot_id = 1
+        # puuid -> {match_id: dict}
+        self._match_history: dict[str, dict[str, dict]] = {}
+        self._job_runs: dict[str, float] = {}
+        self._bot_state: dict[str, str] = {}
+        # [(id, kind, payload, created_at)] par id croissant
+        self._changes: list[tuple[int, str, str, float]] = []
+        self._next_change_id = 1
+
+    # ----- Helpers -----
+
+    def _player_row(self, puuid: str, guild_id: int):
+        p = self._players[puuid]
+        pg = self._player_guilds[(puuid, guild_id)]
+        return (
+            puuid, p["username"],
+            guild_id, pg["channel_id"], p["region"], pg["last_match_id"],
+            p["tier"], p["rank"], p["lp"], p["lp_24h"], p["lp_7d"],
+            p["flex_tier"], p["flex_rank"], p["flex_lp"],
+        )
+
+    @staticmethod
+    def _score_key(player: dict):
+        return (player["score"] is None, -(player["score"] or 0))
+
+    # ----- Guildes -----
+
+    def get_all_guild_ids(self) -> list[int]:
+        with self._lock:
+            return list(self._guilds)
+
+    def is_recap_enabled(self, guild_id: int, period: str) -> bool:
+        column = "daily_recap_enabled" if period == "daily" else "weekly_recap_enabled"
+        with self._lock:
+            guild = self._guilds.get(guild_id)
+            return bool(guild and guild[column])
+
+    def set_recap_mode(self, guild_id: int, period: str, enabled: bool) -> None:
+        column = "daily_recap_enabled" if period == "daily" else "weekly_recap_enabled"
+        with self._lock:
+            self._ensure_guild(guild_id)[column] = 1 if enabled else 0
+
+    def _ensure_guild(self, guild_id: int, leaderboard_channel_id=None, flex_enabled=0) -> dict:
+        return self._guilds.setdefault(guild_id, {
+            "leaderboard_channel_id": leaderboard_channel_id,
+            "flex_enabled": flex_enabled or 0,
+            "daily_recap_enabled": 0,
+            "weekly_recap_enabled": 0,
+            "recap_slot": None,
+        })
+
+    def get_recap_slot(self, guild_id: int) -> int | None:
+        with self._lock:
+            guild = self._guilds.get(guild_id)
+            return guild["recap_slot"] if guild else None
+
+    def set_recap_slot(self, guild_id: int, minutes: int | None) -> None:
+        with self._lock:
+            self._ensure_guild(guild_id)["recap_slot"] = minutes
+
+    def insert_guild(self, guild_id: int, leaderboard_channel_id: int | None,
+                     flex_enabled: int | None = 0) -> None:
+        with self._lock:
+            guild = self._ensure_guild(guild_id, leaderboard_channel_id, flex_enabled)
+            if leaderboard_channel_id is not None:
+                guild["leaderboard_channel_id"] = leaderboard_channel_id
+            if flex_enabled is not None:
+                guild["flex_enabled"] = flex_enabled
+
+    def set_guild_flex_mode(self, guild_id: int, enabled: bool) -> None:
+        with self._lock:
+            if guild_id in self._guilds:
+                self._guilds[guild_id]["flex_enabled"] = 1 if enabled else 0
+
+    def get_guild(self, guild_id: int):
+        with self._lock:
+            guild = self._guilds.get(guild_id)
+            if guild is None:
+                return None
+            return guild_id, guild["leaderboard_channel_id"], guild["flex_enabled"]
+
+    # ----- Joueurs -----
+
+    def insert_player(self, puuid: str, username: str, tier: str, rank: str, lp: int,
+                      region: str, flex_tier: str = None, flex_rank: str = None,
+                      flex_lp: int = None) -> None:
+        with self._lock:
+            player = self._players.setdefault(puuid, {"lp_24h": 0, "lp_7d": 0})
+            player.update(
+                username=username, tier=tier, rank=rank, lp=lp, region=region,
+                flex_tier=flex_tier, flex_rank=flex_rank, flex_lp=flex_lp,
+                score=ladder_score(rank, tier, lp),
+                flex_score=ladder_score(flex_rank, flex_tier, flex_lp),
+            )
+
+    def import_players(self, guild_id: int, channel_id: int, players: list[dict]) -> list[str]:
+        with self._lock:
+            self._ensure_guild(guild_id)
+            added = []
+            for p in players:
+                self.insert_player(
+                    p["puuid"], p["username"], p["tier"], p["rank"], p["lp"], p["region"],
+                    p.get("flex_tier"), p.get("flex_rank"), p.get("flex_lp"),
+                )
+                if (p["puuid"], guild_id) not in self._player_guilds:
+                    self.insert_player_guild(p["puuid"], guild_id, channel_id, p.get("last_match_id"))
+                    added.append(p["puuid"])
+            return added
+
+    def rename_players(self, renames: list[tuple[str, str]]) -> None:
+        with self._lock:
+            for puuid, username in renames:
+                if puuid in self._players:
+                    self._players[puuid]["username"] = username
+
+    def update_player_global(self, puuid: str, tier: str = None, rank: str = None,
+                             lp: int = None, lp_change: int = None, username: str = None,
+                             region: str = None, flex_tier: str = None,
+                             flex_rank: str = None, flex_lp: int = None) -> None:
+        fields = {
+            "username": username, "tier": tier, "rank": rank, "lp": lp, "region": region,
+            "flex_tier": flex_tier, "flex_rank": flex_rank, "flex_lp": flex_lp,
+        }
+        with self._lock:
+            player = self._players.get(puuid)
+            if player is None:
+                return
+            player.update({k: v for k, v in fields.items() if v is not None})
+            if lp_change is not None:
+                player["lp_24h"] = (player["lp_24h"] or 0) + lp_change
+                player["lp_7d"] = (player["lp_7d"] or 0) + lp_change
+            player["score"] = ladder_score(player["rank"], player["tier"], player["lp"])
+            player["flex_score"] = ladder_score(
+                player["flex_rank"], player["flex_tier"], player["flex_lp"]
+            )
+
+    def count_players(self) -> int:
+        with self._lock:
+            return len(self._players)
+
+    def get_player(self, puuid: str, guild_id: int):
+        with self._lock:
+            if (puuid, guild_id) not in self._player_guilds or puuid not in self._players:
+                return None
+            return self._player_row(puuid, guild_id)
+
+    def get_all_players(self):
+        with self._lock:
+            return [
+                self._player_row(puuid, guild_id)
+                for puuid, guild_id in self._player_guilds
+                if puuid in self._players
+            ]
+
+    def get_player_by_username(self, username: str, guild_id: int = None):
+        with self._lock:
+            for puuid, player in self._players.items():
+                if player["username"] != username:
+                    continue
+                if guild_id is None:
+                    return puuid, username, player["region"]
+                if (puuid, guild_id) in self._player_guilds:
+                    return self._player_row(puuid, guild_id)
+            return None
+
+    def get_guild_usernames(self, guild_id: int):
+        with self._lock:
+            return [
+                (puuid, self._players[puuid]["username"])
+                for puuid, g_id in self._player_guilds
+                if g_id == guild_id and puuid in self._players
+            ]
+
+    # ----- Liaisons joueur ↔ guilde -----
+
+    def insert_player_guild(self, puuid: str, guild_id: int, channel_id: int,
+                            last_match_id: str = None) -> None:
+        with self._lock:
+            self._player_guilds.pop((puuid, guild_id), None)
+            self._player_guilds[(puuid, guild_id)] = {
+                "channel_id": channel_id,
+                "last_match_id": last_match_id,
+            }
+
+    def update_player_guild(self, puuid: str, guild_id: int, channel_id: int = None,
+                            last_match_id: str = None) -> None:
+        with self._lock:
+            link = self._player_guilds.get((puuid, guild_id))
+            if link is None:
+                return
+            if channel_id is not None:
+                link["channel_id"] = channel_id
+            if last_match_id is not None:
+                link["last_match_id"] = last_match_id
+
+    def delete_player(self, puuid: str, guild_id: int) -> None:
+        with self._lock:
+            self._player_guilds.pop((puuid, guild_id), None)
+
+    # ----- Leaderboards -----
+
+    def get_leaderboard_by_guild(self, guild_id: int) -> int | None:
+        with self._lock:
+            for lb_id, g_id in self._leaderboards.items():
+                if g_id == guild_id:
+                    return lb_id
+            return None
+
+    def insert_leaderboard(self, guild_id: int) -> int:
+        with self._lock:
+            lb_id = self._next_leaderboard_id
+            self._next_leaderboard_id += 1
+            self._leaderboards[lb_id] = guild_id
+            self._leaderboard_players[lb_id] = {}
+            return lb_id
+
+    def delete_leaderboard(self, guild_id: int) -> None:
+        with self._lock:
+            for lb_id in [i for i, g_id in self._leaderboards.items() if g_id == guild_id]:
+                del self._leaderboards[lb_id]
+                self._leaderboard_players.pop(lb_id, None)
+                self._leaderboard_pages.pop(lb_id, None)
+            if guild_id in self._guilds:
+                self._guilds[guild_id]["leaderboard_channel_id"] = None
+
+    def insert_leaderboard_member(self, leaderboard_id: int, player_puuid: str) -> None:
+        with self._lock:
+            self._leaderboard_players.setdefault(leaderboard_id, {})[player_puuid] = None
+
+    def delete_leaderboard_member(self, leaderboard_id: int, player_puuid: str) -> None:
+        with self._lock:
+            self._leaderboard_players.get(leaderboard_id, {}).pop(player_puuid, None)
+
+    def _leaderboard_players_sorted(self, leaderboard_id: int) -> list[dict]:
+        players = [
+            self._players[puuid]
+            for puuid in self._leaderboard_players.get(leaderboard_id, {})
+            if puuid in self._players
+        ]
+        return sorted(players, key=self._score_key)
+
+    def get_leaderboard_data(self, leaderboard_id: int, guild_id: int,
+                             limit: int | None = None):
+        with self._lock:
+            if self._leaderboards.get(leaderboard_id) != guild_id:
+                return []
+            rows = [
+                (p["username"], p["tier"], p["rank"], p["lp"], p["lp_24h"], p["lp_7d"])
+                for p in self._leaderboard_players_sorted(leaderboard_id)
+            ]
+            return rows if limit is None else rows[:limit]
+
+    def get_leaderboard_pages(self, leaderboard_id: int) -> list[tuple[int, int, str | None]]:
+        with self._lock:
+            pages = self._leaderboard_pages.get(leaderboard_id, {})
+            return [(page, *pages[page]) for page in sorted(pages)]
+
+    def set_leaderboard_page(self, leaderboard_id: int, page: int, message_id: int,
+                             content_hash: str | None) -> None:
+        with self._lock:
+            if leaderboard_id in self._leaderboards:
+                self._leaderboard_pages.setdefault(leaderboard_id, {})[page] = (message_id, content_hash)
+
+    def delete_leaderboard_pages(self, leaderboard_id: int, from_page: int = 0) -> None:
+        with self._lock:
+            pages = self._leaderboard_pages.get(leaderboard_id, {})
+            for page in [p for p in pages if p >= from_page]:
+                del pages[page]
+
+    # ----- Remises à zéro et recaps -----
+
+    def reset_lp_for_period(self, period: str) -> list[int]:
+        lp_column = "lp_24h" if period == "daily" else "lp_7d"
+        recap_column = "daily_recap_enabled" if period == "daily" else "weekly_recap_enabled"
+        with self._lock:
+            snapshot_ids = []
+            since_ms = int((time.time() - RECAP_PERIOD_SECONDS[period]) * 1000)
+            for guild_id, guild in self._guilds.items():
+                if not guild[recap_column]:
+                    continue
+                lb_id = self.get_leaderboard_by_guild(guild_id)
+                puuids = [
+                    puuid for puuid in self._leaderboard_players.get(lb_id, {})
+                    if puuid in self._players
+                ] if lb_id is not None else []
+                if not puuids:
+                    continue
+                puuids.sort(key=lambda puuid: self._score_key(self._players[puuid]))
+                snapshot_id = self._next_snapshot_id
+                self._next_snapshot_id += 1
+                self._recap_snapshots[snapshot_id] = {
+                    "guild_id": guild_id, "period": period, "sent": False,
+                }
+                rows = []
+                for puuid in puuids:
+                    p = self._players[puuid]
+                    played = [
+                        m for m in self._match_history.get(puuid, {}).values()
+                        if m["played_at"] is not None and m["played_at"] >= since_ms
+                    ]
+                    rows.append((
+                        p["username"], p["tier"], p["rank"], p["lp"], p["lp_24h"], p["lp_7d"],
+                        len(played), sum(1 for m in played if m["win"]),
+                    ))
+                self._recap_rows[snapshot_id] = rows
+                snapshot_ids.append(snapshot_id)
+
+            for puuid in {puuid for puuid, _ in self._player_guilds}:
+                if puuid in self._players:
+                    self._players[puuid][lp_column] = 0
+            return snapshot_ids
+
+    def get_unsent_recap_snapshots(self, period: str | None = None):
+        with self._lock:
+            return [
+                (snapshot_id, s["guild_id"], s["period"])
+                for snapshot_id, s in self._recap_snapshots.items()
+                if not s["sent"] and (period is None or s["period"] == period)
+            ]
+
+    def get_recap_aggregate(self, snapshot_id: int) -> dict | None:
+        with self._lock:
+            snapshot = self._recap_snapshots.get(snapshot_id)
+            if snapshot is None:
+                return None
+            players = []
+            for username, tier, rank, lp, lp_24h, lp_7d, games, wins in self._recap_rows.get(snapshot_id, []):
+                delta = (lp_24h if snapshot["period"] == "daily" else lp_7d) or 0
+                players.append(dict(zip(RECAP_ROW_COLUMNS, (
+                    username, tier, rank, lp, delta, lp_24h, lp_7d, games, wins,
+                ))))
+            players.sort(key=lambda p: -p["delta"])
+            return {
+                "snapshot_id": snapshot_id,
+                "guild_id": snapshot["guild_id"],
+                "period": snapshot["period"],
+                "players": players,
+            }
+
+    def mark_recap_snapshot_sent(self, snapshot_id: int) -> None:
+        with self._lock:
+            if snapshot_id in self._recap_snapshots:
+                self._recap_snapshots[snapshot_id]["sent"] = True
+
+    # ----- Historique des matchs -----
+
+    def insert_match_history(self, puuid: str, matches: list[dict]) -> None:
+        with self._lock:
+            history = self._match_history.setdefault(puuid, {})
+            for match in matches:
+                entry = {col: match.get(col) for col in MATCH_HISTORY_COLUMNS}
+                known = history.get(entry["match_id"])
+                if known is not None:
+                    known["early_surrender"] = entry["early_surrender"]
+                    if entry["lp_change"] is not None:
+                        known["lp_change"] = entry["lp_change"]
+                else:
+                    history[entry["match_id"]] = entry
+
+    def get_match_history(self, puuid: str, limit: int = 10, offset: int = 0) -> list[dict]:
+        with self._lock:
+            matches = sorted(
+                self._match_history.get(puuid, {}).values(),
+                key=lambda m: (m["played_at"] is None, -(m["played_at"] or 0)),
+            )
+            return [dict(m) for m in matches[offset:offset + limit]]
+
+    def get_known_match_ids(self, puuid: str, match_ids: list[str]) -> set[str]:
+        with self._lock:
+            history = self._match_history.get(puuid, {})
+            return {match_id for match_id in match_ids if match_id in history}
+
+    # ----- Tâches planifiées -----
+
+    def get_job_last_run(self, name: str) -> float | None:
+        with self._lock:
+            return self._job_runs.get(name)
+
+    def set_job_last_run(self, name: str, timestamp: float) -> None:
+        with self._lock:
+            self._job_runs[name] = timestamp
+
+    # ----- État du bot -----
+
+    def get_bot_state(self, key: str) -> str | None:
+        with self._lock:
+            return self._bot_state.get(key)
+
+    def set_bot_state(self, key: str, value: str) -> None:
+        with self._lock:
+            self._bot_state[key] = value
+
+    # ----- Flux des changements -----
+
+    def append_change(self, kind: str, payload: str, created_at: float,
+                      retention: int = CHANGE_FEED_RETENTION) -> int:
+        with self._lock:
+            change_id = self._next_change_id
+            self._next_change_id += 1
+            self._changes.append((change_id, kind, payload, created_at))
+            del self._changes[:-retention]
+            return change_id
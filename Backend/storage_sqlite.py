@@ -0,0 +1,797 @@
+import sqlite3
+import time
+
+import metrics
+from create_db import create_db
+from rank_math import ladder_score
+from storage import (
+    CHANGE_FEED_RETENTION,
+    MATCH_HISTORY_COLUMNS,
+    RECAP_PERIOD_SECONDS,
+    RECAP_ROW_COLUMNS,
+    Storage,
+)
+
+
+class _TimedConnection(sqlite3.Connection):
+    """Connexion qui mesure sa durée de vie (une opération) à la fermeture."""
+
+    op = "unknown"
+    opened_at = 0.0
+
+    def close(self):
+        super().close()
+        if self.opened_at:
+            metrics.db_connection.observe(time.perf_counter() - self.opened_at, op=self.op)
+            self.opened_at = 0.0
+
+
+class SQLiteStorage(Storage):
+    """Backend SQLite sur disque : une connexion courte par opération."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def connect(self, op: str = "unknown") -> sqlite3.Connection:
+        """Retourne une connexion SQLite avec les FK activées ; ``op`` étiquette sa métrique."""
+        conn = sqlite3.connect(self.db_path, factory=_TimedConnection)
+        conn.op = op
+        conn.opened_at = time.perf_counter()
+        conn.execute("PRAGMA foreign_keys = ON;")
+        conn.create_function("ladder_score", 3, ladder_score, deterministic=True)
+        return conn
+
+    def initialize(self) -> None:
+        create_db(self.db_path)
+
+    def get_all_guild_ids(self) -> list[int]:
+        conn = self.connect("get_all_guild_ids")
+        c = conn.cursor()
+        c.execute("SELECT guild_id FROM guild")
+        rows = c.fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    def is_recap_enabled(self, guild_id: int, period: str) -> bool:
+        column = "daily_recap_enabled" if period == "daily" else "weekly_recap_enabled"
+        conn = self.connect("is_recap_enabled")
+        c = conn.cursor()
+        c.execute(f"SELECT {column} FROM guild WHERE guild_id = ?", (guild_id,))
+        row = c.fetchone()
+        conn.close()
+        return bool(row and row[0])
+
+    def set_recap_mode(self, guild_id: int, period: str, enabled: bool) -> None:
+        column = "daily_recap_enabled" if period == "daily" else "weekly_recap_enabled"
+        conn = self.connect("set_recap_mode")
+        c = conn.cursor()
+        c.execute(
+            f"""
+            INSERT INTO guild(guild_id, {column})
+            VALUES(?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET {column}=excluded.{column}
+            """,
+            (guild_id, 1 if enabled else 0),
+        )
+        conn.commit()
+        conn.close()
+
+    def get_recap_slot(self, guild_id: int) -> int | None:
+        conn = self.connect("get_recap_slot")
+        c = conn.cursor()
+        c.execute("SELECT recap_slot FROM guild WHERE guild_id = ?", (guild_id,))
+        row = c.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def set_recap_slot(self, guild_id: int, minutes: int | None) -> None:
+        conn = self.connect("set_recap_slot")
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO guild(guild_id, recap_slot)
+            VALUES(?, ?)
+            ON CONFLICT(guild_id) DO UPDATE SET recap_slot=excluded.recap_slot
+            """,
+            (guild_id, minutes),
+        )
+        conn.commit()
+        conn.close()
+
+    def insert_player(self, puuid: str,
+                      username: str,
+                      tier: str,
+                      rank: str,
+                      lp: int,
+                      region: str,
+                      flex_tier: str = None,
+                      flex_rank: str = None,
+                      flex_lp: int = None):
+        conn = self.connect("insert_player")
+        c = conn.cursor()
+        self._upsert_player(c, puuid, username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp)
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _upsert_player(c, puuid, username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp):
+        # Insert initial si absent
+        c.execute(
+            """
+            INSERT OR IGNORE INTO player
+              (puuid, username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp, lp_24h, lp_7d, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+            """,
+            (puuid, username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp),
+        )
+        score = ladder_score(rank, tier, lp)
+        flex_score = ladder_score(flex_rank, flex_tier, flex_lp)
+        c.execute(
+            """
+            UPDATE player
+            SET username = ?,
+                tier = ?,
+                rank = ?,
+                lp = ?,
+                region = ?,
+                flex_tier = ?,
+                flex_rank = ?,
+                flex_lp = ?,
+                score = ?,
+                flex_score = ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE puuid = ?
+            """,
+            (username, tier, rank, lp, region, flex_tier, flex_rank, flex_lp, score, flex_score, puuid),
+        )
+
+    def import_players(self, guild_id: int, channel_id: int, players: list[dict]) -> list[str]:
+        conn = self.connect("import_players")
+        try:
+            with conn:
+                c = conn.cursor()
+                c.execute("INSERT OR IGNORE INTO guild (guild_id, flex_enabled) VALUES (?, 0)", (guild_id,))
+                added = []
+                for p in players:
+                    self._upsert_player(
+                        c, p["puuid"], p["username"], p["tier"], p["rank"], p["lp"], p["region"],
+                        p.get("flex_tier"), p.get("flex_rank"), p.get("flex_lp"),
+                    )
+                    c.execute(
+                        """
+                        INSERT OR IGNORE INTO player_guild
+                          (player_puuid, guild_id, channel_id, last_match_id)
+                        VALUES (?, ?, ?, ?)
+                        """,
+                        (p["puuid"], guild_id, channel_id, p.get("last_match_id")),
+                    )
+                    if c.rowcount:
+                        added.append(p["puuid"])
+        finally:
+            conn.close()
+        return added
+
+    def rename_players(self, renames: list[tuple[str, str]]) -> None:
+        if not renames:
+            return
+        conn = self.connect("rename_players")
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE player SET username = ?, updated_at = CURRENT_TIMESTAMP WHERE puuid = ?",
+                    [(username, puuid) for puuid, username in renames],
+                )
+        finally:
+            conn.close()
+
+    def update_player_global(self, puuid: str,
+                             tier: str = None,
+                             rank: str = None,
+                             lp: int = None,
+                             lp_change: int = None,
+                             username: str = None,
+                             region: str = None,
+                             flex_tier: str = None,
+                             flex_rank: str = None,
+                             flex_lp: int = None):
+        updates = []
+        params = []
+
+        if username is not None:
+            updates.append("username = ?")
+            params.append(username)
+        if tier is not None:
+            updates.append("tier = ?")
+            params.append(tier)
+        if rank is not None:
+            updates.append("rank = ?")
+            params.append(rank)
+        if lp is not None:
+            updates.append("lp = ?")
+            params.append(lp)
+        if region is not None:
+            updates.append("region = ?")
+            params.append(region)
+        if flex_tier is not None:
+            updates.append("flex_tier = ?")
+            params.append(flex_tier)
+        if flex_rank is not None:
+            updates.append("flex_rank = ?")
+            params.append(flex_rank)
+        if flex_lp is not None:
+            updates.append("flex_lp = ?")
+            params.append(flex_lp)
+
+        # Cas de cumul : si lp_change fourni, on fait « lp_24h = lp_24h + lp_change » et même pour lp_7d
+        if lp_change is not None:
+            updates.append("lp_24h = COALESCE(lp_24h, 0) + ?")
+            params.append(lp_change)
+            updates.append("lp_7d  = COALESCE(lp_7d, 0)  + ?")
+            params.append(lp_change)
+
+        if not updates:
+            # Rien à mettre à jour → on sort
+            return
+
+        # Ajout de l’horodatage de mise à jour
+        updates.append("updated_at = CURRENT_TIMESTAMP")
+
+        query = f"UPDATE player SET {', '.join(updates)} WHERE puuid = ?"
+        params.append(puuid)
+
+        conn = self.connect("update_player_global")
+        c = conn.cursor()
+        c.execute(query, tuple(params))
+        # Le score dépend de (rank, tier, lp) : recalculé après la mise à jour
+        if any(v is not None for v in (tier, rank, lp, flex_tier, flex_rank, flex_lp)):
+            c.execute(
+                """
+                UPDATE player
+                SET score      = ladder_score(rank, tier, lp),
+                    flex_score = ladder_score(flex_rank, flex_tier, flex_lp)
+                WHERE puuid = ?
+                """,
+                (puuid,),
+            )
+        conn.commit()
+        conn.close()
+
+    def insert_player_guild(self, puuid: str,
+                            guild_id: int,
+                            channel_id: int,
+                            last_match_id: str = None):
+        conn = self.connect("insert_player_guild")
+        c = conn.cursor()
+        c.execute("""
+            INSERT OR REPLACE INTO player_guild
+              (player_puuid, guild_id, channel_id, last_match_id)
+            VALUES (?, ?, ?, ?)
+        """, (puuid, guild_id, channel_id, last_match_id))
+        conn.commit()
+        conn.close()
+
+    def update_player_guild(self, puuid: str,
+                            guild_id: int,
+                            channel_id: int = None,
+                            last_match_id: str = None):
+        updates = []
+        params = []
+
+        if channel_id is not None:
+            updates.append("channel_id = ?")
+            params.append(channel_id)
+        if last_match_id is not None:
+            updates.append("last_match_id = ?")
+            params.append(last_match_id)
+
+        if not updates:
+            return
+
+        query = f"UPDATE player_guild SET {', '.join(updates)} WHERE player_puuid = ? AND guild_id = ?"
+        params.extend([puuid, guild_id])
+
+        conn = self.connect("update_player_guild")
+        c = conn.cursor()
+        c.execute(query, tuple(params))
+        conn.commit()
+        conn.close()
+
+    def delete_player(self, puuid: str, guild_id: int):
+        conn = self.connect("delete_player")
+        c = conn.cursor()
+        c.execute("DELETE FROM player_guild WHERE player_puuid = ? AND guild_id = ?", (puuid, guild_id))
+        conn.commit()
+        conn.close()
+
+    def get_player(self, puuid: str, guild_id: int):
+        conn = self.connect("get_player")
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT
+                p.puuid, p.username,
+                pg.guild_id, pg.channel_id, p.region, pg.last_match_id,
+                p.tier, p.rank, p.lp, p.lp_24h, p.lp_7d,
+                p.flex_tier, p.flex_rank, p.flex_lp
+            FROM player p
+                JOIN player_guild pg ON p.puuid = pg.player_puuid
+            WHERE p.puuid = ? AND pg.guild_id = ?
+            """,
+            (puuid, guild_id),
+        )
+        row = c.fetchone()
+        conn.close()
+        return row
+
+    def get_all_players(self):
+        conn = self.connect("get_all_players")
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT
+                p.puuid, p.username,
+                pg.guild_id, pg.channel_id, p.region, pg.last_match_id,
+                p.tier, p.rank, p.lp, p.lp_24h, p.lp_7d,
+                p.flex_tier, p.flex_rank, p.flex_lp
+            FROM player p
+                JOIN player_guild pg ON p.puuid = pg.player_puuid
+            """
+        )
+        rows = c.fetchall()
+        conn.close()
+        return rows
+
+    def get_player_by_username(self, username: str, guild_id: int = None):
+        conn = self.connect("get_player_by_username")
+        c = conn.cursor()
+        if guild_id is not None:
+            c.execute(
+                """
+                SELECT
+                    p.puuid, p.username,
+                    pg.guild_id, pg.channel_id, p.region, pg.last_match_id,
+                    p.tier, p.rank, p.lp, p.lp_24h, p.lp_7d,
+                    p.flex_tier, p.flex_rank, p.flex_lp
+                FROM player p
+                    JOIN player_guild pg ON p.puuid = pg.player_puuid
+                WHERE p.username = ? AND pg.guild_id = ?
+                """,
+                (username, guild_id),
+            )
+            result = c.fetchone()
+        else:
+            c.execute("SELECT puuid, username, region FROM player WHERE username = ?", (username,))
+            result = c.fetchone()
+        conn.close()
+        return result
+
+    def get_guild_usernames(self, guild_id: int):
+        conn = self.connect("get_guild_usernames")
+        c = conn.cursor()
+        c.execute("""
+                  SELECT p.puuid, p.username
+                  FROM player p
+                           JOIN player_guild pg ON p.puuid = pg.player_puuid
+                  WHERE pg.guild_id = ?
+                  """, (guild_id,))
+        rows = c.fetchall()
+        conn.close()
+        return rows
+
+    def insert_guild(self, guild_id: int,
+                     leaderboard_channel_id: int | None,
+                     flex_enabled: int | None = 0):
+        conn = self.connect("insert_guild")
+        c = conn.cursor()
+
+        # Ensure a row exists for this guild
+        c.execute(
+            """
+            INSERT OR IGNORE INTO guild (guild_id, leaderboard_channel_id, flex_enabled)
+            VALUES (?, ?, COALESCE(?, 0))
+            """,
+            (guild_id, leaderboard_channel_id, flex_enabled),
+        )
+
+        # Update provided fields without clobbering existing data
+        updates = []
+        params: list[object] = []
+        if leaderboard_channel_id is not None:
+            updates.append("leaderboard_channel_id = ?")
+            params.append(leaderboard_channel_id)
+        if flex_enabled is not None:
+            updates.append("flex_enabled = ?")
+            params.append(flex_enabled)
+        if updates:
+            params.append(guild_id)
+            c.execute(
+                f"UPDATE guild SET {', '.join(updates)} WHERE guild_id = ?",
+                params,
+            )
+
+        conn.commit()
+        conn.close()
+
+    def set_guild_flex_mode(self, guild_id: int, enabled: bool) -> None:
+        conn = self.connect("set_guild_flex_mode")
+        c = conn.cursor()
+        c.execute(
+            "UPDATE guild SET flex_enabled = ? WHERE guild_id = ?",
+            (1 if enabled else 0, guild_id)
+        )
+        conn.commit()
+        conn.close()
+
+    def get_guild(self, guild_id: int):
+        conn = self.connect("get_guild")
+        c = conn.cursor()
+        c.execute(
+            "SELECT guild_id, leaderboard_channel_id, flex_enabled FROM guild WHERE guild_id = ?",
+            (guild_id,)
+        )
+        result = c.fetchone()
+        conn.close()
+        return result
+
+    def get_leaderboard_by_guild(self, guild_id: int):
+        conn = self.connect("get_leaderboard_by_guild")
+        c = conn.cursor()
+        c.execute("SELECT leaderboard_id FROM leaderboard WHERE guild_id = ?", (guild_id,))
+        row = c.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def insert_leaderboard(self, guild_id: int) -> int:
+        conn = self.connect("insert_leaderboard")
+        c = conn.cursor()
+        c.execute("INSERT INTO leaderboard (guild_id) VALUES (?)", (guild_id,))
+        lb_id = c.lastrowid
+        conn.commit()
+        conn.close()
+        return lb_id
+
+    def delete_leaderboard(self, guild_id: int):
+        conn = self.connect("delete_leaderboard")
+        c = conn.cursor()
+        c.execute(
+            "SELECT leaderboard_id FROM leaderboard WHERE guild_id = ?",
+            (guild_id,)
+        )
+        row = c.fetchone()
+        if row:
+            c.execute(
+                "DELETE FROM leaderboard_player WHERE leaderboard_id = ?",
+                (row[0],),
+            )
+            c.execute(
+                "DELETE FROM leaderboard_page WHERE leaderboard_id = ?",
+                (row[0],),
+            )
+        c.execute("DELETE FROM leaderboard WHERE guild_id = ?", (guild_id,))
+        c.execute(
+            "UPDATE guild SET leaderboard_channel_id = NULL WHERE guild_id = ?",
+            (guild_id,)
+        )
+        conn.commit()
+        conn.close()
+
+    def insert_leaderboard_member(self, leaderboard_id: int, player_puuid: str):
+        conn = self.connect("insert_leaderboard_member")
+        c = conn.cursor()
+        c.execute(
+            "INSERT OR IGNORE INTO leaderboard_player (leaderboard_id, player_puuid) VALUES (?, ?)",
+            (leaderboard_id, player_puuid)
+        )
+        conn.commit()
+        conn.close()
+
+    def delete_leaderboard_member(self, leaderboard_id: int, player_puuid: str):
+        conn = self.connect("delete_leaderboard_member")
+        c = conn.cursor()
+        c.execute(
+            "DELETE FROM leaderboard_player WHERE leaderboard_id = ? AND player_puuid = ?",
+            (leaderboard_id, player_puuid)
+        )
+        conn.commit()
+        conn.close()
+
+    def get_leaderboard_data(self, leaderboard_id: int, guild_id: int, limit: int | None = None):
+        conn = self.connect("get_leaderboard_data")
+        c = conn.cursor()
+        c.execute(
+            """
+            SELECT
+                p.username,
+                p.tier,
+                p.rank,
+                p.lp,
+                p.lp_24h,
+                p.lp_7d
+            FROM leaderboard    AS lb
+                     JOIN leaderboard_player AS lp_player
+                          ON lb.leaderboard_id = lp_player.leaderboard_id
+                     JOIN player        AS p
+                          ON lp_player.player_puuid = p.puuid
+            WHERE lb.guild_id       = ?
+              AND lb.leaderboard_id = ?
+            ORDER BY p.score IS NULL, p.score DESC
+            LIMIT ?
+            """,
+            (guild_id, leaderboard_id, -1 if limit is None else limit),
+        )
+        rows = c.fetchall()
+        conn.close()
+        return rows
+
+    def get_leaderboard_pages(self, leaderboard_id: int) -> list[tuple[int, int, str | None]]:
+        conn = self.connect("get_leaderboard_pages")
+        c = conn.cursor()
+        c.execute(
+            "SELECT page, message_id, content_hash FROM leaderboard_page "
+            "WHERE leaderboard_id = ? ORDER BY page",
+            (leaderboard_id,),
+        )
+        rows = c.fetchall()
+        conn.close()
+        return rows
+
+    def set_leaderboard_page(self, leaderboard_id: int, page: int, message_id: int,
+                             content_hash: str | None) -> None:
+        conn = self.connect("set_leaderboard_page")
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO leaderboard_page (leaderboard_id, page, message_id, content_hash)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(leaderboard_id, page) DO UPDATE SET
+                message_id   = excluded.message_id,
+                content_hash = excluded.content_hash
+            """,
+            (leaderboard_id, page, message_id, content_hash),
+        )
+        conn.commit()
+        conn.close()
+
+    def delete_leaderboard_pages(self, leaderboard_id: int, from_page: int = 0) -> None:
+        conn = self.connect("delete_leaderboard_pages")
+        c = conn.cursor()
+        c.execute(
+            "DELETE FROM leaderboard_page WHERE leaderboard_id = ? AND page >= ?",
+            (leaderboard_id, from_page),
+        )
+        conn.commit()
+        conn.close()
+
+    def reset_lp_for_period(self, period: str) -> list[int]:
+        lp_column = "lp_24h" if period == "daily" else "lp_7d"
+        recap_column = "daily_recap_enabled" if period == "daily" else "weekly_recap_enabled"
+        conn = self.connect("reset_lp_for_period")
+        try:
+            with conn:
+                c = conn.cursor()
+                c.execute(
+                    f"""
+                    SELECT lb.guild_id, MIN(lb.leaderboard_id)
+                    FROM leaderboard AS lb
+                             JOIN guild AS g ON g.guild_id = lb.guild_id
+                    WHERE g.{recap_column} = 1
+                      AND EXISTS (
+                          SELECT 1 FROM leaderboard_player AS lp_player
+                          WHERE lp_player.leaderboard_id = lb.leaderboard_id
+                      )
+                    GROUP BY lb.guild_id
+                    """
+                )
+                snapshot_ids = []
+                since_ms = int((time.time() - RECAP_PERIOD_SECONDS[period]) * 1000)
+                for guild_id, lb_id in c.fetchall():
+                    c.execute(
+                        "INSERT INTO recap_snapshot (guild_id, period) VALUES (?, ?)",
+                        (guild_id, period),
+                    )
+                    snapshot_id = c.lastrowid
+                    c.execute(
+                        """
+                        INSERT INTO recap_snapshot_row
+                          (snapshot_id, username, tier, rank, lp, lp_24h, lp_7d, games, wins)
+                        SELECT ?, p.username, p.tier, p.rank, p.lp, p.lp_24h, p.lp_7d,
+                               COUNT(mh.match_id), COALESCE(SUM(mh.win), 0)
+                        FROM leaderboard_player AS lp_player
+                                 JOIN player AS p ON lp_player.player_puuid = p.puuid
+                                 LEFT JOIN match_history AS mh
+                                        ON mh.player_puuid = p.puuid AND mh.played_at >= ?
+                        WHERE lp_player.leaderboard_id = ?
+                        GROUP BY p.puuid
+                        ORDER BY p.score IS NULL, p.score DESC
+                        """,
+                        (snapshot_id, since_ms, lb_id),
+                    )
+                    snapshot_ids.append(snapshot_id)
+
+                c.execute(
+                    f"""
+                    UPDATE player
+                    SET {lp_column} = 0
+                    WHERE {lp_column} IS NOT 0
+                      AND puuid IN (SELECT player_puuid FROM player_guild)
+                    """
+                )
+        finally:
+            conn.close()
+        return snapshot_ids
+
+    def get_unsent_recap_snapshots(self, period: str | None = None):
+        conn = self.connect("get_unsent_recap_snapshots")
+        c = conn.cursor()
+        query = "SELECT snapshot_id, guild_id, period FROM recap_snapshot WHERE sent_at IS NULL"
+        params: tuple = ()
+        if period is not None:
+            query += " AND period = ?"
+            params = (period,)
+        c.execute(query + " ORDER BY snapshot_id", params)
+        rows = c.fetchall()
+        conn.close()
+        return rows
+
+    def get_recap_aggregate(self, snapshot_id: int) -> dict | None:
+        conn = self.connect("get_recap_aggregate")
+        c = conn.cursor()
+        c.execute(
+            "SELECT guild_id, period FROM recap_snapshot WHERE snapshot_id = ?",
+            (snapshot_id,),
+        )
+        snapshot = c.fetchone()
+        if snapshot is None:
+            conn.close()
+            return None
+        guild_id, period = snapshot
+        delta = "lp_24h" if period == "daily" else "lp_7d"
+        c.execute(
+            f"""
+            SELECT username, tier, rank, lp, COALESCE({delta}, 0) AS delta,
+                   lp_24h, lp_7d, COALESCE(games, 0), COALESCE(wins, 0)
+            FROM recap_snapshot_row
+            WHERE snapshot_id = ?
+            ORDER BY delta DESC, rowid
+            """,
+            (snapshot_id,),
+        )
+        rows = c.fetchall()
+        conn.close()
+        return {
+            "snapshot_id": snapshot_id,
+            "guild_id": guild_id,
+            "period": period,
+            "players": [dict(zip(RECAP_ROW_COLUMNS, row)) for row in rows],
+        }
+
+    def mark_recap_snapshot_sent(self, snapshot_id: int) -> None:
+        conn = self.connect("mark_recap_snapshot_sent")
+        c = conn.cursor()
+        c.execute(
+            "UPDATE recap_snapshot SET sent_at = CURRENT_TIMESTAMP WHERE snapshot_id = ?",
+            (snapshot_id,),
+        )
+        conn.commit()
+        conn.close()
+
+    def insert_match_history(self, puuid: str, matches: list[dict]) -> None:
+        if not matches:
+            return
+        columns = ", ".join(MATCH_HISTORY_COLUMNS)
+        placeholders = ", ".join("?" for _ in MATCH_HISTORY_COLUMNS)
+        conn = self.connect("insert_match_history")
+        try:
+            with conn:
+                conn.executemany(
+                    f"""
+                    INSERT INTO match_history (player_puuid, {columns})
+                    VALUES (?, {placeholders})
+                    ON CONFLICT(match_id, player_puuid) DO UPDATE SET
+                        lp_change = COALESCE(excluded.lp_change, match_history.lp_change),
+                        early_surrender = excluded.early_surrender
+                    """,
+                    [
+                        (puuid, *(match.get(col) for col in MATCH_HISTORY_COLUMNS))
+                        for match in matches
+                    ],
+                )
+        finally:
+            conn.close()
+
+    def get_match_history(self, puuid: str, limit: int = 10, offset: int = 0) -> list[dict]:
+        conn = self.connect("get_match_history")
+        c = conn.cursor()
+        c.execute(
+            f"""
+            SELECT {", ".join(MATCH_HISTORY_COLUMNS)}
+            FROM match_history
+            WHERE player_puuid = ?
+            ORDER BY played_at DESC
+            LIMIT ? OFFSET ?
+            """,
+            (puuid, limit, offset),
+        )
+        rows = c.fetchall()
+        conn.close()
+        return [dict(zip(MATCH_HISTORY_COLUMNS, row)) for row in rows]
+
+    def get_known_match_ids(self, puuid: str, match_ids: list[str]) -> set[str]:
+        if not match_ids:
+            return set()
+        conn = self.connect("get_known_match_ids")
+        c = conn.cursor()
+        c.execute(
+            f"""
+            SELECT match_id FROM match_history
+            WHERE player_puuid = ? AND match_id IN ({", ".join("?" for _ in match_ids)})
+            """,
+            (puuid, *match_ids),
+        )
+        rows = c.fetchall()
+        conn.close()
+        return {row[0] for row in rows}
+
+    def get_job_last_run(self, name: str) -> float | None:
+        conn = self.connect("get_job_last_run")
+        c = conn.cursor()
+        c.execute("SELECT last_run_at FROM scheduled_job WHERE name = ?", (name,))
+        row = c.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def set_job_last_run(self, name: str, timestamp: float) -> None:
+        conn = self.connect("set_job_last_run")
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO scheduled_job (name, last_run_at) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET last_run_at = excluded.last_run_at
+            """,
+            (name, timestamp),
+        )
+        conn.commit()
+        conn.close()
+
+    def get_bot_state(self, key: str) -> str | None:
+        conn = self.connect("get_bot_state")
+        c = conn.cursor()
+        c.execute("SELECT value FROM bot_state WHERE key = ?", (key,))
+        row = c.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def set_bot_state(self, key: str, value: str) -> None:
+        conn = self.connect("set_bot_state")
+        c = conn.cursor()
+        c.execute(
+            """
+            INSERT INTO bot_state (key, value) VALUES (?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """,
+            (key, value),
+        )
+        conn.commit()
+        conn.close()
+
+    def append_change(self, kind: str, payload: str, created_at: float,
+                      retention: int = CHANGE_FEED_RETENTION) -> int:
+        conn = self.connect("append_change")
+        with conn:
+            c = conn.cursor()
+            c.execute(
+                "INSERT INTO change_feed (kind, payload, created_at) VALUES (?, ?, ?)",
+                (kind, payload, created_at),
+            )
+            change_id = c.lastrowid
+            c.execute("DELETE FROM change_feed WHERE id <= ?", (change_id - retention,))
+        conn.close()
+        return change_id
+
+    def count_players(self) -> int:
+        conn = self.connect("count_players")
+        c = conn.cursor()
+        c.execute("SELECT COUNT(*) FROM player")
+        row = c.fetchone()
+        conn.close()
+        return row[0] if row else 0
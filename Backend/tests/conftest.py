@@ -0,0 +1,54 @@
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+
+@pytest.fixture(scope="module")
+def commands_module():
+    return importlib.import_module('commands')
+
+
+@pytest.fixture(scope="module")
+def tracker_module():
+    return importlib.import_module('tracker')
+
+
+@pytest.fixture(scope="module")
+def riot_module():
+    return importlib.import_module('riot_api')
+
+
+@pytest.fixture
+def memory_backend():
+    """Remplace le stockage global par un MemoryStorage vide le temps du test."""
+    import storage
+    from storage_memory import MemoryStorage
+
+    backend = MemoryStorage()
+    previous = storage.set_storage(backend)
+    yield backend
+    storage.set_storage(previous)
+
+
+@pytest.fixture
+def sqlite_backend(tmp_path):
+    """Remplace le stockage global par un SQLiteStorage neuf dans tmp_path."""
+    import storage
+    from storage_sqlite import SQLiteStorage
+
+    backend = SQLiteStorage(str(tmp_path / "test.db"))
+    backend.initialize()
+    previous = storage.set_storage(backend)
+    yield backend
+    storage.set_storage(previous)
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def any_backend(request):
+    """Chacun des deux backends, installé comme stockage global le temps du test."""
+    return request.getfixturevalue(f"{request.param}_backend")
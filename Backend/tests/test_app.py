@@ -0,0 +1,256 @@
+import csv
+import io
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import app as app_module
+from storage_sqlite import SQLiteStorage
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    db_path = tmp_path / "app.db"
+    monkeypatch.setenv("DB_PATH", str(db_path))
+    backend = SQLiteStorage(str(db_path))
+    backend.initialize()
+    app_module._aggregate_cache.clear()
+    backend.insert_guild(1, None, 0)
+    backend.insert_guild(2, None, 0)
+    players = [
+        ("pa", "ALICE#EUW", "II", "GOLD", 10, "I", "SILVER", 3),
+        ("pb", "BOB#EUW", "IV", "IRON", 0, None, None, None),
+        ("pc", "CAROL#EUW", "I", "GOLD", 50, None, None, None),
+        ("pd", "DAVE#EUW", None, None, None, None, None, None),
+    ]
+    for puuid, username, tier, rank, lp, flex_tier, flex_rank, flex_lp in players:
+        backend.insert_player(puuid, username, tier, rank, lp, "euw1", flex_tier, flex_rank, flex_lp)
+        backend.insert_player_guild(puuid, 1, 10)
+    backend.insert_player_guild("pc", 2, 20)
+    yield backend
+    app_module._aggregate_cache.clear()
+
+
+@pytest.fixture
+def client(backend):
+    return app_module.app.test_client()
+
+
+def test_index_renders_vue_markup(client):
+    resp = client.get('/')
+    assert resp.status_code == 200
+    page = resp.get_data(as_text=True)
+    assert '{{ m.username }}' in page
+    assert 'Load more' in page and '{{ e.text }}' in page
+
+
+def test_members_cursor_pagination(client):
+    first = client.get('/api/members?limit=3').get_json()
+    assert [m['username'] for m in first['members']] == ['ALICE#EUW', 'BOB#EUW', 'CAROL#EUW']
+    assert first['count'] == 4
+
+    second = client.get(f"/api/members?limit=3&cursor={first['next_cursor']}").get_json()
+    assert [m['username'] for m in second['members']] == ['DAVE#EUW']
+    assert second['next_cursor'] is None
+
+
+def test_members_filters(client):
+    gold = client.get('/api/members?rank=GOLD').get_json()
+    assert [m['puuid'] for m in gold['members']] == ['pa', 'pc']
+
+    guild = client.get('/api/members?guild_id=2').get_json()
+    assert [m['puuid'] for m in guild['members']] == ['pc']
+    assert guild['count'] == 1
+
+    flex = client.get('/api/members?queue=flex&rank=SILVER').get_json()
+    assert flex['members'] == [
+        {'puuid': 'pa', 'username': 'ALICE#EUW', 'rank': 'SILVER', 'tier': 'I', 'lp': 3}
+    ]
+
+    unranked = client.get('/api/members?rank=Unranked').get_json()
+    assert [m['puuid'] for m in unranked['members']] == ['pd']
+
+
+def test_invalid_parameters(client):
+    assert client.get('/api/members?cursor=nope').status_code == 400
+    assert client.get('/api/members?queue=aram').status_code == 400
+    assert client.get('/api/rank_counts?guild_id=x').status_code == 400
+
+
+def test_etag_follows_data_version(client, backend):
+    response = client.get('/api/rank_counts')
+    etag = response.headers['ETag']
+    assert response.get_json() == {'GOLD': 2, 'IRON': 1, 'Unranked': 1}
+
+    assert client.get('/api/rank_counts', headers={'If-None-Match': etag}).status_code == 304
+
+    backend.update_player_global('pb', tier='I', rank='GOLD', lp=0)
+    response = client.get('/api/rank_counts', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json() == {'GOLD': 3, 'Unranked': 1}
+
+
+def test_aggregates_are_cached_per_version(client):
+    client.get('/api/rank_counts?guild_id=1')
+    with patch.object(app_module, 'query_db', side_effect=AssertionError("aggregate recomputed")):
+        assert client.get('/api/rank_counts?guild_id=1').get_json() == {'GOLD': 2, 'IRON': 1, 'Unranked': 1}
+
+
+def test_connection_is_reused(client):
+    client.get('/api/members')
+    conn = app_module.get_conn()
+    client.get('/api/rank_counts')
+    assert app_module.get_conn() is conn
+
+
+def _match(match_id, played_at):
+    return {
+        "match_id": match_id, "queue_id": 420, "win": 1, "champion": "Ahri",
+        "champion_id": 103, "kills": 1, "deaths": 2, "assists": 3, "damage": 1000,
+        "duration": 1800, "lp_change": 20, "early_surrender": 0, "played_at": played_at,
+    }
+
+
+def test_export_players_ndjson_in_chunks(client):
+    with patch.object(app_module, 'EXPORT_CHUNK_SIZE', 3):
+        response = client.get('/api/export/players')
+
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row['puuid'] for row in rows] == ['pa', 'pb', 'pc', 'pd']
+    assert rows[0]['flex_rank'] == 'SILVER'
+
+
+def test_export_players_csv_filtered_by_guild(client):
+    response = client.get('/api/export/players?format=csv&guild_id=2')
+
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'] == 'attachment; filename="players.csv"'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][:3] == ['puuid', 'username', 'region']
+    assert [row[0] for row in rows[1:]] == ['pc']
+
+
+def test_export_csv_without_rows_has_header(client):
+    rows = list(csv.reader(io.StringIO(client.get('/api/export/match_history?format=csv').get_data(as_text=True))))
+    assert rows == [list(app_module.EXPORTS['match_history'].columns)]
+
+
+def test_export_match_history(client, backend):
+    backend.insert_match_history('pa', [_match(f'EUW_{i}', 1000 + i) for i in range(5)])
+    backend.insert_match_history('pc', [_match('EUW_9', 2000)])
+
+    with patch.object(app_module, 'EXPORT_CHUNK_SIZE', 2):
+        everything = client.get('/api/export/match_history').get_data(as_text=True).splitlines()
+        guild = client.get('/api/export/match_history?guild_id=2').get_data(as_text=True).splitlines()
+        alice = client.get('/api/export/match_history?puuid=pa').get_data(as_text=True).splitlines()
+
+    assert len(everything) == 6
+    assert [json.loads(line)['match_id'] for line in guild] == ['EUW_9']
+    assert [json.loads(line)['match_id'] for line in alice] == [f'EUW_{i}' for i in range(5)]
+
+
+def test_export_lp_history(client, backend):
+    conn = sqlite3.connect(backend.db_path)
+    with conn:
+        for snapshot_id, guild_id, period in ((1, 1, 'daily'), (2, 2, 'weekly')):
+            conn.execute(
+                "INSERT INTO recap_snapshot (snapshot_id, guild_id, period) VALUES (?, ?, ?)",
+                (snapshot_id, guild_id, period),
+            )
+            conn.executemany(
+                "INSERT INTO recap_snapshot_row (snapshot_id, username, tier, rank, lp, lp_24h, lp_7d, games, wins)"
+                " VALUES (?, ?, 'I', 'GOLD', 10, 5, 5, 2, 1)",
+                [(snapshot_id, 'ALICE#EUW'), (snapshot_id, 'CAROL#EUW')],
+            )
+    conn.close()
+
+    with patch.object(app_module, 'EXPORT_CHUNK_SIZE', 1):
+        rows = [json.loads(line) for line in
+                client.get('/api/export/lp_history?period=daily').get_data(as_text=True).splitlines()]
+
+    assert [(row['snapshot_id'], row['username']) for row in rows] == [(1, 'ALICE#EUW'), (1, 'CAROL#EUW')]
+    assert rows[0]['guild_id'] == 1 and rows[0]['games'] == 2
+
+
+def test_export_rejects_unknown_dataset_and_bad_filters(client):
+    assert client.get('/api/export/guilds').status_code == 404
+    assert client.get('/api/export/players?format=xml').status_code == 400
+    assert client.get('/api/export/players?guild_id=x').status_code == 400
+
+
+def _append(backend, kind, payload):
+    return backend.append_change(kind, json.dumps(payload), 0.0)
+
+
+def test_change_feed_fans_out_with_one_query(backend):
+    feed = app_module.ChangeFeed()
+    subscribers = [feed.subscribe() for _ in range(50)]
+    _append(backend, 'match_finished', {'guild_id': 1})
+    assert feed.poll_once() == 0  # départ à la fin du flux
+
+    first = _append(backend, 'match_finished', {'guild_id': 1, 'username': 'ALICE#EUW'})
+    second = _append(backend, 'leaderboard', {'guild_id': 2, 'rows': []})
+    real_query = app_module.query_db
+    with patch.object(app_module, 'query_db', side_effect=real_query) as query:
+        assert feed.poll_once() == 2
+    assert query.call_count == 1
+
+    for events in subscribers:
+        assert [events.get_nowait()[:2] for _ in range(2)] == [(first, 'match_finished'), (second, 'leaderboard')]
+    assert feed.subscribe(last_event_id=first).get_nowait()[0] == second
+
+
+def test_change_feed_keeps_latest_entries(backend):
+    ids = [backend.append_change('match_finished', '{}', 0.0, retention=3) for _ in range(5)]
+    assert [row[0] for row in app_module.query_db("SELECT id FROM change_feed ORDER BY id")] == ids[2:]
+
+
+def test_change_feed_drops_slow_subscriber(backend):
+    feed = app_module.ChangeFeed()
+    feed.poll_once()
+    with patch.object(app_module, 'FEED_SUBSCRIBER_QUEUE', 1):
+        slow = feed.subscribe()
+    fast = feed.subscribe()
+    _append(backend, 'match_finished', {'guild_id': 1})
+    _append(backend, 'match_finished', {'guild_id': 1})
+
+    feed.poll_once()
+
+    assert not feed.is_subscribed(slow)
+    assert feed.is_subscribed(fast) and fast.qsize() == 2
+
+
+def test_events_endpoint_streams_filtered_events(client, backend):
+    feed = app_module.ChangeFeed()
+    feed.poll_once()
+    with (
+        patch.object(app_module, 'change_feed', feed),
+        patch.object(feed, 'ensure_running'),
+        patch.object(app_module, 'FEED_HEARTBEAT', 0.01),
+    ):
+        response = client.get('/api/events?guild_id=1&kinds=match_finished', buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        chunks = iter(response.response)
+        assert next(chunks) == b'retry: 3000\n\n'
+
+        _append(backend, 'leaderboard', {'guild_id': 1, 'rows': []})
+        _append(backend, 'match_finished', {'guild_id': 2})
+        wanted = _append(backend, 'match_finished', {'guild_id': 1, 'username': 'ALICE#EUW'})
+        feed.poll_once()
+
+        assert next(chunks).decode() == (
+            f'id: {wanted}\nevent: match_finished\n'
+            'data: {"guild_id": 1, "username": "ALICE#EUW"}\n\n'
+        )
+        assert next(chunks) == b': keepalive\n\n'
+        response.close()
+    assert not feed._subscribers
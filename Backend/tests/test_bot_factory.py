@@ -0,0 +1,49 @@
+import importlib
+import logging
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+
+def test_import_has_no_side_effects():
+    handlers = list(logging.getLogger().handlers)
+    with patch('discord.Client.__init__') as client_init:
+        bot = importlib.reload(importlib.import_module('bot'))
+
+    client_init.assert_not_called()
+    assert not hasattr(bot, 'client')
+    assert logging.getLogger().handlers == handlers
+
+
+def test_create_bot_wires_commands_and_events():
+    import bot
+
+    client = bot.create_bot(log_channel_id=7)
+
+    names = {command.name for command in client.tree.get_commands()}
+    assert {"register", "import", "rank", "career", "leaderboard", "zmemory"} <= names
+    assert client.discord_handler.channel_id == 7
+    assert client.discord_handler not in logging.getLogger().handlers
+    assert client.on_ready is not None and client.on_raw_reaction_add is not None
+
+
+def test_main_installs_log_handler_and_runs():
+    import bot
+
+    with (
+        patch.object(bot, 'load_dotenv'),
+        patch.object(bot, 'configure_logging'),
+        patch('discord.Client.run') as run,
+        patch.dict('os.environ', {'DISCORD_TOKEN': ' token '}),
+    ):
+        bot.main()
+    installed = [h for h in logging.getLogger().handlers if type(h).__name__ == 'DiscordLogHandler']
+    try:
+        run.assert_called_once_with('token')
+        assert len(installed) == 1
+    finally:
+        for handler in installed:
+            logging.getLogger().removeHandler(handler)
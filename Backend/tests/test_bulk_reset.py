@@ -0,0 +1,110 @@
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import fonction_bdd
+
+
+def _seed():
+    fonction_bdd.insert_guild(1, 10, 0)
+    fonction_bdd.insert_guild(2, 20, 0)
+    fonction_bdd.set_recap_mode(1, "daily", True)
+    for puuid, name in (("p1", "A#1"), ("p2", "B#2")):
+        fonction_bdd.insert_player(puuid, name, "I", "GOLD", 50, "euw1")
+        fonction_bdd.update_player_global(puuid, lp_change=25)
+    # p1 is registered on both guilds
+    fonction_bdd.insert_player_guild("p1", 1, 10)
+    fonction_bdd.insert_player_guild("p1", 2, 20)
+    fonction_bdd.insert_player_guild("p2", 2, 20)
+    for guild_id, puuid in ((1, "p1"), (2, "p1"), (2, "p2")):
+        lb_id = fonction_bdd.get_leaderboard_by_guild(guild_id) or fonction_bdd.insert_leaderboard(guild_id)
+        fonction_bdd.insert_leaderboard_member(lb_id, puuid)
+
+
+def test_reset_snapshots_enabled_guilds_and_resets_players(any_backend):
+    _seed()
+
+    snapshot_ids = fonction_bdd.reset_lp_for_period("daily")
+
+    assert len(snapshot_ids) == 1
+    assert fonction_bdd.get_unsent_recap_snapshots() == [(snapshot_ids[0], 1, "daily")]
+    assert [p["username"] for p in fonction_bdd.get_recap_aggregate(snapshot_ids[0])["players"]] == ["A#1"]
+    for puuid in ("p1", "p2"):
+        player = fonction_bdd.get_player(puuid, 2)
+        assert player[9] == 0   # lp_24h
+        assert player[10] == 25  # lp_7d untouched
+
+    fonction_bdd.mark_recap_snapshot_sent(snapshot_ids[0])
+    assert fonction_bdd.get_unsent_recap_snapshots() == []
+
+
+def test_reset_snapshot_aggregates_games_and_deltas(any_backend):
+    _seed()
+    fonction_bdd.set_recap_mode(2, "daily", True)
+    now_ms = int(time.time() * 1000)
+    fonction_bdd.insert_match_history("p2", [
+        _match("m1", win=1, played_at=now_ms - 3600 * 1000),
+        _match("m2", win=0, played_at=now_ms - 7200 * 1000),
+        _match("m0", win=1, played_at=now_ms - 3 * 86400 * 1000),  # hors période
+    ])
+    fonction_bdd.update_player_global("p2", lp_change=-40)
+
+    snapshot_ids = fonction_bdd.reset_lp_for_period("daily")
+    aggregate = fonction_bdd.get_recap_aggregate(snapshot_ids[-1])
+
+    assert aggregate["guild_id"] == 2 and aggregate["period"] == "daily"
+    assert [(p["username"], p["delta"], p["games"], p["wins"]) for p in aggregate["players"]] == [
+        ("A#1", 25, 0, 0),
+        ("B#2", -15, 2, 1),
+    ]
+    assert fonction_bdd.get_recap_aggregate(999) is None
+
+
+def _match(match_id, win, played_at):
+    return {
+        "match_id": match_id, "queue_id": 420, "win": win, "champion": "Ahri",
+        "champion_id": 103, "kills": 1, "deaths": 1, "assists": 1, "damage": 1000,
+        "duration": 1800, "lp_change": None, "early_surrender": 0, "played_at": played_at,
+    }
+
+
+def test_reset_updates_each_player_once(sqlite_backend):
+    _seed()
+    statements = []
+    real_connection = sqlite_backend.connect
+
+    def traced_connection(op="unknown"):
+        conn = real_connection(op)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    with patch.object(sqlite_backend, "connect", traced_connection):
+        fonction_bdd.reset_lp_for_period("weekly")
+
+    updates = [s for s in statements if s.lstrip().startswith("UPDATE player")]
+    assert len(updates) == 1
+
+
+def test_reset_rolls_back_snapshot_on_failure(sqlite_backend):
+    _seed()
+    real_connection = sqlite_backend.connect
+
+    def failing_connection(op="unknown"):
+        conn = real_connection(op)
+        conn.execute("CREATE TEMP TRIGGER fail_reset BEFORE UPDATE ON player "
+                     "BEGIN SELECT RAISE(ABORT, 'boom'); END")
+        return conn
+
+    with patch.object(sqlite_backend, "connect", failing_connection):
+        with pytest.raises(sqlite3.IntegrityError):
+            fonction_bdd.reset_lp_for_period("daily")
+
+    assert fonction_bdd.get_unsent_recap_snapshots() == []
+    assert fonction_bdd.get_player("p1", 1)[9] == 25
@@ -0,0 +1,91 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+PLAYER = ('p1', 'USER#TAG', 1, 123, 'euw1', 'm0', 'I', 'GOLD', 50, 0, 0, None, None, None)
+
+
+def _match(match_id, win=True):
+    return {
+        'match_id': match_id, 'queue_id': 420, 'win': win, 'champion': 'Ahri',
+        'champion_id': 103, 'kills': 1, 'deaths': 2, 'assists': 3, 'damage': 1000,
+        'duration': 1800, 'lp_change': 20 if win else -18, 'early_surrender': False,
+        'played_at': 0,
+    }
+
+
+def _interaction():
+    interaction = MagicMock()
+    interaction.guild.id = 1
+    interaction.response.defer = AsyncMock()
+    interaction.followup.send = AsyncMock()
+    return interaction
+
+
+def test_career_served_from_local_history(commands_module):
+    interaction = _interaction()
+    history = [_match('m0')] + [_match(f'm{i}', win=False) for i in range(1, 10)]
+    ids = [f'm{i}' for i in range(10)]
+    get_last_match = AsyncMock(return_value=ids)
+    get_summary = AsyncMock()
+
+    with (
+        patch.object(commands_module, 'get_player_by_username', return_value=PLAYER),
+        patch.object(commands_module, 'get_match_history', return_value=history),
+        patch.object(commands_module, 'async_get_last_match', get_last_match),
+        patch.object(commands_module, 'get_known_match_ids', return_value=set(ids)),
+        patch.object(commands_module, 'async_get_match_summary', get_summary),
+        patch.object(commands_module, 'insert_match_history'),
+    ):
+        asyncio.run(commands_module.career.callback(interaction, 'user#tag', 1))
+
+    get_last_match.assert_awaited_once_with('p1', 10, 'europe')
+    get_summary.assert_not_awaited()
+    embed = interaction.followup.send.call_args.kwargs['embed']
+    assert embed.description == 'Rank: GOLD I 50 LP'
+    assert '**LP:** +20' in embed.fields[0].value
+
+
+def test_career_fills_interior_gaps(commands_module):
+    # Le dernier match est connu, mais deux parties jouées pendant un arrêt
+    # du bot manquent au milieu de la page
+    interaction = _interaction()
+    ids = [f'm{i}' for i in range(10)]
+    known = set(ids) - {'m4', 'm5'}
+    get_summary = AsyncMock(side_effect=lambda match_id, puuid, cluster: _match(match_id))
+    insert_history = MagicMock()
+
+    with (
+        patch.object(commands_module, 'get_player_by_username', return_value=PLAYER),
+        patch.object(commands_module, 'get_match_history', return_value=[_match(i) for i in ids]),
+        patch.object(commands_module, 'async_get_last_match', AsyncMock(return_value=ids)),
+        patch.object(commands_module, 'get_known_match_ids', return_value=known),
+        patch.object(commands_module, 'async_get_match_summary', get_summary),
+        patch.object(commands_module, 'insert_match_history', insert_history),
+    ):
+        asyncio.run(commands_module.career.callback(interaction, 'user#tag', 1))
+
+    assert [c.args[0] for c in get_summary.await_args_list] == ['m4', 'm5']
+    insert_history.assert_called_once_with('p1', [_match('m4'), _match('m5')])
+
+
+def test_career_backfills_missing_matches(commands_module):
+    interaction = _interaction()
+    summary = _match('m0')
+    get_match_history = MagicMock(return_value=[summary])
+    get_summary = AsyncMock(return_value=summary)
+    insert_history = MagicMock()
+
+    with (
+        patch.object(commands_module, 'get_player_by_username', return_value=PLAYER),
+        patch.object(commands_module, 'get_match_history', get_match_history),
+        patch.object(commands_module, 'async_get_last_match', AsyncMock(return_value=['m0', 'm1'])),
+        patch.object(commands_module, 'get_known_match_ids', return_value={'m1'}),
+        patch.object(commands_module, 'async_get_match_summary', get_summary),
+        patch.object(commands_module, 'insert_match_history', insert_history),
+    ):
+        asyncio.run(commands_module.career.callback(interaction, 'user#tag', 2))
+
+    get_summary.assert_awaited_once_with('m0', 'p1', 'europe')
+    insert_history.assert_called_once_with('p1', [summary])
+    get_match_history.assert_called_with('p1', 10, 10)
+    interaction.followup.send.assert_awaited_once()
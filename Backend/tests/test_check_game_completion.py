@@ -6,40 +6,35 @@ import asyncio
 import pytest
 
 @pytest.fixture(scope="module")
-def bot_module():
+def tracker_module():
     root = Path(__file__).resolve().parents[1]
     sys.path.insert(0, str(root))
-    if 'bot' in sys.modules:
-        del sys.modules['bot']
-    with patch("discord.Client.run"):
-        module = importlib.import_module('bot')
-    module.discord_handler.emit = lambda *a, **k: None
-    return module
+    return importlib.import_module('tracker')
 
 
-def test_check_for_game_completion_handles_missing_row(bot_module):
-    bot_module.players_in_game = {('puuid1', 1)}
-    bot_module.players_in_game_messages = {('puuid1', 1): MagicMock()}
-    bot_module.recent_match_lp_changes = {}
+def test_check_for_game_completion_handles_missing_row(tracker_module):
+    tracker_module.players_in_game = {('puuid1', 1)}
+    tracker_module.players_in_game_messages = {('puuid1', 1): MagicMock()}
+    tracker_module.recent_match_lp_changes = {}
 
     async_get_all_players = AsyncMock(return_value=[])
     sleep_mock = AsyncMock(side_effect=asyncio.CancelledError)
 
     with (
-        patch.object(bot_module, 'async_get_all_players', async_get_all_players),
+        patch.object(tracker_module, 'async_get_all_players', async_get_all_players),
         patch('asyncio.sleep', sleep_mock),
     ):
         with pytest.raises(asyncio.CancelledError):
-            asyncio.run(bot_module.check_for_game_completion())
+            asyncio.run(tracker_module.check_for_game_completion(MagicMock()))
 
-    assert ('puuid1', 1) not in bot_module.players_in_game
-    assert ('puuid1', 1) not in bot_module.players_in_game_messages
+    assert ('puuid1', 1) not in tracker_module.players_in_game
+    assert ('puuid1', 1) not in tracker_module.players_in_game_messages
 
 
-def test_check_for_game_completion_updates_flex_rank(bot_module):
-    bot_module.players_in_game = {('p1', 1)}
-    bot_module.players_in_game_messages = {}
-    bot_module.recent_match_lp_changes = {}
+def test_check_for_game_completion_updates_flex_rank(tracker_module):
+    tracker_module.players_in_game = {('p1', 1)}
+    tracker_module.players_in_game_messages = {}
+    tracker_module.recent_match_lp_changes = {}
 
     row = (
         'p1', 'USER#TAG', 1, 123, 'euw1', 'm0',
@@ -58,24 +53,26 @@ def test_check_for_game_completion_updates_flex_rank(bot_module):
     update_player_guild = MagicMock()
     send_match_result_embed = AsyncMock()
     leaderboard_update = AsyncMock()
+    record_change = MagicMock()
 
     with (
-        patch.object(bot_module, 'async_get_all_players', async_get_all_players),
-        patch.object(bot_module, 'async_is_in_game', async_is_in_game),
-        patch.object(bot_module, 'async_get_last_match', async_get_last_match),
-        patch.object(bot_module, 'async_fetch_json', async_fetch_json),
-        patch.object(bot_module, 'async_get_match_details', async_get_match_details),
-        patch.object(bot_module, 'get_summoner_rank_details_by_puuid', get_rank_details),
-        patch.object(bot_module, 'calculate_lp_change', calc_lp_change),
-        patch.object(bot_module, 'update_player_global', update_player_global),
-        patch.object(bot_module, 'update_player_guild', update_player_guild),
-        patch.object(bot_module, 'send_match_result_embed', send_match_result_embed),
-        patch.object(bot_module.leaderboard, 'update_leaderboard_message', leaderboard_update),
-        patch.object(bot_module, 'get_guild', return_value=(1, 456, 1)),
+        patch.object(tracker_module, 'async_get_all_players', async_get_all_players),
+        patch.object(tracker_module, 'async_is_in_game', async_is_in_game),
+        patch.object(tracker_module, 'async_get_last_match', async_get_last_match),
+        patch.object(tracker_module, 'async_fetch_json', async_fetch_json),
+        patch.object(tracker_module, 'async_get_match_details', async_get_match_details),
+        patch.object(tracker_module, 'record_change', record_change),
+        patch.object(tracker_module, 'get_summoner_rank_details_by_puuid', get_rank_details),
+        patch.object(tracker_module, 'calculate_lp_change', calc_lp_change),
+        patch.object(tracker_module, 'update_player_global', update_player_global),
+        patch.object(tracker_module, 'update_player_guild', update_player_guild),
+        patch.object(tracker_module, 'send_match_result_embed', send_match_result_embed),
+        patch('leaderboard.update_leaderboard_message', leaderboard_update),
+        patch.object(tracker_module, 'get_guild', return_value=(1, 456, 1)),
         patch('asyncio.sleep', AsyncMock(side_effect=asyncio.CancelledError)),
     ):
         with pytest.raises(asyncio.CancelledError):
-            asyncio.run(bot_module.check_for_game_completion())
+            asyncio.run(tracker_module.check_for_game_completion(MagicMock()))
 
     async_is_in_game.assert_awaited_once_with('p1', 'euw1', True)
     update_player_global.assert_called_once_with(
@@ -85,3 +82,8 @@ def test_check_for_game_completion_updates_flex_rank(bot_module):
         flex_lp=40,
         lp_change=10
     )
+    record_change.assert_called_once()
+    kind, payload = record_change.call_args.args
+    assert kind == 'match_finished'
+    assert payload['queue'] == 'flex' and payload['match_id'] == 'm1'
+    assert (payload['rank'], payload['tier'], payload['lp'], payload['lp_change']) == ('SILVER', 'II', 40, 10)
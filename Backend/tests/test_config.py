@@ -0,0 +1,16 @@
+from config import env_number
+
+
+def test_env_number_parses_and_falls_back(monkeypatch):
+    monkeypatch.delenv("TEST_SETTING", raising=False)
+    assert env_number("TEST_SETTING", 5) == 5
+
+    monkeypatch.setenv("TEST_SETTING", " 2.5 ")
+    assert env_number("TEST_SETTING", 5) == 2.5
+    assert env_number("TEST_SETTING", 5, int) == 5
+
+    monkeypatch.setenv("TEST_SETTING", "-3")
+    assert env_number("TEST_SETTING", 5, int) == 0
+
+    monkeypatch.setenv("TEST_SETTING", "soon")
+    assert env_number("TEST_SETTING", 5) == 5
@@ -1,13 +1,12 @@
 import asyncio
 from unittest.mock import AsyncMock, MagicMock
-from test_flex_command import bot_module
 
 
-def test_howtosetup_command(bot_module):
+def test_howtosetup_command(commands_module):
     interaction = MagicMock()
     interaction.response.send_message = AsyncMock()
 
-    asyncio.run(bot_module.howtosetup_cmd.callback(interaction))
+    asyncio.run(commands_module.howtosetup_cmd.callback(interaction))
 
     interaction.response.send_message.assert_awaited_once_with(
         (
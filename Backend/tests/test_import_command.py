@@ -0,0 +1,122 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fonction_bdd
+
+ACCOUNTS = {'ALICE/EUW': 'pa', 'BOB/EUW': 'pb', 'CAROL/EUW': 'pc', 'DAVE/EUW': 'pd'}
+LEAGUES = {
+    'pa': [{'queueType': 'RANKED_SOLO_5x5', 'tier': 'GOLD', 'rank': 'II', 'leaguePoints': 40},
+           {'queueType': 'RANKED_FLEX_SR', 'tier': 'SILVER', 'rank': 'I', 'leaguePoints': 3}],
+    'pb': [{'queueType': 'RANKED_SOLO_5x5', 'tier': 'IRON', 'rank': 'IV', 'leaguePoints': 0}],
+    'pc': [],
+    'pd': [{'queueType': 'RANKED_SOLO_5x5', 'tier': 'GOLD', 'rank': 'I', 'leaguePoints': 1}],
+}
+
+
+async def fake_fetch(url, headers=None):
+    if '/by-riot-id/' in url:
+        key = url.split('/by-riot-id/')[1]
+        return {'puuid': ACCOUNTS[key]} if key in ACCOUNTS else None
+    if '/league/v4/' in url:
+        return LEAGUES[url.rsplit('/', 1)[1]]
+    puuid = url.split('/by-puuid/')[1].split('/')[0]
+    return [f'{puuid}-m1']
+
+
+def test_parse_riot_ids(commands_module):
+    usernames, invalid = commands_module.parse_riot_ids(
+        "alice#euw, Bob#EUW\nalice#EUW ; no-tag\n\n  carol # euw  "
+    )
+
+    assert usernames == ['ALICE#EUW', 'BOB#EUW', 'CAROL#EUW']
+    assert invalid == ['no-tag']
+
+
+def test_resolve_reads_both_queues_from_one_league_call(commands_module):
+    fetch = AsyncMock(side_effect=fake_fetch)
+    with (
+        patch.object(commands_module, 'async_fetch_json', fetch),
+        patch.object(commands_module, 'get_api_request_counts', return_value=(0, 0)),
+    ):
+        player, reason = asyncio.run(
+            commands_module.resolve_import_player('ALICE#EUW', 'euw1', 'europe', set())
+        )
+
+    assert reason is None
+    assert player == {
+        'puuid': 'pa', 'username': 'ALICE#EUW', 'tier': 'II', 'rank': 'GOLD', 'lp': 40,
+        'region': 'euw1', 'flex_tier': 'I', 'flex_rank': 'SILVER', 'flex_lp': 3,
+        'last_match_id': 'pa-m1',
+    }
+    assert fetch.await_count == 3
+
+
+def test_resolve_skips_registered_player(commands_module):
+    fetch = AsyncMock(side_effect=fake_fetch)
+    with (
+        patch.object(commands_module, 'async_fetch_json', fetch),
+        patch.object(commands_module, 'get_api_request_counts', return_value=(0, 0)),
+    ):
+        result = asyncio.run(
+            commands_module.resolve_import_player('ALICE#EUW', 'euw1', 'europe', {'pa'})
+        )
+
+    assert result == (None, 'already registered')
+    assert fetch.await_count == 1
+
+
+def test_resolve_waits_under_load(commands_module):
+    counts = iter([(0, 500), (0, 500)] + [(0, 0)] * 3)
+    sleep_mock = AsyncMock()
+    with (
+        patch.object(commands_module, 'async_fetch_json', AsyncMock(side_effect=fake_fetch)),
+        patch.object(commands_module, 'get_api_request_counts', side_effect=lambda: next(counts)),
+        patch('asyncio.sleep', sleep_mock),
+    ):
+        asyncio.run(commands_module.resolve_import_player('BOB#EUW', 'euw1', 'europe', set()))
+
+    assert [c.args[0] for c in sleep_mock.await_args_list] == [commands_module.IMPORT_BACKOFF] * 2
+
+
+def test_import_command_registers_in_one_batch(commands_module, memory_backend):
+    fonction_bdd.insert_guild(1, None, 0)
+    fonction_bdd.insert_player('pd', 'DAVE#EUW', 'I', 'GOLD', 1, 'euw1')
+    fonction_bdd.insert_player_guild('pd', 1, 10, 'old')
+
+    interaction = MagicMock()
+    interaction.guild.id = 1
+    interaction.channel.id = 10
+    interaction.response.defer = AsyncMock()
+    progress = MagicMock()
+    progress.edit = AsyncMock()
+    interaction.followup.send = AsyncMock(return_value=progress)
+    attachment = MagicMock()
+    attachment.read = AsyncMock(return_value=b"carol#euw\r\ndave#euw\r\n")
+    region = MagicMock()
+    region.value = 'euw'
+
+    import_players = MagicMock(side_effect=fonction_bdd.import_players)
+    with (
+        patch.object(commands_module, 'async_fetch_json', AsyncMock(side_effect=fake_fetch)),
+        patch.object(commands_module, 'get_api_request_counts', return_value=(0, 0)),
+        patch.object(commands_module, 'import_players', import_players),
+        patch.object(commands_module.leaderboard_refresher, 'mark_dirty') as mark_dirty,
+    ):
+        asyncio.run(commands_module.import_cmd.callback(
+            interaction, region, "alice#euw, bob#euw, nobody#euw, bad", attachment
+        ))
+
+    import_players.assert_called_once()
+    assert sorted(p for p, _ in fonction_bdd.get_guild_usernames(1)) == ['pa', 'pb', 'pd']
+    assert fonction_bdd.get_player('pa', 1)[5] == 'pa-m1'
+    assert fonction_bdd.get_player('pd', 1)[5] == 'old'
+    mark_dirty.assert_not_called()
+    assert fonction_bdd.get_leaderboard_by_guild(1) is None
+
+    interaction.followup.send.assert_awaited_once()
+    summary = progress.edit.await_args.kwargs['content']
+    assert '**2** players registered' in summary
+    assert 'CAROL#EUW: unranked' in summary
+    assert 'DAVE#EUW: already registered' in summary
+    assert 'NOBODY#EUW: not found' in summary
+    assert 'bad: invalid format' in summary
@@ -0,0 +1,137 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from unittest.mock import patch
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+from leaderboard_refresh import LeaderboardRefresher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_is_coalesced_into_one_refresh():
+    clock = FakeClock()
+    refresher = LeaderboardRefresher(window=10, settle=2, clock=clock)
+
+    for _ in range(5):  # une premade de cinq joueurs
+        refresher.mark_dirty(1)
+
+    assert refresher.pop_due() == ([], 2)
+    clock.now = 2
+    assert refresher.pop_due() == ([1], None)
+    assert refresher.pending() == []
+
+
+def test_window_limits_refreshes_per_guild():
+    clock = FakeClock()
+    refresher = LeaderboardRefresher(window=10, settle=0, clock=clock)
+    refresher._last_flush[1] = 0
+
+    clock.now = 3
+    refresher.mark_dirty(1)
+    assert refresher.pop_due() == ([], 7)
+    clock.now = 10
+    assert refresher.pop_due() == ([1], None)
+
+
+def test_guilds_are_served_in_dirty_order():
+    clock = FakeClock()
+    refresher = LeaderboardRefresher(window=10, settle=0, clock=clock)
+    # la guilde 1 vient d'être rafraîchie, les autres attendent
+    refresher._last_flush[1] = 0
+    refresher.mark_dirty(1)
+    clock.now = 1
+    refresher.mark_dirty(3)
+    refresher.mark_dirty(2)
+
+    assert refresher.pop_due() == ([3, 2], 9)
+
+
+def test_run_flushes_each_dirty_guild_once():
+    refresher = LeaderboardRefresher(window=0.05, settle=0.01, rate=0)
+    flushed = []
+
+    async def flush(guild_id):
+        flushed.append(guild_id)
+
+    async def scenario():
+        task = asyncio.create_task(refresher.run(flush))
+        await asyncio.sleep(0)
+        for guild_id in (1, 2, 1, 1, 2):
+            refresher.mark_dirty(guild_id)
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert flushed == [1, 2]
+
+
+def test_run_survives_flush_errors():
+    refresher = LeaderboardRefresher(window=0, settle=0, rate=0)
+    flushed = []
+
+    async def flush(guild_id):
+        flushed.append(guild_id)
+        if guild_id == 1:
+            raise RuntimeError("boom")
+
+    async def scenario():
+        task = asyncio.create_task(refresher.run(flush))
+        await asyncio.sleep(0)
+        refresher.mark_all_dirty([1, 2])
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert flushed == [1, 2]
+
+
+def test_fan_out_is_concurrent_but_bounded():
+    refresher = LeaderboardRefresher(concurrency=3, rate=0)
+    running, peak, done = 0, 0, []
+
+    async def flush(guild_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        done.append(guild_id)
+
+    elapsed = asyncio.run(refresher.fan_out(list(range(9)), flush))
+
+    assert sorted(done) == list(range(9))
+    assert peak == 3
+    assert refresher.last_fan_out == (9, elapsed)
+    assert elapsed < 0.09  # plus rapide qu'en série
+
+
+def test_fan_out_respects_global_rate():
+    clock = FakeClock()
+    refresher = LeaderboardRefresher(concurrency=10, rate=2, clock=clock)
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    async def flush(guild_id):
+        pass
+
+    with patch('leaderboard_refresh.asyncio.sleep', fake_sleep):
+        asyncio.run(refresher.fan_out([1, 2, 3], flush))
+
+    assert sleeps == [0.5, 1.0]
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import sys
+import threading
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import log
+from log import DiscordLogHandler
+
+
+def _handler(**kwargs):
+    channel = MagicMock()
+    channel.send = AsyncMock()
+    bot = MagicMock()
+    bot.get_channel.return_value = channel
+    handler = DiscordLogHandler(bot, 42, **kwargs)
+    handler.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+    return handler, channel
+
+
+def _record(msg, level=logging.ERROR):
+    return logging.LogRecord("test", level, __file__, 1, msg, None, None, "func")
+
+
+def test_records_are_batched_into_one_code_block():
+    handler, channel = _handler()
+    for i in range(3):
+        handler.emit(_record(f"error {i}"))
+
+    assert asyncio.run(handler.flush_once()) == 1
+    channel.send.assert_awaited_once_with(
+        "```\nERROR - error 0\nERROR - error 1\nERROR - error 2\n```"
+    )
+    assert asyncio.run(handler.flush_once()) == 0
+
+
+def test_repeated_lines_are_deduplicated():
+    handler, _ = _handler()
+    for msg in ["boom", "other", "boom", "boom"]:
+        handler.emit(_record(msg))
+
+    assert handler.build_messages() == ["```\nERROR - boom (x3)\nERROR - other\n```"]
+
+
+def test_messages_respect_discord_limit():
+    handler, _ = _handler()
+    for i in range(60):
+        handler.emit(_record(f"{i:03d} " + "x" * 100))
+    handler.emit(_record("y" * 5000))
+
+    messages = handler.build_messages()
+    assert len(messages) > 1
+    assert all(len(m) <= log.MESSAGE_LIMIT for m in messages)
+    assert all(m.startswith("```\n") and m.endswith("\n```") for m in messages)
+
+
+def test_entries_wait_for_the_channel():
+    handler, channel = _handler()
+    handler.bot.get_channel.return_value = None
+    handler.emit(_record("early error"))
+
+    assert asyncio.run(handler.flush_once()) == 0
+    assert handler.queue_size() == 1
+
+    handler.bot.get_channel.return_value = channel
+    assert asyncio.run(handler.flush_once()) == 1
+    channel.send.assert_awaited_once_with("```\nERROR - early error\n```")
+
+
+def test_overflow_is_dropped_and_reported():
+    handler, _ = _handler(max_queue=5, max_messages=1)
+    for i in range(8):
+        handler.emit(_record(f"error {i}"))
+
+    assert handler.dropped == 3
+    messages = handler.build_messages()
+    assert messages == [
+        "```\n" + "\n".join(f"ERROR - error {i}" for i in range(5))
+        + "\n... 3 log entries dropped\n```"
+    ]
+    assert handler.dropped == 0
+
+
+def test_excess_messages_per_flush_are_counted():
+    handler, _ = _handler(max_messages=2)
+    for i in range(100):
+        handler.emit(_record(f"{i:03d} " + "x" * 200))
+
+    messages = handler.build_messages()
+    assert len(messages) == 2
+    assert messages[-1].endswith("log entries dropped\n```")
+    assert all(len(m) <= log.MESSAGE_LIMIT for m in messages)
+    kept = sum(m.count(" xxx") for m in messages)
+    dropped = int(messages[-1].rsplit("... ", 1)[1].split()[0])
+    assert kept + dropped == 100
+
+
+def test_emit_is_safe_from_threads():
+    handler, _ = _handler(max_queue=10000, max_messages=100)
+    threads = [
+        threading.Thread(target=lambda t=t: [handler.emit(_record(f"{t}-{i}")) for i in range(200)])
+        for t in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    lines = "".join(handler.build_messages()).count("ERROR - ")
+    assert lines == 8 * 200
+    handler.bot.loop.create_task.assert_not_called()
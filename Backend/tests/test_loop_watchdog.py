@@ -0,0 +1,61 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import loop_watchdog
+from loop_watchdog import LoopWatchdog
+
+
+def test_stall_is_reported_once_with_blocking_site():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.05)
+    watchdog._loop_thread_id = threading.get_ident()
+    before = loop_watchdog.loop_blocked.value()
+
+    with patch.object(loop_watchdog.logging, 'warning') as warning:
+        watchdog._beat = time.monotonic()
+        assert watchdog.check() is False
+
+        now = watchdog._beat + 0.5
+        assert watchdog.check(now) is True
+        assert watchdog.check(now + 0.1) is False  # même blocage
+
+    assert loop_watchdog.loop_blocked.value() == before + 1
+    warning.assert_called_once()
+    assert "test_loop_watchdog.py" in warning.call_args.args[0]
+
+
+def test_logs_are_throttled_per_call_site():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.05, log_interval=60)
+    watchdog._loop_thread_id = threading.get_ident()
+
+    with patch.object(loop_watchdog.logging, 'warning') as warning:
+        for now in (watchdog._beat + 1, watchdog._beat + 2, watchdog._beat + 70):
+            watchdog._stall_reported = False  # nouveau blocage
+            watchdog.check(now)
+
+    assert warning.call_count == 2
+
+
+def test_watchdog_catches_blocking_coroutine():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02, log_interval=60)
+    lag_before = loop_watchdog.loop_lag.count()
+
+    async def scenario():
+        watchdog.start()
+        await asyncio.sleep(0.1)
+        time.sleep(0.4)  # appel bloquant dans une coroutine
+        await asyncio.sleep(0.05)
+        watchdog.stop()
+
+    with patch.object(loop_watchdog.logging, 'warning') as warning:
+        asyncio.run(scenario())
+
+    assert loop_watchdog.loop_lag.count() > lag_before
+    warning.assert_called_once()
+    assert "time.sleep(0.4)" in warning.call_args.args[0]
@@ -0,0 +1,41 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import fonction_bdd
+
+
+@pytest.fixture(autouse=True)
+def player(any_backend):
+    fonction_bdd.insert_player("p1", "A#1", "I", "GOLD", 50, "euw1")
+
+
+def _match(match_id, played_at, lp_change=None):
+    return {
+        "match_id": match_id, "queue_id": 420, "win": True, "champion": "Ahri",
+        "champion_id": 103, "kills": 1, "deaths": 2, "assists": 3, "damage": 1000,
+        "duration": 1800, "lp_change": lp_change, "early_surrender": False,
+        "played_at": played_at,
+    }
+
+
+def test_history_is_paged_newest_first():
+    fonction_bdd.insert_match_history("p1", [_match(f"m{i}", i) for i in range(15)])
+
+    first = fonction_bdd.get_match_history("p1", 10, 0)
+    second = fonction_bdd.get_match_history("p1", 10, 10)
+
+    assert [m["match_id"] for m in first] == [f"m{i}" for i in range(14, 4, -1)]
+    assert [m["match_id"] for m in second] == [f"m{i}" for i in range(4, -1, -1)]
+    assert fonction_bdd.get_known_match_ids("p1", ["m3", "x"]) == {"m3"}
+
+
+def test_backfill_keeps_known_lp_change():
+    fonction_bdd.insert_match_history("p1", [_match("m1", 1, lp_change=21)])
+    fonction_bdd.insert_match_history("p1", [_match("m1", 1)])
+
+    assert fonction_bdd.get_match_history("p1")[0]["lp_change"] == 21
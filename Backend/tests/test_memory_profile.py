@@ -0,0 +1,71 @@
+import asyncio
+import tracemalloc
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import memory_profile
+
+
+def test_bot_import_does_not_trace():
+    import bot  # noqa: F401
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_profile_reports_new_allocations_and_stops_tracing():
+    kept = []
+
+    async def scenario():
+        task = asyncio.create_task(memory_profile.profile_allocations(0.05, limit=5))
+        await asyncio.sleep(0.01)
+        kept.append([bytearray(1024) for _ in range(500)])  # ~500 KiB
+        return await task
+
+    stats = asyncio.run(scenario())
+
+    assert not tracemalloc.is_tracing()
+    assert stats[0].traceback[0].filename == __file__
+    assert stats[0].size_diff >= 500 * 1024
+    assert __file__ in memory_profile.format_stat(stats[0])
+
+
+def test_profile_keeps_existing_tracing():
+    tracemalloc.start()
+    try:
+        asyncio.run(memory_profile.profile_allocations(0, limit=1))
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def _interaction(user_id):
+    interaction = MagicMock()
+    interaction.user.id = user_id
+    interaction.response.send_message = AsyncMock()
+    interaction.response.defer = AsyncMock()
+    interaction.edit_original_response = AsyncMock()
+    return interaction
+
+
+def test_zmemory_is_owner_only(commands_module):
+    interaction = _interaction(1)
+    with patch.object(commands_module.memory_profile, 'profile_allocations', AsyncMock()) as profile:
+        asyncio.run(commands_module.zmemory.callback(interaction, 5, 3))
+
+    profile.assert_not_awaited()
+    interaction.response.send_message.assert_awaited_once()
+
+
+def test_zmemory_reports_top_lines(commands_module):
+    interaction = _interaction(commands_module.OWNER_ID)
+    stat = MagicMock()
+    with (
+        patch.object(commands_module.memory_profile, 'profile_allocations',
+                     AsyncMock(return_value=[stat, stat])) as profile,
+        patch.object(commands_module.memory_profile, 'format_stat', return_value="bot.py:1 +1.0 KiB"),
+    ):
+        asyncio.run(commands_module.zmemory.callback(interaction, 30, 2))
+
+    profile.assert_awaited_once_with(30, 2)
+    content = interaction.edit_original_response.await_args.kwargs['content']
+    assert content.count("bot.py:1 +1.0 KiB") == 2
+    assert len(content) <= 2000
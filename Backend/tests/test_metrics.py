@@ -0,0 +1,123 @@
+import sys
+import urllib.request
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import metrics
+from metrics import Registry
+from storage_sqlite import SQLiteStorage
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    requests_total = registry.counter("requests_total", "Requests", ("endpoint", "status"))
+    depth = registry.gauge("depth", "Queue depth", ("queue",))
+    latency = registry.histogram("latency_seconds", "Latency", ("endpoint",), buckets=(0.1, 1))
+
+    requests_total.inc(endpoint="league", status=200)
+    requests_total.inc(endpoint="league", status=200)
+    requests_total.inc(endpoint='we"ird', status=429)
+    depth.set_function(lambda: 7, queue="log")
+    latency.observe(0.05, endpoint="league")
+    latency.observe(0.5, endpoint="league")
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{endpoint="league",status="200"} 2',
+        'requests_total{endpoint="we\\"ird",status="429"} 1',
+        "# HELP depth Queue depth",
+        "# TYPE depth gauge",
+        'depth{queue="log"} 7',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{endpoint="league",le="0.1"} 1',
+        'latency_seconds_bucket{endpoint="league",le="1"} 2',
+        'latency_seconds_bucket{endpoint="league",le="+Inf"} 2',
+        'latency_seconds_sum{endpoint="league"} 0.55',
+        'latency_seconds_count{endpoint="league"} 2',
+    ]
+
+
+def test_labels_are_checked():
+    counter = Registry().counter("c_total", "C", ("a",))
+    with pytest.raises(ValueError):
+        counter.inc(b=1)
+
+
+def test_http_endpoint_serves_registry():
+    server = metrics.start_http_server(port=0)
+    try:
+        port = server.server_port
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as resp:
+            body = resp.read().decode()
+            content_type = resp.headers["Content-Type"]
+    finally:
+        metrics.stop_http_server()
+
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE riot_requests_total counter" in body
+
+
+def test_endpoint_disabled_without_port(monkeypatch):
+    monkeypatch.delenv("METRICS_PORT", raising=False)
+    assert metrics.start_http_server() is None
+
+
+def test_sqlite_operations_are_timed(tmp_path):
+    backend = SQLiteStorage(str(tmp_path / "metrics.db"))
+    backend.initialize()
+    before = metrics.db_connection.count(op="insert_guild")
+    backend.insert_guild(1, None, 0)
+
+    assert metrics.db_connection.count(op="insert_guild") == before + 1
+
+
+@pytest.mark.parametrize("url, labels", [
+    ("https://europe.api.riotgames.com/riot/account/v1/accounts/by-riot-id/A/B",
+     ("account-v1.by-riot-id", "europe")),
+    ("https://europe.api.riotgames.com/lol/match/v5/matches/by-puuid/p/ids?type=ranked&count=1",
+     ("match-v5.ids", "europe")),
+    ("https://europe.api.riotgames.com/lol/match/v5/matches/EUW1_1", ("match-v5.match", "europe")),
+    ("https://euw1.api.riotgames.com/lol/league/v4/entries/by-puuid/p", ("league-v4.entries", "euw1")),
+    ("https://euw1.api.riotgames.com/lol/spectator/v5/active-games/by-summoner/p",
+     ("spectator-v5.active-game", "euw1")),
+    ("https://ddragon.leagueoflegends.com/api/versions.json", ("ddragon", "global")),
+])
+def test_riot_endpoint_labels(riot_module, url, labels):
+    assert riot_module.riot_endpoint(url) == labels
+
+
+def test_fetch_json_counts_rate_limits(riot_module):
+    url = "https://euw1.api.riotgames.com/lol/league/v4/entries/by-puuid/p"
+    limited = MagicMock(status_code=429)
+    limited.raise_for_status.side_effect = riot_module.requests.exceptions.HTTPError("429")
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = []
+    labels = dict(endpoint="league-v4.entries", region="euw1")
+    before_429 = metrics.riot_rate_limited.value(**labels)
+    before_ok = metrics.riot_requests.value(status=200, **labels)
+    before_latency = metrics.riot_latency.count(**labels)
+
+    with (
+        patch.object(riot_module.requests, 'get', side_effect=[limited, ok]),
+        patch.object(riot_module.time, 'sleep'),
+    ):
+        assert riot_module.fetch_json(url) == []
+
+    assert metrics.riot_rate_limited.value(**labels) == before_429 + 1
+    assert metrics.riot_requests.value(status=200, **labels) == before_ok + 1
+    assert metrics.riot_latency.count(**labels) == before_latency + 2
+
+
+def test_metric_kinds_must_define_samples():
+    class Incomplete(metrics._Metric):
+        kind = "untyped"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "no samples")
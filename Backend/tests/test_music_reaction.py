@@ -7,17 +7,13 @@ import asyncio
 import pytest
 
 @pytest.fixture(scope="module")
-def bot_module():
+def tracker_module():
     root = Path(__file__).resolve().parents[1]
     sys.path.insert(0, str(root))
-    if 'bot' in sys.modules:
-        del sys.modules['bot']
-    with patch("discord.Client.run"):
-        module = importlib.import_module('bot')
-    module.discord_handler.emit = lambda *a, **k: None
-    return module
+    return importlib.import_module('tracker')
 
-def test_handle_music_reaction(bot_module):
+def test_handle_music_reaction(tracker_module):
+    client = MagicMock()
     payload = SimpleNamespace(
         emoji='🎉',
         guild_id=1,
@@ -32,7 +28,7 @@ def test_handle_music_reaction(bot_module):
     guild.get_member.return_value = member
     guild.get_channel.return_value = MagicMock()
     guild.get_channel.return_value.fetch_message = AsyncMock(return_value=MagicMock(
-        author=bot_module.client.user,
+        author=client.user,
         embeds=[MagicMock(title='Victory for Player')]
     ))
     guild.voice_client = None
@@ -43,12 +39,12 @@ def test_handle_music_reaction(bot_module):
     voice_client.disconnect = AsyncMock()
 
     with (
-        patch.object(bot_module.client, 'get_guild', return_value=guild),
+        patch.object(client, 'get_guild', return_value=guild),
         patch.object(Path, 'exists', return_value=True),
         patch('discord.FFmpegPCMAudio'),
         patch('asyncio.sleep', new_callable=AsyncMock),
     ):
-        asyncio.run(bot_module.handle_music_reaction(payload))
+        asyncio.run(tracker_module.handle_music_reaction(client, payload))
 
     member.voice.channel.connect.assert_called_once()
     voice_client.play.assert_called_once()
@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import fonction_bdd
+import rank_math
+
+
+@pytest.mark.parametrize("rank, division, lp", [
+    ("IRON", "IV", 0),
+    ("GOLD", "II", 57),
+    ("DIAMOND", "I", 99),
+    ("MASTER", "I", 0),
+    ("GRANDMASTER", "I", 450),
+    ("CHALLENGER", "I", 1500),
+])
+def test_score_round_trip(rank, division, lp):
+    assert rank_math.from_score(rank_math.ladder_score(rank, division, lp)) == (rank, division, lp)
+
+
+def test_score_orders_by_rank_then_division_then_lp():
+    ranked = [
+        ("SILVER", "I", 99),
+        ("GOLD", "IV", 0),
+        ("GOLD", "III", 10),
+        ("MASTER", "I", 900),
+        ("GRANDMASTER", "I", 0),
+    ]
+    scores = [rank_math.ladder_score(*r) for r in ranked]
+    assert scores == sorted(scores)
+    assert rank_math.ladder_score(None, None, None) is None
+    assert rank_math.ladder_score("GOLD", "V", 10) is None
+
+
+def test_leaderboard_ordered_by_stored_score(any_backend):
+    fonction_bdd.insert_guild(1, 10, 0)
+    lb_id = fonction_bdd.insert_leaderboard(1)
+    players = [
+        ("p1", "LOW#1", "I", "SILVER", 99),
+        ("p2", "UNRANKED#2", None, None, None),
+        ("p3", "HIGH#3", "IV", "GOLD", 0),
+        ("p4", "MID#4", "IV", "GOLD", 0),
+    ]
+    for puuid, name, division, rank, lp in players:
+        fonction_bdd.insert_player(puuid, name, division, rank, lp, "euw1")
+        fonction_bdd.insert_player_guild(puuid, 1, 10)
+        fonction_bdd.insert_leaderboard_member(lb_id, puuid)
+    fonction_bdd.update_player_global("p3", tier="III", rank="GOLD", lp=20, lp_change=120)
+
+    rows = fonction_bdd.get_leaderboard_data(lb_id, 1)
+
+    assert [r[0] for r in rows] == ["HIGH#3", "MID#4", "LOW#1", "UNRANKED#2"]
+    assert [r[0] for r in fonction_bdd.get_leaderboard_data(lb_id, 1, limit=2)] == ["HIGH#3", "MID#4"]
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import recap
+
+
+def _aggregate(count, period="daily"):
+    players = [
+        {
+            "username": f"PLAYER{i:03d}#EUW", "tier": "II", "rank": "GOLD", "lp": 40,
+            "delta": 100 - 5 * i, "lp_24h": 100 - 5 * i, "lp_7d": 10,
+            "games": i % 4, "wins": (i % 4) // 2,
+        }
+        for i in range(count)
+    ]
+    return {"snapshot_id": 1, "guild_id": 1, "period": period, "players": players}
+
+
+def test_small_recap_is_summary_plus_one_page():
+    embeds = recap.build_recap_embeds(_aggregate(3))
+
+    assert len(embeds) == 2
+    summary = {f.name: f.value for f in embeds[0].fields}
+    assert summary["Top gainers"].splitlines()[0] == "PLAYER000#EUW +100 LP"
+    assert "Top losers" not in summary
+    assert "3 players · 3 games" in embeds[0].description
+    assert [f.name for f in embeds[1].fields] == [
+        "1. PLAYER000#EUW", "2. PLAYER001#EUW", "3. PLAYER002#EUW"
+    ]
+
+
+def test_large_recap_respects_discord_limits():
+    aggregate = _aggregate(120, period="weekly")
+    embeds = recap.build_recap_embeds(aggregate)
+
+    assert all(len(e.fields) <= recap.EMBED_FIELD_LIMIT for e in embeds)
+    assert all(len(e) <= recap.EMBED_CHAR_LIMIT for e in embeds)
+    assert sum(len(e.fields) for e in embeds[1:]) == 120
+    assert embeds[1].title == f"Weekly recap — players (1/{len(embeds) - 1})"
+    losers = {f.name: f.value for f in embeds[0].fields}["Top losers"].splitlines()
+    assert losers[0] == "PLAYER119#EUW -495 LP"
+
+    messages = recap.group_embeds_for_messages(embeds)
+    assert [e for m in messages for e in m] == embeds
+    for message in messages:
+        assert len(message) <= recap.MESSAGE_EMBED_LIMIT
+        assert sum(len(e) for e in message) <= recap.EMBED_CHAR_LIMIT
@@ -4,19 +4,20 @@ from pathlib import Path
 root = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(root))
 
-import create_db
 import fonction_bdd
+import storage
+from storage_sqlite import SQLiteStorage
 
 TEST_DB = root / "test_recap.db"
-create_db.DB_PATH = str(TEST_DB)
-fonction_bdd.DB_PATH = str(TEST_DB)
 
 def setup_module(module):
     if TEST_DB.exists():
         TEST_DB.unlink()
-    create_db.create_db()
+    module.previous_storage = storage.set_storage(SQLiteStorage(str(TEST_DB)))
+    storage.get_storage().initialize()
 
 def teardown_module(module):
+    storage.set_storage(module.previous_storage)
     if TEST_DB.exists():
         TEST_DB.unlink()
 
@@ -0,0 +1,148 @@
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import discord
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import fonction_bdd
+import leaderboard_tasks
+
+
+pytestmark = pytest.mark.usefixtures("memory_backend")
+
+
+def test_offsets_use_slot_or_spread_hash():
+    assert leaderboard_tasks.guild_recap_offset(42, 5, 30) == 300
+    assert leaderboard_tasks.guild_recap_offset(42, None, 0) == 0
+    offsets = {leaderboard_tasks.guild_recap_offset(g, None, 30) for g in range(100)}
+    assert all(0 <= o < 1800 for o in offsets)
+    assert len(offsets) > 50  # les guildes sont bien étalées
+    assert leaderboard_tasks.guild_recap_offset(42, None, 30) == \
+        leaderboard_tasks.guild_recap_offset(42, None, 30)
+
+
+def test_run_staggered_waits_for_each_guild_slot():
+    fonction_bdd.set_recap_slot(1, 10)
+    fonction_bdd.set_recap_slot(2, 0)
+    sleeps, done = [], []
+
+    async def fake_sleep(delay):
+        sleeps.append(round(delay))
+
+    async def job(guild_id):
+        done.append(guild_id)
+
+    with patch.object(leaderboard_tasks.asyncio, 'sleep', fake_sleep):
+        asyncio.run(leaderboard_tasks.run_staggered([1, 2], job, spread_minutes=30))
+
+    assert sleeps == [600]
+    assert sorted(done) == [1, 2]
+
+
+def test_run_staggered_caps_concurrency():
+    running, peak = 0, 0
+
+    async def job(guild_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    asyncio.run(leaderboard_tasks.run_staggered(range(8), job, spread_minutes=0, concurrency=2))
+    assert peak == 2
+
+
+def test_send_pending_recaps_for_one_guild():
+    for guild_id in (1, 2):
+        fonction_bdd.insert_guild(guild_id, 10 * guild_id, 0)
+        fonction_bdd.set_recap_mode(guild_id, "daily", True)
+        fonction_bdd.insert_player(f"p{guild_id}", f"P#{guild_id}", "I", "GOLD", 50, "euw1")
+        fonction_bdd.update_player_global(f"p{guild_id}", lp_change=10)
+        fonction_bdd.insert_player_guild(f"p{guild_id}", guild_id, 10 * guild_id)
+        lb_id = fonction_bdd.insert_leaderboard(guild_id)
+        fonction_bdd.insert_leaderboard_member(lb_id, f"p{guild_id}")
+    fonction_bdd.reset_lp_for_period("daily")
+
+    channel = AsyncMock()
+    bot = AsyncMock()
+    bot.get_channel = lambda channel_id: channel
+
+    asyncio.run(leaderboard_tasks.send_pending_recaps(bot, 2))
+
+    channel.send.assert_awaited_once()
+    assert [s[1] for s in fonction_bdd.get_unsent_recap_snapshots()] == [1]
+
+
+def test_monday_resets_send_each_recap_once(monkeypatch):
+    monkeypatch.setenv("RECAP_SPREAD_MINUTES", "0")
+    fonction_bdd.insert_guild(1, 10, 0)
+    fonction_bdd.set_recap_mode(1, "daily", True)
+    fonction_bdd.set_recap_mode(1, "weekly", True)
+    fonction_bdd.insert_player("p1", "P#1", "I", "GOLD", 50, "euw1")
+    fonction_bdd.update_player_global("p1", lp_change=10)
+    fonction_bdd.insert_player_guild("p1", 1, 10)
+    lb_id = fonction_bdd.insert_leaderboard(1)
+    fonction_bdd.insert_leaderboard_member(lb_id, "p1")
+    fonction_bdd.reset_lp_for_period("daily")
+    fonction_bdd.reset_lp_for_period("weekly")
+
+    sent = []
+
+    async def send(embeds):
+        await asyncio.sleep(0)
+        sent.append(embeds[0].title)
+
+    channel = AsyncMock()
+    channel.send = send
+    bot = AsyncMock()
+    bot.get_channel = lambda channel_id: channel
+
+    async def scenario():
+        await asyncio.gather(
+            leaderboard_tasks.deliver_period(bot, "daily"),
+            leaderboard_tasks.deliver_period(bot, "weekly"),
+            leaderboard_tasks.send_pending_recaps(bot),
+        )
+
+    with patch.object(leaderboard_tasks.leaderboard_refresher, 'mark_dirty'):
+        asyncio.run(scenario())
+
+    assert len(sent) == 2 and len(set(sent)) == 2
+    assert fonction_bdd.get_unsent_recap_snapshots() == []
+
+
+def _response(status):
+    response = MagicMock()
+    response.status = status
+    return response
+
+
+def test_inaccessible_channel_drops_recap_but_transient_error_retries():
+    for guild_id in (1, 2):
+        fonction_bdd.insert_guild(guild_id, 10 * guild_id, 0)
+        fonction_bdd.set_recap_mode(guild_id, "daily", True)
+        fonction_bdd.insert_player(f"p{guild_id}", f"P#{guild_id}", "I", "GOLD", 50, "euw1")
+        fonction_bdd.update_player_global(f"p{guild_id}", lp_change=10)
+        fonction_bdd.insert_player_guild(f"p{guild_id}", guild_id, 10 * guild_id)
+        lb_id = fonction_bdd.insert_leaderboard(guild_id)
+        fonction_bdd.insert_leaderboard_member(lb_id, f"p{guild_id}")
+    fonction_bdd.reset_lp_for_period("daily")
+
+    channels = {
+        10: AsyncMock(**{'send.side_effect': discord.Forbidden(_response(403), "Missing Access")}),
+        20: AsyncMock(**{'send.side_effect': discord.HTTPException(_response(500), "Server Error")}),
+    }
+    bot = AsyncMock()
+    bot.get_channel = channels.get
+
+    asyncio.run(leaderboard_tasks.send_pending_recaps(bot))
+
+    channels[10].send.assert_awaited_once()
+    channels[20].send.assert_awaited_once()
+    assert [s[1] for s in fonction_bdd.get_unsent_recap_snapshots()] == [2]
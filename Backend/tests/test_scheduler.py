@@ -0,0 +1,160 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import fonction_bdd
+import leaderboard_tasks
+from scheduler import JobScheduler, every
+
+NOW = datetime(2024, 5, 8, 9, 30, tzinfo=timezone.utc)  # mercredi
+
+
+pytestmark = pytest.mark.usefixtures("memory_backend")
+
+
+def _scheduler():
+    return JobScheduler(now=lambda: NOW)
+
+
+def test_first_start_records_without_running():
+    scheduler = _scheduler()
+    job = AsyncMock()
+    scheduler.add_job("daily_reset", leaderboard_tasks._next_midnight, job)
+
+    assert asyncio.run(scheduler.run_due()) == []
+    job.assert_not_awaited()
+    assert fonction_bdd.get_job_last_run("daily_reset") == NOW.timestamp()
+
+
+def test_first_start_can_run_immediately():
+    scheduler = _scheduler()
+    job = AsyncMock()
+    scheduler.add_job("username_check", every(timedelta(days=1)), job, run_on_first_start=True)
+
+    assert asyncio.run(scheduler.run_due()) == ["username_check"]
+    assert fonction_bdd.get_job_last_run("username_check") == NOW.timestamp()
+
+
+def test_missed_runs_are_caught_up_once():
+    # Bot arrêté depuis lundi : deux minuits manqués, un seul rattrapage
+    fonction_bdd.set_job_last_run("daily_reset", (NOW - timedelta(days=2)).timestamp())
+    scheduler = _scheduler()
+    job = AsyncMock()
+    scheduler.add_job("daily_reset", leaderboard_tasks._next_midnight, job)
+
+    assert asyncio.run(scheduler.run_due()) == ["daily_reset"]
+    assert asyncio.run(scheduler.run_due()) == []
+    job.assert_awaited_once()
+    assert scheduler.next_due("daily_reset") > NOW
+
+
+def test_job_not_due_is_not_run():
+    fonction_bdd.set_job_last_run("weekly_reset", (NOW - timedelta(days=1)).timestamp())
+    scheduler = _scheduler()
+    job = AsyncMock()
+    scheduler.add_job("weekly_reset", leaderboard_tasks._next_monday, job)
+
+    assert asyncio.run(scheduler.run_due()) == []
+    job.assert_not_awaited()
+
+
+def test_failed_run_is_not_recorded():
+    last = (NOW - timedelta(days=2)).timestamp()
+    fonction_bdd.set_job_last_run("daily_reset", last)
+    scheduler = _scheduler()
+    scheduler.add_job("daily_reset", leaderboard_tasks._next_midnight,
+                      AsyncMock(side_effect=RuntimeError("boom")))
+
+    assert asyncio.run(scheduler.run_job("daily_reset")) is False
+    assert fonction_bdd.get_job_last_run("daily_reset") == last
+
+
+def test_reset_scheduler_registers_global_jobs(monkeypatch):
+    monkeypatch.setenv("RECAP_SPREAD_MINUTES", "0")
+    fonction_bdd.insert_guild(1, None, 0)
+    fonction_bdd.insert_guild(2, None, 0)
+    scheduler = _scheduler()
+    bot = object()
+
+    async def scenario():
+        ran = await scheduler.run_due()
+        await asyncio.gather(*leaderboard_tasks._deliveries)
+        return ran
+
+    with (
+        patch.object(leaderboard_tasks, 'send_pending_recaps', AsyncMock()) as send,
+        patch.object(leaderboard_tasks, 'reset_lp_for_period') as reset,
+    ):
+        asyncio.run(leaderboard_tasks.reset_lp_scheduler(bot, scheduler))
+        fonction_bdd.set_job_last_run("weekly_reset", (NOW - timedelta(days=3)).timestamp())
+        fonction_bdd.set_job_last_run("daily_reset", (NOW - timedelta(hours=12)).timestamp())
+        assert asyncio.run(scenario()) == ["daily_reset", "weekly_reset"]
+
+    assert [c.args for c in reset.call_args_list] == [("daily",), ("weekly",)]
+    # au démarrage, puis pour chaque guilde après chacun des deux resets
+    assert send.await_count == 1 + 2 * 2
+
+
+def test_reset_is_recorded_before_delivery():
+    # Un arrêt pendant l'étalement des recaps ne doit pas rejouer le reset
+    fonction_bdd.insert_guild(1, None, 0)
+    scheduler = _scheduler()
+    scheduler.add_job("daily_reset", leaderboard_tasks._next_midnight,
+                      lambda: leaderboard_tasks.run_lp_reset(object(), "daily"))
+    fonction_bdd.set_job_last_run("daily_reset", (NOW - timedelta(days=1)).timestamp())
+
+    async def stuck(*args, **kwargs):
+        await asyncio.Event().wait()
+
+    async def scenario():
+        assert await scheduler.run_job("daily_reset") is True
+        recorded = fonction_bdd.get_job_last_run("daily_reset")
+        pending = list(leaderboard_tasks._deliveries)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return recorded, pending
+
+    with (
+        patch.object(leaderboard_tasks, 'run_staggered', stuck),
+        patch.object(leaderboard_tasks, 'reset_lp_for_period') as reset,
+    ):
+        recorded, pending = asyncio.run(scenario())
+
+    reset.assert_called_once_with("daily")
+    assert recorded == NOW.timestamp()
+    assert len(pending) == 1
+
+
+def test_failed_delivery_is_retried_without_resetting_again(monkeypatch):
+    monkeypatch.setenv("RECAP_SPREAD_MINUTES", "0")
+    fonction_bdd.insert_guild(1, None, 0)
+    scheduler = _scheduler()
+    scheduler.add_job("daily_reset", leaderboard_tasks._next_midnight,
+                      lambda: leaderboard_tasks.run_lp_reset(object(), "daily"))
+    fonction_bdd.set_job_last_run("daily_reset", (NOW - timedelta(days=1)).timestamp())
+
+    async def scenario():
+        ok = await scheduler.run_job("daily_reset")
+        await asyncio.gather(*leaderboard_tasks._deliveries)
+        return ok
+
+    with (
+        patch.object(leaderboard_tasks, 'send_pending_recaps',
+                     AsyncMock(side_effect=RuntimeError("discord down"))) as send,
+        patch.object(leaderboard_tasks, 'get_unsent_recap_snapshots', return_value=[(1, 1, "daily")]),
+        patch.object(leaderboard_tasks, 'reset_lp_for_period') as reset,
+        patch.object(leaderboard_tasks.asyncio, 'sleep', AsyncMock()),
+    ):
+        assert asyncio.run(scenario()) is True
+
+    reset.assert_called_once_with("daily")
+    assert fonction_bdd.get_job_last_run("daily_reset") == NOW.timestamp()
+    assert send.await_count == 1 + leaderboard_tasks.RECAP_DELIVERY_RETRIES
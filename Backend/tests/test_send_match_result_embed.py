@@ -1,27 +1,22 @@
 import importlib
 import sys
 from pathlib import Path
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock
 import asyncio
 import discord
 import pytest
 
 @pytest.fixture(scope="module")
-def bot_module():
+def tracker_module():
     root = Path(__file__).resolve().parents[1]
     sys.path.insert(0, str(root))
-    if 'bot' in sys.modules:
-        del sys.modules['bot']
-    with patch('discord.Client.run'):
-        module = importlib.import_module('bot')
-    module.discord_handler.emit = lambda *a, **k: None
-    return module
+    return importlib.import_module('tracker')
 
 
-def test_send_match_result_embed_early_surrender(bot_module):
+def test_send_match_result_embed_early_surrender(tracker_module):
     channel = AsyncMock()
     asyncio.run(
-        bot_module.send_match_result_embed(
+        tracker_module.send_match_result_embed(
             channel,
             'Player',
             ':red_circle:',
@@ -7,18 +7,14 @@ import asyncio
 import pytest
 
 @pytest.fixture(scope="module")
-def bot_module():
+def tracker_module():
     root = Path(__file__).resolve().parents[1]
     sys.path.insert(0, str(root))
-    if 'bot' in sys.modules:
-        del sys.modules['bot']
-    with patch('discord.Client.run'):
-        module = importlib.import_module('bot')
-    module.discord_handler.emit = lambda *a, **k: None
-    return module
+    return importlib.import_module('tracker')
 
 
-def test_handle_spectate_reaction(bot_module):
+def test_handle_spectate_reaction(tracker_module):
+    client = MagicMock()
     payload = SimpleNamespace(
         emoji='📽️',
         guild_id=1,
@@ -28,7 +24,7 @@ def test_handle_spectate_reaction(bot_module):
     )
 
     message = MagicMock(id=3)
-    message.author = bot_module.client.user
+    message.author = client.user
     message.embeds = [MagicMock(title="Player is playing a game!")]
 
     guild = MagicMock()
@@ -38,19 +34,19 @@ def test_handle_spectate_reaction(bot_module):
     guild.get_channel.return_value = channel
     guild.fetch_member = AsyncMock(return_value=MagicMock())
 
-    bot_module.players_in_game_messages = {('puuid', 1): message}
+    tracker_module.players_in_game_messages = {('puuid', 1): message}
 
     with (
-        patch.object(bot_module.client, 'get_guild', return_value=guild),
-        patch.object(bot_module, 'get_player', return_value=(
+        patch.object(client, 'get_guild', return_value=guild),
+        patch.object(tracker_module, 'get_player', return_value=(
             'sid','puuid','Player',1,2,'m1','IV','GOLD',50,0,0,'euw1','IV','GOLD',50
         )),
-        patch.object(bot_module, 'async_fetch_json', AsyncMock(return_value={
+        patch.object(tracker_module, 'async_fetch_json', AsyncMock(return_value={
             'observers': {'encryptionKey': 'key'},
             'gameId': '123',
             'platformId': 'EUW1'
         })),
     ):
-        asyncio.run(bot_module.handle_spectate_reaction(payload))
+        asyncio.run(tracker_module.handle_spectate_reaction(client, payload))
 
     channel.send.assert_awaited_once()
@@ -0,0 +1,165 @@
+import asyncio
+import socket
+import sys
+from contextlib import nullcontext
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from discord import app_commands
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import startup
+
+
+pytestmark = pytest.mark.usefixtures("memory_backend")
+
+
+def make_tree():
+    client = MagicMock()
+    client._connection._command_tree = None
+    tree = app_commands.CommandTree(client)
+
+    @app_commands.command(name="ping", description="Ping")
+    async def ping(interaction):
+        pass
+
+    tree.add_command(ping)
+    tree.sync = AsyncMock()
+    return tree
+
+
+def test_startup_runs_once_across_reconnects():
+    steps = AsyncMock()
+    runner = startup.Startup(steps)
+
+    async def scenario():
+        return await asyncio.gather(runner.run(), runner.run(), runner.run())
+
+    results = asyncio.run(scenario())
+
+    steps.assert_awaited_once()
+    assert sorted(results) == [False, False, True]
+    assert runner.ready_count == 3
+
+
+def test_supervisor_starts_each_service_once():
+    started = []
+
+    async def service():
+        started.append(1)
+        await asyncio.Event().wait()
+
+    async def scenario():
+        supervisor = startup.ServiceSupervisor()
+        first = supervisor.start("loop", service)
+        second = supervisor.start("loop", service)
+        await asyncio.sleep(0)
+        running = supervisor.running()
+        await supervisor.stop()
+        return first, second, running
+
+    first, second, running = asyncio.run(scenario())
+
+    assert (first, second) == (True, False)
+    assert running == ["loop"]
+    assert started == [1]
+
+
+def test_supervisor_restarts_crashed_service():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("boom")
+        await asyncio.Event().wait()
+
+    async def scenario():
+        supervisor = startup.ServiceSupervisor(restart_delay=0.001, max_restart_delay=0.002)
+        supervisor.start("flaky", flaky)
+        for _ in range(50):
+            await asyncio.sleep(0.005)
+            if len(calls) >= 3:
+                break
+        restarts = supervisor.restarts["flaky"]
+        await supervisor.stop()
+        return restarts
+
+    restarts = asyncio.run(scenario())
+
+    assert len(calls) == 3
+    assert restarts == 2
+
+
+def test_sync_only_when_commands_change():
+    tree = make_tree()
+
+    assert asyncio.run(startup.sync_commands_if_changed(tree, 1)) is True
+    assert asyncio.run(startup.sync_commands_if_changed(tree, 1)) is False
+    assert tree.sync.await_count == 1
+
+    @app_commands.command(name="pong", description="Pong")
+    async def pong(interaction):
+        pass
+
+    tree.add_command(pong)
+    assert asyncio.run(startup.sync_commands_if_changed(tree, 1)) is True
+    assert tree.sync.await_count == 2
+
+
+def _start_bot(bind_metrics: bool = False):
+    import bot
+
+    client = bot.create_bot(log_channel_id=7)
+    client.tree.sync = AsyncMock()
+
+    async def idle(*args, **kwargs):
+        await asyncio.Event().wait()
+
+    async def scenario():
+        with (
+            patch.object(bot, 'refresh_ddragon'),
+            patch.object(bot, 'reset_lp_scheduler', AsyncMock()),
+            patch.object(bot, 'loop_watchdog'),
+            patch.object(bot, 'job_scheduler') as scheduler,
+            patch.object(bot.tracker, 'check_ingame', idle),
+            patch.object(bot.tracker, 'check_for_game_completion', idle),
+            patch.object(bot.leaderboard_refresher, 'run', idle),
+            patch.object(client.discord_handler, 'run', idle),
+        ):
+            metrics_server = nullcontext() if bind_metrics else patch.object(bot.metrics, 'start_http_server')
+            with metrics_server:
+                await client.on_ready()
+                await client.on_ready()
+            running = sorted(client.supervisor.running())
+            await client.supervisor.stop()
+        return client, running, scheduler
+
+    return asyncio.run(scenario())
+
+
+def test_bot_on_ready_starts_services_once():
+    client, running, scheduler = _start_bot()
+
+    assert running == ["check_for_game_completion", "check_ingame", "discord_log", "leaderboard_refresh"]
+    scheduler.start.assert_called_once()
+    client.tree.sync.assert_awaited_once()
+
+
+def test_startup_survives_busy_metrics_port(monkeypatch):
+    import metrics
+
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        monkeypatch.setenv("METRICS_PORT", str(busy.getsockname()[1]))
+        monkeypatch.setattr(metrics, "_server", None)
+        client, running, scheduler = _start_bot(bind_metrics=True)
+
+    assert metrics._server is None
+    assert client.startup.done
+    assert running == ["check_for_game_completion", "check_ingame", "discord_log", "leaderboard_refresh"]
+    scheduler.start.assert_called_once()
@@ -0,0 +1,167 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import storage
+from storage_memory import MemoryStorage
+from storage_sqlite import SQLiteStorage
+
+
+def test_player_lifecycle(any_backend):
+    any_backend.insert_guild(1, None, 0)
+    any_backend.insert_guild(1, 99, None)
+    any_backend.set_guild_flex_mode(1, True)
+    any_backend.insert_player("p1", "A#1", "II", "GOLD", 10, "euw1", "I", "SILVER", 5)
+    any_backend.insert_player_guild("p1", 1, 10, "m0")
+    any_backend.update_player_global("p1", tier="I", rank="GOLD", lp=30, lp_change=120)
+    any_backend.update_player_guild("p1", 1, last_match_id="m1")
+
+    expected = ("p1", "A#1", 1, 10, "euw1", "m1", "I", "GOLD", 30, 120, 120, "I", "SILVER", 5)
+    assert any_backend.get_guild(1) == (1, 99, 1)
+    assert any_backend.get_player("p1", 1) == expected
+    assert any_backend.get_all_players() == [expected]
+    assert any_backend.get_player_by_username("A#1", 1) == expected
+    assert any_backend.get_player_by_username("A#1") == ("p1", "A#1", "euw1")
+    assert any_backend.get_guild_usernames(1) == [("p1", "A#1")]
+    assert any_backend.count_players() == 1
+
+    any_backend.delete_player("p1", 1)
+    assert any_backend.get_player("p1", 1) is None
+    assert any_backend.get_all_players() == []
+
+
+def test_rename_players(any_backend):
+    any_backend.insert_guild(1, None, 0)
+    any_backend.insert_player("p1", "A#1", "II", "GOLD", 10, "euw1")
+    any_backend.insert_player("p2", "B#2", "II", "GOLD", 10, "euw1")
+    any_backend.insert_player_guild("p1", 1, 10)
+    any_backend.insert_player_guild("p2", 1, 10)
+
+    any_backend.rename_players([("p1", "C#3"), ("p2", "D#4"), ("missing", "E#5")])
+
+    assert sorted(any_backend.get_guild_usernames(1)) == [("p1", "C#3"), ("p2", "D#4")]
+
+
+def test_import_players(any_backend):
+    any_backend.insert_guild(1, None, 0)
+    any_backend.insert_player("p1", "A#1", "II", "GOLD", 10, "euw1")
+    any_backend.insert_player_guild("p1", 1, 10, "m0")
+    players = [
+        {"puuid": "p1", "username": "A#1", "tier": "I", "rank": "GOLD", "lp": 40,
+         "region": "euw1", "last_match_id": "m9"},
+        {"puuid": "p2", "username": "B#2", "tier": "IV", "rank": "SILVER", "lp": 5,
+         "region": "euw1", "flex_tier": "I", "flex_rank": "BRONZE", "flex_lp": 1,
+         "last_match_id": "m2"},
+    ]
+
+    assert any_backend.import_players(1, 20, players) == ["p2"]
+    assert any_backend.import_players(2, 30, players[1:]) == ["p2"]
+
+    # p1 déjà inscrit : rang mis à jour, inscription (salon, dernier match) conservée
+    assert any_backend.get_player("p1", 1)[3:9] == (10, "euw1", "m0", "I", "GOLD", 40)
+    assert any_backend.get_player("p2", 1) == (
+        "p2", "B#2", 1, 20, "euw1", "m2", "IV", "SILVER", 5, 0, 0, "I", "BRONZE", 1
+    )
+    assert any_backend.get_guild(2) == (2, None, 0)
+
+
+def test_leaderboard_lifecycle(any_backend):
+    any_backend.insert_guild(1, 99, 0)
+    any_backend.insert_player("p1", "A#1", "II", "GOLD", 10, "euw1")
+    any_backend.insert_player_guild("p1", 1, 10)
+    lb_id = any_backend.insert_leaderboard(1)
+    any_backend.insert_leaderboard_member(lb_id, "p1")
+    any_backend.insert_leaderboard_member(lb_id, "p1")
+
+    assert any_backend.get_leaderboard_by_guild(1) == lb_id
+    assert any_backend.get_leaderboard_data(lb_id, 1) == [("A#1", "II", "GOLD", 10, 0, 0)]
+
+    any_backend.delete_leaderboard_member(lb_id, "p1")
+    assert any_backend.get_leaderboard_data(lb_id, 1) == []
+
+    assert any_backend.get_leaderboard_pages(lb_id) == []
+    any_backend.set_leaderboard_page(lb_id, 1, 1235, "def")
+    any_backend.set_leaderboard_page(lb_id, 0, 1234, None)
+    any_backend.set_leaderboard_page(lb_id, 0, 1234, "abc")
+    assert any_backend.get_leaderboard_pages(lb_id) == [(0, 1234, "abc"), (1, 1235, "def")]
+    any_backend.delete_leaderboard_pages(lb_id, 1)
+    assert any_backend.get_leaderboard_pages(lb_id) == [(0, 1234, "abc")]
+
+    any_backend.delete_leaderboard(1)
+    assert any_backend.get_leaderboard_by_guild(1) is None
+    assert any_backend.get_leaderboard_pages(lb_id) == []
+    assert any_backend.get_guild(1) == (1, None, 0)
+
+
+def test_recap_slot(any_backend):
+    assert any_backend.get_recap_slot(1) is None
+    any_backend.set_recap_slot(1, 15)
+    assert any_backend.get_recap_slot(1) == 15
+    any_backend.set_recap_slot(1, None)
+    assert any_backend.get_recap_slot(1) is None
+
+
+def test_job_last_run(any_backend):
+    assert any_backend.get_job_last_run("daily_reset") is None
+    any_backend.set_job_last_run("daily_reset", 100.5)
+    any_backend.set_job_last_run("daily_reset", 200.5)
+    assert any_backend.get_job_last_run("daily_reset") == 200.5
+
+
+def test_bot_state(any_backend):
+    assert any_backend.get_bot_state("command_hash:1") is None
+    any_backend.set_bot_state("command_hash:1", "abc")
+    any_backend.set_bot_state("command_hash:1", "def")
+    assert any_backend.get_bot_state("command_hash:1") == "def"
+
+
+def test_change_feed_ids_increase(any_backend):
+    ids = [any_backend.append_change("match_finished", f'{{"n": {n}}}', 100.0 + n, retention=3) for n in range(5)]
+
+    assert ids == sorted(ids) and len(set(ids)) == 5
+
+
+def test_backend_selection(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "storage.db")
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    assert isinstance(storage.create_storage(), MemoryStorage)
+
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("DB_PATH", db_path)
+    backend = storage.create_storage()
+    assert isinstance(backend, SQLiteStorage)
+    assert backend.db_path == db_path
+
+    monkeypatch.delenv("DB_PATH")
+    assert storage.create_storage().db_path == storage.DEFAULT_DB_PATH
+
+    with pytest.raises(ValueError):
+        storage.create_storage("redis")
+
+
+def test_leaderboard_message_columns_migrate_to_pages(tmp_path):
+    db_path = tmp_path / "storage.db"
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE guild (guild_id INTEGER PRIMARY KEY, leaderboard_channel_id INTEGER);
+        CREATE TABLE leaderboard (
+            leaderboard_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            message_id INTEGER,
+            content_hash TEXT
+        );
+        INSERT INTO guild VALUES (1, 99);
+        INSERT INTO leaderboard (guild_id, message_id, content_hash) VALUES (1, 555, 'abc');
+    """)
+    conn.commit()
+    conn.close()
+
+    backend = SQLiteStorage(str(db_path))
+    backend.initialize()
+    backend.initialize()
+    assert backend.get_leaderboard_pages(1) == [(0, 555, "abc")]
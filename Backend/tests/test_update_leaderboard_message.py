@@ -1,8 +1,10 @@
 import importlib
 import sys
 from pathlib import Path
-from unittest.mock import MagicMock, patch
+from contextlib import ExitStack
+from unittest.mock import AsyncMock, MagicMock, patch
 import asyncio
+import discord
 import pytest
 
 @pytest.fixture(scope="module")
@@ -31,3 +33,148 @@ def test_update_leaderboard_message_missing_channel(leaderboard_module):
         log_info.assert_called_once_with(
             "[update_leaderboard_message] Dropped leaderboard for guild 456 because channel 123 is missing"
         )
+
+
+def _channel_with_history(messages):
+    channel = MagicMock()
+    channel.history = MagicMock(side_effect=AssertionError("history should not be read"))
+    if messages is not None:
+        async def history(limit):
+            for msg in messages:
+                yield msg
+        channel.history = MagicMock(side_effect=history)
+    return channel
+
+
+def _patched_storage(leaderboard_module, rows, pages, changes=None):
+    """
+    Remplace la persistance des pages par un dict {page: (message_id, hash)}
+    et le flux des changements par la liste ``changes``.
+    """
+    changes = [] if changes is None else changes
+    return (
+        patch.object(leaderboard_module, 'record_change',
+                     side_effect=lambda kind, payload: changes.append((kind, payload))),
+        patch.object(leaderboard_module, 'get_leaderboard_by_guild', return_value=1),
+        patch.object(leaderboard_module, 'get_leaderboard_data', return_value=rows),
+        patch.object(leaderboard_module, 'get_leaderboard_pages',
+                     side_effect=lambda lb_id: [(p, *pages[p]) for p in sorted(pages)]),
+        patch.object(leaderboard_module, 'set_leaderboard_page',
+                     side_effect=lambda lb_id, p, m, h: pages.__setitem__(p, (m, h))),
+        patch.object(leaderboard_module, 'delete_leaderboard_pages',
+                     side_effect=lambda lb_id, from_page=0: [pages.pop(p) for p in list(pages) if p >= from_page]),
+        patch.dict(leaderboard_module._published_pages, clear=True),
+    )
+
+
+def _bot_with_channel(channel):
+    bot = MagicMock()
+    guild = MagicMock()
+    guild.get_channel.return_value = channel
+    bot.get_guild.return_value = guild
+    return bot
+
+
+def _rows(count):
+    return [(f"PLAYER{i}#EUW", 'I', 'GOLD', i, 0, 0) for i in range(count)]
+
+
+def test_update_leaderboard_message_edits_stored_message(leaderboard_module):
+    channel = _channel_with_history(None)
+    partial = MagicMock()
+    partial.edit = AsyncMock()
+    channel.get_partial_message.return_value = partial
+    pages = {0: (999, None)}
+
+    with ExitStack() as stack:
+        for p in _patched_storage(leaderboard_module, [], pages):
+            stack.enter_context(p)
+        asyncio.run(leaderboard_module.update_leaderboard_message(123, _bot_with_channel(channel), 456))
+
+    channel.get_partial_message.assert_called_once_with(999)
+    partial.edit.assert_awaited_once()
+    channel.history.assert_not_called()
+    assert pages[0][0] == 999
+
+
+def test_update_leaderboard_message_falls_back_when_stored_message_is_gone(leaderboard_module):
+    channel = _channel_with_history([])
+    partial = MagicMock()
+    partial.edit = AsyncMock(side_effect=discord.NotFound(MagicMock(status=404), "gone"))
+    channel.get_partial_message.return_value = partial
+    channel.send = AsyncMock(return_value=MagicMock(id=1000))
+    pages = {0: (999, None)}
+
+    with ExitStack() as stack:
+        for p in _patched_storage(leaderboard_module, [], pages):
+            stack.enter_context(p)
+        asyncio.run(leaderboard_module.update_leaderboard_message(123, _bot_with_channel(channel), 456))
+
+    channel.history.assert_called_once_with(limit=50)
+    channel.send.assert_awaited_once()
+    assert pages[0][0] == 1000
+
+
+def test_update_leaderboard_message_skips_unchanged_content(leaderboard_module):
+    channel = _channel_with_history(None)
+    partial = MagicMock()
+    partial.edit = AsyncMock()
+    channel.get_partial_message.return_value = partial
+    bot = _bot_with_channel(channel)
+    pages = {0: (999, None)}
+    changes = []
+
+    with ExitStack() as stack:
+        for p in _patched_storage(leaderboard_module, _rows(1), pages, changes):
+            stack.enter_context(p)
+        asyncio.run(leaderboard_module.update_leaderboard_message(123, bot, 456))
+        asyncio.run(leaderboard_module.update_leaderboard_message(123, bot, 456))
+        assert partial.edit.await_count == 1
+        assert changes == [("leaderboard", {"guild_id": 456, "rows": [
+            {"username": "PLAYER0#EUW", "rank": "GOLD", "tier": "I", "lp": 0, "lp_24h": 0, "lp_7d": 0},
+        ]})]
+
+        # Après un redémarrage, l'empreinte persistée suffit
+        leaderboard_module._published_pages.clear()
+        asyncio.run(leaderboard_module.update_leaderboard_message(123, bot, 456))
+        assert partial.edit.await_count == 1
+        assert pages[0][1] is not None
+
+
+def test_update_leaderboard_message_paginates_and_edits_changed_pages(leaderboard_module):
+    channel = _channel_with_history([])
+    sent_ids = iter(range(1000, 1100))
+    channel.send = AsyncMock(side_effect=lambda content: MagicMock(id=next(sent_ids)))
+    partials = {}
+
+    def get_partial(message_id):
+        if message_id not in partials:
+            partials[message_id] = MagicMock(edit=AsyncMock(), delete=AsyncMock())
+        return partials[message_id]
+
+    channel.get_partial_message.side_effect = get_partial
+    bot = _bot_with_channel(channel)
+    pages = {}
+    rows = _rows(60)
+
+    with ExitStack() as stack:
+        for p in _patched_storage(leaderboard_module, rows, pages):
+            stack.enter_context(p)
+        asyncio.run(leaderboard_module.update_leaderboard_message(123, bot, 456))
+
+        contents = [call.args[0] for call in channel.send.await_args_list]
+        assert len(contents) == len(pages) > 1
+        assert all(len(c) <= 2000 for c in contents)
+        assert all(c.startswith("```Username") for c in contents)
+
+        # Seul le dernier joueur change : seule la dernière page est éditée
+        rows[-1] = ("PLAYER59#EUW", 'I', 'GOLD', 1, 25, 25)
+        asyncio.run(leaderboard_module.update_leaderboard_message(123, bot, 456))
+        last_id = pages[max(pages)][0]
+        assert [m for m, p in partials.items() if p.edit.await_count] == [last_id]
+
+        # Le classement raccourcit : les pages en trop sont supprimées
+        del rows[2:]
+        asyncio.run(leaderboard_module.update_leaderboard_message(123, bot, 456))
+        assert list(pages) == [0]
+        assert partials[last_id].delete.await_count == 1
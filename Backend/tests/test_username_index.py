@@ -0,0 +1,53 @@
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import fonction_bdd
+from username_index import UsernameIndex
+
+
+def test_search_prefix_then_substring():
+    index = UsernameIndex()
+    index.load(1, [("p1", "ZED#EUW"), ("p2", "ALPHA#ZED"), ("p3", "ZEDDY#1"), ("p4", "BOB#1")])
+
+    assert index.search(1, "zed") == ["ZED#EUW", "ZEDDY#1", "ALPHA#ZED"]
+    assert index.search(1, "") == ["ALPHA#ZED", "BOB#1", "ZED#EUW", "ZEDDY#1"]
+    assert index.search(1, "zed", limit=1) == ["ZED#EUW"]
+    assert index.search(2, "zed") == []
+
+
+def test_add_remove_rename():
+    index = UsernameIndex()
+    index.load(1, [("p1", "OLD#1")])
+    index.load(2, [("p1", "OLD#1")])
+
+    index.add(1, "p2", "NEW#2")
+    index.rename("p1", "RENAMED#1")
+    index.remove(2, "p1")
+    index.add(3, "p3", "IGNORED#3")  # guild not loaded yet
+
+    assert index.search(1, "") == ["NEW#2", "RENAMED#1"]
+    assert index.search(2, "") == []
+    assert not index.is_loaded(3)
+
+
+def test_autocomplete_hits_db_only_once():
+    interaction = MagicMock()
+    interaction.guild.id = 42
+    index = UsernameIndex()
+    load_rows = MagicMock(return_value=[("p1", "FOO#1"), ("p2", "BAR#2")])
+
+    with (
+        patch.object(fonction_bdd, 'username_index', index),
+        patch.object(fonction_bdd, 'get_guild_usernames', load_rows),
+    ):
+        first = asyncio.run(fonction_bdd.username_autocomplete(interaction, "fo"))
+        second = asyncio.run(fonction_bdd.username_autocomplete(interaction, "ba"))
+
+    load_rows.assert_called_once_with(42)
+    assert [c.value for c in first] == ["FOO#1"]
+    assert [c.value for c in second] == ["BAR#2"]
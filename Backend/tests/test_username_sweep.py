@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import nullcontext
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+def _row(puuid, username, guild_id):
+    return (puuid, username, guild_id, 123, 'euw1', 'm0', 'I', 'GOLD', 50, 0, 0, None, None, None)
+
+
+def test_sweep_visits_each_puuid_once_and_batches_renames(tracker_module):
+    rows = [
+        _row('p1', 'OLD#EUW', 1), _row('p1', 'OLD#EUW', 2),  # même joueur, deux guildes
+        _row('p2', 'SAME#EUW', 1),
+        _row('p3', 'OTHER#EUW', 2),
+    ]
+    accounts = {
+        'p1': {'gameName': 'new', 'tagLine': 'euw'},
+        'p2': {'gameName': 'same', 'tagLine': 'euw'},
+        'p3': {'gameName': 'renamed', 'tagLine': 'euw'},
+    }
+
+    async def fetch(url, headers=None):
+        return accounts[url.rsplit('/', 1)[1]]
+
+    fetch_mock = AsyncMock(side_effect=fetch)
+    sleep_mock = AsyncMock()
+    written = []
+    rename_players = MagicMock(side_effect=lambda renames: written.append((renames, fetch_mock.await_count)))
+
+    with (
+        patch.object(tracker_module, 'async_get_all_players', AsyncMock(return_value=rows)),
+        patch.object(tracker_module, 'async_fetch_json', fetch_mock),
+        patch.object(tracker_module, 'get_api_request_counts', return_value=(0, 0)),
+        patch.object(tracker_module, 'rename_players', rename_players),
+        patch.object(tracker_module, 'USERNAME_SWEEP_SECONDS', 300),
+        patch('asyncio.sleep', sleep_mock),
+    ):
+        asyncio.run(tracker_module.check_username_changes())
+
+    assert fetch_mock.await_count == 3
+    # un seul lot, écrit à la fin du passage
+    assert written == [([('p1', 'NEW#EUW'), ('p3', 'RENAMED#EUW')], 3)]
+    assert [c.args[0] for c in sleep_mock.await_args_list] == [100, 100, 100]
+
+
+def test_sweep_backs_off_under_load(tracker_module):
+    counts = iter([(30, 200), (5, 80), (0, 10)])
+    sleep_mock = AsyncMock()
+
+    with (
+        patch.object(tracker_module, 'async_get_all_players',
+                     AsyncMock(return_value=[_row('p1', 'A#EUW', 1)])),
+        patch.object(tracker_module, 'async_fetch_json',
+                     AsyncMock(return_value={'gameName': 'a', 'tagLine': 'euw'})),
+        patch.object(tracker_module, 'get_api_request_counts', side_effect=lambda: next(counts)),
+        patch.object(tracker_module, 'rename_players', MagicMock()) as rename_players,
+        patch('asyncio.sleep', sleep_mock),
+    ):
+        asyncio.run(tracker_module.check_username_changes())
+
+    backoff = tracker_module.USERNAME_SWEEP_BACKOFF
+    assert [c.args[0] for c in sleep_mock.await_args_list][:2] == [backoff, backoff]
+    rename_players.assert_not_called()
+
+
+def _sweep(tracker_module, accounts, fetch=None, **settings):
+    rows = [_row(puuid, 'OLD#EUW', 1) for puuid in accounts]
+    written = []
+
+    async def default_fetch(url, headers=None):
+        return accounts[url.rsplit('/', 1)[1]]
+
+    with (
+        patch.object(tracker_module, 'async_get_all_players', AsyncMock(return_value=rows)),
+        patch.object(tracker_module, 'async_fetch_json', AsyncMock(side_effect=fetch or default_fetch)),
+        patch.object(tracker_module, 'get_api_request_counts', return_value=(0, 0)),
+        patch.object(tracker_module, 'rename_players', MagicMock(side_effect=written.append)),
+        patch('asyncio.sleep', AsyncMock()),
+        patch.multiple(tracker_module, **settings) if settings else nullcontext(),
+    ):
+        try:
+            asyncio.run(tracker_module.check_username_changes())
+        except asyncio.CancelledError:
+            pass
+    return written
+
+
+def test_sweep_flushes_full_or_stale_batches(tracker_module):
+    accounts = {f'p{i}': {'gameName': f'new{i}', 'tagLine': 'euw'} for i in range(5)}
+
+    by_size = _sweep(tracker_module, accounts, USERNAME_SWEEP_BATCH=2)
+    assert [len(batch) for batch in by_size] == [2, 2, 1]
+
+    by_age = _sweep(tracker_module, accounts, USERNAME_SWEEP_FLUSH_SECONDS=0)
+    assert [len(batch) for batch in by_age] == [1, 1, 1, 1, 1]
+
+
+def test_sweep_writes_pending_renames_when_stopped(tracker_module):
+    accounts = {'p1': {'gameName': 'new', 'tagLine': 'euw'}, 'p2': None}
+
+    async def fetch(url, headers=None):
+        if url.endswith('p2'):
+            raise asyncio.CancelledError
+        return accounts['p1']
+
+    assert _sweep(tracker_module, accounts, fetch) == [[('p1', 'NEW#EUW')]]
@@ -0,0 +1,125 @@
+import asyncio
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(root))
+
+import commands
+import fonction_bdd
+import riot_api
+import tracker
+import warmup
+from username_index import username_index
+
+
+@pytest.fixture(autouse=True)
+def warm_state(memory_backend):
+    username_index.clear()
+    mapping = dict(riot_api.CHAMPION_MAPPING)
+    version = list(riot_api.DDRAGON_VERSION_CACHE)
+    yield
+    riot_api.CHAMPION_MAPPING.clear()
+    riot_api.CHAMPION_MAPPING.update(mapping)
+    riot_api.DDRAGON_VERSION_CACHE[:] = version
+    username_index.clear()
+
+
+def test_load_hot_tables_indexes_every_guild():
+    for guild_id in (1, 2):
+        fonction_bdd.insert_guild(guild_id, None)
+    fonction_bdd.insert_player('pa', 'ALICE#EUW', 'II', 'GOLD', 10, 'euw1')
+    fonction_bdd.insert_player('pb', 'BOB#EUW', 'I', 'IRON', 0, 'euw1')
+    fonction_bdd.insert_player_guild('pa', 1, 10)
+    fonction_bdd.insert_player_guild('pb', 1, 10)
+    fonction_bdd.insert_player_guild('pb', 2, 20)
+
+    assert warmup.load_hot_tables() == 2
+
+    assert username_index.is_loaded(1) and username_index.is_loaded(2)
+    assert username_index.search(1, 'b') == ['BOB#EUW']
+    assert username_index.search(2, '') == ['BOB#EUW']
+
+
+def test_ddragon_snapshot_round_trip():
+    riot_api.CHAMPION_MAPPING.clear()
+    riot_api.CHAMPION_MAPPING.update({1: 'Annie', 103: 'Ahri'})
+    riot_api.DDRAGON_VERSION_CACHE[:] = ['15.1.1', 1000.0]
+    warmup.save_ddragon_snapshot()
+
+    riot_api.CHAMPION_MAPPING.clear()
+    riot_api.DDRAGON_VERSION_CACHE[:] = [None, 0.0]
+
+    assert warmup.restore_ddragon_snapshot() == '15.1.1'
+    assert riot_api.CHAMPION_MAPPING == {1: 'Annie', 103: 'Ahri'}
+    assert riot_api.DDRAGON_VERSION_CACHE == ['15.1.1', 1000.0]
+
+
+def test_restore_without_snapshot_is_noop():
+    assert warmup.restore_ddragon_snapshot() is None
+
+    fonction_bdd.set_bot_state(warmup.DDRAGON_SNAPSHOT_KEY, 'not json')
+    assert warmup.restore_ddragon_snapshot() is None
+
+
+def test_refresh_ddragon_skips_download_when_version_unchanged():
+    riot_api.CHAMPION_MAPPING.clear()
+    riot_api.CHAMPION_MAPPING.update({1: 'Annie'})
+    riot_api.DDRAGON_VERSION_CACHE[:] = ['15.1.1', 0.0]
+
+    with (
+        patch.object(riot_api, 'get_ddragon_latest_version', return_value='15.1.1'),
+        patch.object(riot_api, 'init_champion_mapping') as init,
+    ):
+        warmup.refresh_ddragon()
+
+    init.assert_not_called()
+    assert fonction_bdd.get_bot_state(warmup.DDRAGON_SNAPSHOT_KEY) is not None
+
+
+def test_refresh_ddragon_keeps_snapshot_when_download_fails():
+    riot_api.CHAMPION_MAPPING.clear()
+    riot_api.CHAMPION_MAPPING.update({1: 'Annie'})
+    riot_api.DDRAGON_VERSION_CACHE[:] = ['15.1.1', 0.0]
+    warmup.save_ddragon_snapshot()
+
+    with (
+        patch.object(riot_api, 'get_ddragon_latest_version', return_value='15.2.1'),
+        patch.object(riot_api, 'init_champion_mapping', side_effect=riot_api.CHAMPION_MAPPING.clear),
+    ):
+        warmup.refresh_ddragon()
+
+    assert riot_api.CHAMPION_MAPPING == {1: 'Annie'}
+
+
+def test_preload_emblems_reads_bundled_assets_once():
+    with patch.dict(commands._emblems, clear=True):
+        assert commands.preload_emblems() == len(commands.TIER_EMBLEMS)
+        with patch.object(commands, 'EMBLEM_DIR', root / 'missing'):
+            emblem_file, data = commands.get_emblem('gold')
+        assert emblem_file == 'gold.png'
+        assert data == (root / 'assets' / 'gold.png').read_bytes()
+        assert commands.get_emblem('unranked') is None
+
+
+def test_ramp_pause_spreads_first_pass():
+    now = 100.0
+    with (
+        patch.object(tracker.time, 'monotonic', return_value=now),
+        patch.object(tracker.asyncio, 'sleep') as sleep,
+    ):
+        asyncio.run(tracker.ramp_pause(now + 60, 30))
+        asyncio.run(tracker.ramp_pause(now - 1, 30))
+
+    sleep.assert_called_once_with(2.0)
+
+
+def test_create_bot_warms_up_before_connecting():
+    import bot
+
+    client = bot.create_bot(log_channel_id=7)
+
+    assert client.setup_hook is warmup.warm_up
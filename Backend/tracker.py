@@ -0,0 +1,571 @@
+"""
+Suivi des joueurs : détection des parties en cours, fin de partie (LP,
+historique, alertes), vérification quotidienne des usernames et réactions aux
+alertes. Les boucles reçoivent le client Discord en paramètre.
+"""
+import asyncio
+import logging
+import time
+from pathlib import Path
+
+import discord
+
+import metrics
+import rank_math
+from fonction_bdd import (
+    get_player,
+    get_all_players,
+    get_guild,
+    update_player_guild,
+    update_player_global,
+    rename_players,
+    insert_match_history,
+    record_change,
+)
+from leaderboard_refresh import leaderboard_refresher
+from riot_api import (
+    CHAMPION_MAPPING,
+    PLATFORM_TO_CLUSTER,
+    async_fetch_json,
+    async_get_last_match,
+    async_get_match_details,
+    async_is_in_game,
+    get_api_request_counts,
+    get_ddragon_latest_version,
+    get_summoner_rank_details_by_puuid,
+    init_champion_mapping,
+    is_in_game,
+    riot_headers,
+    summarize_match,
+)
+
+players_in_game: set[tuple[str, int]] = set()
+players_in_game_messages: dict[tuple[str, int], discord.Message] = {}
+recent_match_lp_changes: dict[tuple[str, str], tuple[int, float]] = {}
+
+MATCH_CACHE_EXPIRATION = 3600  # seconds
+
+# Après un (re)démarrage, le premier passage de check_ingame est étalé sur
+# POLL_RAMP_SECONDS au lieu d'interroger le spectateur pour tous les joueurs
+# d'un coup ; les passages suivants reprennent le rythme normal.
+POLL_RAMP_SECONDS = 60
+INGAME_POLL_INTERVAL = 15
+
+# Passage quotidien de vérification des usernames : durée sur laquelle les
+# appels sont étalés, écriture des renommages (par lots de USERNAME_SWEEP_BATCH,
+# ou dès que le plus ancien attend depuis USERNAME_SWEEP_FLUSH_SECONDS), et
+# charge Riot (requêtes sur 60 s) au-delà de laquelle il cède la place aux
+# autres tâches.
+USERNAME_SWEEP_SECONDS = 20 * 3600
+USERNAME_SWEEP_BATCH = 20
+USERNAME_SWEEP_FLUSH_SECONDS = 10 * 60
+USERNAME_SWEEP_MAX_LOAD = 60
+USERNAME_SWEEP_BACKOFF = 30
+
+# Mapping from reaction emoji to local music file
+MUSIC_REACTIONS = {
+    "🎉": Path("music/kiffance.mp3"),
+    "🎺": Path("music/ole.mp3"),
+}
+
+
+async def async_get_all_players():
+    return await asyncio.to_thread(get_all_players)
+
+
+async def check_username_changes():
+    """
+    Tâche quotidienne (job "username_check" du scheduler) : vérifie si un
+    joueur a changé de username.
+
+    Chaque puuid n'est interrogé qu'une fois, même inscrit dans plusieurs
+    guildes, et les appels sont étalés sur USERNAME_SWEEP_SECONDS avec une
+    priorité minimale : le passage attend tant que le trafic Riot récent
+    dépasse USERNAME_SWEEP_MAX_LOAD. Les renommages sont écrits par petits
+    lots, au plus USERNAME_SWEEP_FLUSH_SECONDS après leur détection, et le
+    reste est écrit à la fin ou à l'arrêt du passage.
+    """
+    accounts = {}
+    for player in await async_get_all_players():
+        puuid, username, _, _, region, *_ = player
+        accounts.setdefault(puuid, (username, region))
+    if not accounts:
+        return
+
+    interval = USERNAME_SWEEP_SECONDS / len(accounts)
+    renames: list[tuple[str, str]] = []
+    oldest = 0.0
+    try:
+        for puuid, (old_username, region) in accounts.items():
+            while get_api_request_counts()[1] >= USERNAME_SWEEP_MAX_LOAD:
+                await asyncio.sleep(USERNAME_SWEEP_BACKOFF)
+
+            cluster = PLATFORM_TO_CLUSTER.get(region, "europe")
+            url = f"https://{cluster}.api.riotgames.com/riot/account/v1/accounts/by-puuid/{puuid}"
+            headers = riot_headers()
+            data = await async_fetch_json(url, headers=headers)
+            if data:
+                current_username = (
+                        data.get("gameName", "").upper() + "#" + data.get("tagLine", "").upper()
+                )
+                if current_username != old_username:
+                    if not renames:
+                        oldest = time.monotonic()
+                    renames.append((puuid, current_username))
+                    logging.info(
+                        f"Username updated: {old_username} -> {current_username}"
+                    )
+            else:
+                logging.warning(
+                    f"❌ Riot API error for PUUID {puuid}"
+                )
+
+            if renames and (len(renames) >= USERNAME_SWEEP_BATCH
+                            or time.monotonic() - oldest >= USERNAME_SWEEP_FLUSH_SECONDS):
+                await asyncio.to_thread(rename_players, renames)
+                renames = []
+            await asyncio.sleep(interval)
+    finally:
+        if renames:
+            # fin du passage ou arrêt du bot : on écrit ce qui reste
+            rename_players(renames)
+
+
+def calculate_lp_change(old_tier, old_rank, old_lp, new_tier, new_rank, new_lp):
+    """LP gagnés entre deux rangs (tier = division, rank = catégorie), voir rank_math."""
+    if old_rank and new_rank and (
+        rank_math.ladder_score(old_rank, old_tier, 0) is None
+        or rank_math.ladder_score(new_rank, new_tier, 0) is None
+    ):
+        logging.error(
+            f"[LP ERROR] Invalid tier/rank value: {old_rank} {old_tier} -> {new_rank} {new_tier}"
+        )
+    return rank_math.lp_change(old_rank, old_tier, old_lp, new_rank, new_tier, new_lp)
+
+
+###############################################################################
+# Tâches de fond
+###############################################################################
+
+async def ramp_pause(ramp_until: float, remaining: int) -> None:
+    """Pendant la montée en charge, attend la part de temps d'un des ``remaining`` joueurs restants."""
+    left = ramp_until - time.monotonic()
+    if left > 0 and remaining > 0:
+        await asyncio.sleep(left / remaining)
+
+
+async def check_ingame(client: discord.Client, ramp_seconds: float = POLL_RAMP_SECONDS):
+    if not CHAMPION_MAPPING:
+        await asyncio.to_thread(init_champion_mapping)
+
+    ramp_until = time.monotonic() + ramp_seconds
+    while True:
+        started = time.perf_counter()
+        try:
+            players = await async_get_all_players()
+            guild_flex: dict[int, bool] = {}
+            for index, (puuid, username, guild_id, channel_id, region, *_) in enumerate(players):
+                channel = client.get_channel(int(channel_id))
+                if not channel:
+                    continue
+                await ramp_pause(ramp_until, len(players) - index)
+
+                flex_mode = guild_flex.get(guild_id)
+                if flex_mode is None:
+                    guild_row = get_guild(guild_id)
+                    flex_mode = bool(guild_row[2]) if guild_row else False
+                    guild_flex[guild_id] = flex_mode
+
+                champion_id = await is_in_game(puuid, region, flex_mode)
+
+                player_key = (puuid, guild_id)
+
+                if champion_id is not None and player_key not in players_in_game:
+                    champion_name = CHAMPION_MAPPING.get(champion_id)
+                    if champion_name:
+                        version = await asyncio.to_thread(get_ddragon_latest_version)
+                        champion_image_url = (
+                            f"https://ddragon.leagueoflegends.com/cdn/"
+                            f"{version}/img/champion/{champion_name}.png"
+                        )
+                    else:
+                        logging.warning(f"[check_ingame] Unknown champion ID {champion_id} in CHAMPION_MAPPING.")
+                        champion_image_url = None
+
+                    embed = discord.Embed(
+                        title=f"{username} is playing a game!",
+                        color=discord.Color.gold()
+                    )
+                    embed.add_field(name="K/D/A",   value=":hourglass:", inline=True)
+                    embed.add_field(name="Damage", value=":hourglass:", inline=True)
+                    embed.add_field(name="LP",     value=":hourglass:", inline=True)
+
+                    if champion_image_url:
+                        embed.set_thumbnail(url=champion_image_url)
+
+                    try:
+                        with metrics.discord_send.time(kind="ingame"):
+                            msg = await channel.send(embed=embed)
+                    except discord.Forbidden:
+                        logging.warning(
+                            f"[check_ingame] Missing access to channel {channel_id}."
+                        )
+                        msg = None
+
+                    except discord.DiscordException as e:
+                        logging.error(f"[check_ingame] Failed to send in-game embed: {e}")
+                        msg = None
+                    if msg:
+                        players_in_game.add(player_key)
+                        players_in_game_messages[player_key] = msg
+
+                    # Don't remove the player here. The check_for_game_completion task
+                    # will take care of cleanup once the match ID changes.
+        except Exception as e:
+            logging.error(f"[check_ingame] Unexpected error: {e}", exc_info=True)
+        metrics.loop_duration.observe(time.perf_counter() - started, loop="check_ingame")
+
+        await asyncio.sleep(INGAME_POLL_INTERVAL)
+
+
+async def check_for_game_completion(client: discord.Client):
+    """
+    Pour chaque joueur marqué « in game », vérifie s'il a terminé sa partie.
+    Quand la partie se termine :
+      1) on met à jour player_guild.last_match_id
+      2) on met à jour player global (tier, rank, LP)
+      3) on supprime l'embed « En partie »
+      4) on envoie l'embed de résumé de fin de partie
+      5) on met à jour le message du leaderboard dans le salon configuré
+      6) on retire le joueur de players_in_game
+    """
+
+    global recent_match_lp_changes
+
+    while True:
+        started = time.perf_counter()
+        try:
+            now = time.time()
+            recent_match_lp_changes = {
+                k: v for k, v in recent_match_lp_changes.items()
+                if now - v[1] < MATCH_CACHE_EXPIRATION
+            }
+
+            players = await async_get_all_players()
+            player_map = {(row[0], row[2]): row for row in players}
+
+            for player_key in list(players_in_game):
+                row = player_map.get(player_key)
+                if not row:
+                    players_in_game.discard(player_key)
+                    players_in_game_messages.pop(player_key, None)
+                    continue
+
+                (
+                    puuid,
+                    username,
+                    guild_id,
+                    alert_channel_id,
+                    region,
+                    last_match_id,
+                    solo_tier,
+                    solo_rank,
+                    solo_lp,
+                    _lp24h,
+                    _lp7d,
+                    flex_tier,
+                    flex_rank,
+                    flex_lp,
+                ) = row
+
+                guild_row = get_guild(guild_id)
+                flex_mode = bool(guild_row[2]) if guild_row else False
+                if await async_is_in_game(puuid, region, flex_mode):
+                    continue
+
+                cluster = PLATFORM_TO_CLUSTER.get(region, "europe")
+
+                last_matches = await async_get_last_match(puuid, 1, cluster)
+                if not last_matches:
+                    continue
+                new_match_id = last_matches[0]
+                if new_match_id == last_match_id:
+                    continue
+
+                details = await async_get_match_details(new_match_id, puuid, cluster)
+                if not details:
+                    continue
+                result, champion, kills, deaths, assists, game_duration, champ_img, damage = details
+
+                match = await async_fetch_json(
+                    f"https://{cluster}.api.riotgames.com/lol/match/v5/matches/{new_match_id}",
+                    headers=riot_headers()
+                )
+                queue_id = match.get("info", {}).get("queueId") if match else None
+                if queue_id not in (420, 440):
+                    continue
+                is_flex_match = queue_id == 440
+                is_early_surrender = False
+                if match and match.get("info"):
+                    participants = match["info"].get("participants", [])
+                    is_early_surrender = any(p.get("gameEndedInEarlySurrender") for p in participants)
+
+                if is_flex_match:
+                    old_tier, old_rank, old_lp = flex_tier, flex_rank, flex_lp
+                else:
+                    old_tier, old_rank, old_lp = solo_tier, solo_rank, solo_lp
+
+                key = (puuid, new_match_id)
+                metrics.record_cache("match_lp_change", key in recent_match_lp_changes)
+                if key in recent_match_lp_changes:
+                    lp_change = recent_match_lp_changes[key][0]
+                    tier_str = old_tier
+                    rank_str = old_rank
+                    new_lp = old_lp + lp_change
+                else:
+                    queue_str = "RANKED_FLEX_SR" if is_flex_match else "RANKED_SOLO_5x5"
+                    new_details = await asyncio.to_thread(
+                        get_summoner_rank_details_by_puuid, puuid, queue_str, region
+                    )
+                    if not new_details:
+                        tier_str = old_tier
+                        rank_str = old_rank
+                        new_lp = old_lp
+                    else:
+                        try:
+
+                            # API returns tier (e.g. GOLD) and rank (e.g. II)
+                            # Convert so tier_str stores the division and
+                            # rank_str stores the rank category.
+                            rank_str = new_details["tier"]
+                            tier_str = new_details["rank"]
+
+                            new_lp = int(new_details["lp"])
+                        except Exception as e:
+                            logging.error(
+                                f"Error parsing new rank info: {e}"
+                            )
+                            tier_str = old_tier
+                            rank_str = old_rank
+                            new_lp = old_lp
+
+                    lp_change = calculate_lp_change(
+                        old_tier, old_rank, old_lp,
+                        new_tier=tier_str, new_rank=rank_str, new_lp=new_lp
+                    )
+                    recent_match_lp_changes[key] = (lp_change, now)
+
+                    if is_flex_match:
+                        update_player_global(
+                            puuid,
+                            flex_tier=tier_str,
+                            flex_rank=rank_str,
+                            flex_lp=new_lp,
+                            lp_change=lp_change
+                        )
+                    else:
+                        update_player_global(
+                            puuid,
+                            tier=tier_str,
+                            rank=rank_str,
+                            lp=new_lp,
+                            lp_change=lp_change
+                        )
+
+                match_summary = summarize_match(match, puuid)
+                if match_summary:
+                    match_summary["match_id"] = new_match_id
+                    match_summary["lp_change"] = lp_change
+                    insert_match_history(puuid, [match_summary])
+
+                update_player_guild(
+                    puuid,
+                    guild_id,
+                    last_match_id=new_match_id
+                )
+
+                player_key = (puuid, guild_id)
+                in_game_msg = players_in_game_messages.pop(player_key, None)
+                if in_game_msg:
+                    try:
+                        await in_game_msg.delete()
+                    except discord.DiscordException as e:
+                        logging.error(f"[check_for_game_completion] Failed to delete in-game message: {e}")
+
+                alert_channel = client.get_channel(int(alert_channel_id))
+                if alert_channel:
+                    await send_match_result_embed(
+                        alert_channel,
+                        username,
+                        result,
+                        kills,
+                        deaths,
+                        assists,
+                        champ_img,
+                        lp_change,
+                        damage,
+                        is_early_surrender
+                    )
+
+                if guild_row and guild_row[1]:
+                    leaderboard_refresher.mark_dirty(guild_id)
+
+                players_in_game.discard(player_key)
+                logging.info(
+                    f"[MATCH FINISHED] {username}: "
+                    f"Old LP: {old_lp} New LP: {new_lp} Difference: {lp_change}"
+                )
+                record_change("match_finished", {
+                    "guild_id": guild_id,
+                    "puuid": puuid,
+                    "username": username,
+                    "match_id": new_match_id,
+                    "queue": "flex" if is_flex_match else "solo",
+                    "result": result,
+                    "early_surrender": is_early_surrender,
+                    "champion": champion,
+                    "kills": kills,
+                    "deaths": deaths,
+                    "assists": assists,
+                    "rank": rank_str,
+                    "tier": tier_str,
+                    "lp": new_lp,
+                    "lp_change": lp_change,
+                })
+
+        except Exception as e:
+            logging.error(f"[check_for_game_completion] Unexpected error: {e}", exc_info=True)
+        metrics.loop_duration.observe(time.perf_counter() - started, loop="check_for_game_completion")
+
+        await asyncio.sleep(10)
+
+
+async def send_match_result_embed(channel, username, result, kills, deaths, assists,
+                                  champion_image, lp_change, damage, is_early_surrender: bool = False):
+    if is_early_surrender:
+        game_result = "Early Surrender"
+        color = discord.Color.orange()
+    else:
+        game_result = "Victory" if result == ':green_circle:' else "Defeat"
+        color = discord.Color.green() if result == ':green_circle:' else discord.Color.red()
+    lp_text = "LP Win" if lp_change > 0 else "LP Lost"
+    embed = discord.Embed(
+        title=f"{game_result} for {username}",
+        color=color
+    )
+    embed.add_field(name="K/D/A", value=f"{kills}/{deaths}/{assists}", inline=True)
+    embed.add_field(name="Damage", value=f"{damage}", inline=True)
+    embed.add_field(name=lp_text, value=f"{'+' if lp_change > 0 else ''}{lp_change} LP", inline=True)
+    embed.set_thumbnail(url=champion_image)
+    try:
+        with metrics.discord_send.time(kind="match_result"):
+            await channel.send(embed=embed)
+    except discord.DiscordException as e:
+        logging.error(f"[send_match_result_embed] Failed to send match result: {e}")
+
+
+###############################################################################
+# Réactions aux alertes
+###############################################################################
+
+async def handle_music_reaction(client: discord.Client, payload: discord.RawReactionActionEvent):
+    """Play a sound when a user reacts to a victory or defeat embed."""
+    emoji = str(payload.emoji)
+    if emoji not in MUSIC_REACTIONS:
+        return
+
+    guild = client.get_guild(payload.guild_id)
+    if not guild:
+        return
+
+    channel = guild.get_channel(payload.channel_id)
+    if not channel:
+        return
+    try:
+        message = await channel.fetch_message(payload.message_id)
+    except discord.DiscordException:
+        return
+
+    if message.author != client.user or not message.embeds:
+        return
+
+    title = message.embeds[0].title or ""
+    if not any(keyword in title for keyword in ("Victory", "Defeat", "is playing a game")):
+        return
+
+    member = guild.get_member(payload.user_id)
+    if member is None or member.bot or not member.voice or not member.voice.channel:
+        return
+
+    audio_path = MUSIC_REACTIONS[emoji]
+    if not audio_path.exists():
+        return
+
+    voice_client = guild.voice_client
+    voice_channel = member.voice.channel
+    if not voice_client:
+        try:
+            voice_client = await voice_channel.connect()
+        except discord.DiscordException:
+            return
+
+    try:
+        voice_client.play(discord.FFmpegPCMAudio(str(audio_path)))
+        while voice_client.is_playing():
+            await asyncio.sleep(1)
+    except discord.DiscordException:
+        pass
+    finally:
+        try:
+            await voice_client.disconnect()
+        except discord.DiscordException:
+            pass
+
+
+async def handle_spectate_reaction(client: discord.Client, payload: discord.RawReactionActionEvent):
+    """Send a spectate command when reacting with the projector emoji."""
+    if str(payload.emoji) != "📽️":
+        return
+
+    guild = client.get_guild(payload.guild_id)
+    if not guild:
+        return
+
+    channel = guild.get_channel(payload.channel_id)
+    if not channel:
+        return
+
+    try:
+        message = await channel.fetch_message(payload.message_id)
+    except discord.DiscordException:
+        return
+
+    if message.author != client.user or not message.embeds:
+        return
+
+    title = message.embeds[0].title or ""
+    if "is playing a game" not in title:
+        return
+
+    puuid = None
+    for (p, g), msg in players_in_game_messages.items():
+        if msg.id == message.id:
+            puuid = p
+            break
+    if not puuid:
+        return
+
+    player = get_player(puuid, payload.guild_id)
+    if not player:
+        return
+
+    region = player[4]
+
+    data = await async_fetch_json(
+        f"https://{region}.api.riotgames.com/lol/spectator/v5/active-games/by-summoner/{puuid}",
+        headers=riot_headers(),
+    )
+    if not data:
+        return
+
+    await channel.send("Spectate information available.")
@@ -0,0 +1,98 @@
+import bisect
+import threading
+
+
+class UsernameIndex:
+    """
+    Index en mémoire des usernames par guilde, utilisé par l'autocomplétion.
+
+    Chaque guilde est chargée une seule fois depuis la base puis tenue à jour
+    par les fonctions d'écriture (register, unregister, changement de pseudo).
+    La recherche se fait par préfixe sur un tableau trié (bisect), complétée
+    par une recherche de sous-chaîne si le préfixe ne suffit pas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # guild_id -> {puuid: username}
+        self._members: dict[int, dict[str, str]] = {}
+        # guild_id -> [(username.lower(), username, puuid)] trié
+        self._sorted: dict[int, list[tuple[str, str, str]]] = {}
+
+    def is_loaded(self, guild_id: int) -> bool:
+        with self._lock:
+            return guild_id in self._members
+
+    def load(self, guild_id: int, entries) -> None:
+        """Remplace le contenu d'une guilde par ``entries`` = [(puuid, username)]."""
+        members = {puuid: username for puuid, username in entries}
+        with self._lock:
+            self._members[guild_id] = members
+            self._sorted[guild_id] = sorted(
+                (username.lower(), username, puuid) for puuid, username in members.items()
+            )
+
+    def add(self, guild_id: int, puuid: str, username: str) -> None:
+        """Ajoute ou met à jour un joueur d'une guilde déjà chargée."""
+        with self._lock:
+            members = self._members.get(guild_id)
+            if members is None:
+                return
+            self._discard(guild_id, puuid)
+            members[puuid] = username
+            bisect.insort(self._sorted[guild_id], (username.lower(), username, puuid))
+
+    def remove(self, guild_id: int, puuid: str) -> None:
+        with self._lock:
+            if guild_id in self._members:
+                self._discard(guild_id, puuid)
+
+    def rename(self, puuid: str, username: str) -> None:
+        """Répercute un changement de pseudo dans toutes les guildes chargées."""
+        with self._lock:
+            guild_ids = [
+                guild_id for guild_id, members in self._members.items()
+                if members.get(puuid) not in (None, username)
+            ]
+        for guild_id in guild_ids:
+            self.add(guild_id, puuid, username)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._members.clear()
+            self._sorted.clear()
+
+    def search(self, guild_id: int, current: str, limit: int = 25) -> list[str]:
+        """
+        Renvoie jusqu'à ``limit`` usernames de la guilde : d'abord ceux qui
+        commencent par ``current``, puis ceux qui le contiennent.
+        """
+        needle = current.lower()
+        with self._lock:
+            entries = self._sorted.get(guild_id, [])
+            results = []
+            start = bisect.bisect_left(entries, (needle,))
+            for lower, username, _ in entries[start:]:
+                if not lower.startswith(needle) or len(results) >= limit:
+                    break
+                results.append(username)
+            if len(results) < limit and needle:
+                for lower, username, _ in entries:
+                    if needle in lower and not lower.startswith(needle):
+                        results.append(username)
+                        if len(results) >= limit:
+                            break
+        return results
+
+    def _discard(self, guild_id: int, puuid: str) -> None:
+        username = self._members[guild_id].pop(puuid, None)
+        if username is None:
+            return
+        entries = self._sorted[guild_id]
+        key = (username.lower(), username, puuid)
+        idx = bisect.bisect_left(entries, key)
+        if idx < len(entries) and entries[idx] == key:
+            del entries[idx]
+
+
+username_index = UsernameIndex()
@@ -0,0 +1,95 @@
+"""
+Préchauffage au démarrage, avant la connexion à la gateway (``setup_hook``) :
+les premières commandes après un redémarrage ne doivent pas tout charger à
+froid.
+
+- migrations puis tables chaudes : l'index des usernames de chaque guilde est
+  rempli en une seule lecture de la base ;
+- Data Dragon : la version et CHAMPION_MAPPING sont restaurés depuis le
+  dernier instantané enregistré (table bot_state), puis ``refresh_ddragon``
+  ne retélécharge champion.json que si la version a changé ;
+- emblèmes de rang lus une fois en mémoire.
+
+La montée en charge du polling spectateur est faite par
+``tracker.check_ingame`` (POLL_RAMP_SECONDS).
+"""
+import asyncio
+import json
+import logging
+import time
+
+import commands
+import riot_api
+from fonction_bdd import get_all_players, get_bot_state, set_bot_state
+from storage import get_storage
+from username_index import username_index
+
+DDRAGON_SNAPSHOT_KEY = "ddragon_snapshot"
+
+
+def load_hot_tables() -> int:
+    """Remplit l'index des usernames de toutes les guildes ; renvoie le nombre de guildes."""
+    guilds: dict[int, list[tuple[str, str]]] = {}
+    for puuid, username, guild_id, *_ in get_all_players():
+        guilds.setdefault(guild_id, []).append((puuid, username))
+    for guild_id, entries in guilds.items():
+        username_index.load(guild_id, entries)
+    return len(guilds)
+
+
+def save_ddragon_snapshot() -> None:
+    version, fetched_at = riot_api.DDRAGON_VERSION_CACHE
+    if not version or not riot_api.CHAMPION_MAPPING:
+        return
+    set_bot_state(DDRAGON_SNAPSHOT_KEY, json.dumps({
+        "version": version,
+        "fetched_at": fetched_at,
+        "champions": riot_api.CHAMPION_MAPPING,
+    }))
+
+
+def restore_ddragon_snapshot() -> str | None:
+    """Recharge l'instantané Data Dragon ; renvoie sa version, ou None s'il n'y en a pas."""
+    raw = get_bot_state(DDRAGON_SNAPSHOT_KEY)
+    if not raw:
+        return None
+    try:
+        snapshot = json.loads(raw)
+        champions = {int(key): name for key, name in snapshot["champions"].items()}
+        version, fetched_at = snapshot["version"], float(snapshot["fetched_at"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        logging.warning("[warmup] Invalid Data Dragon snapshot, ignoring it")
+        return None
+    riot_api.CHAMPION_MAPPING.clear()
+    riot_api.CHAMPION_MAPPING.update(champions)
+    riot_api.DDRAGON_VERSION_CACHE[:] = [version, fetched_at]
+    return version
+
+
+def refresh_ddragon() -> None:
+    """
+    Met à jour la version Data Dragon (réseau seulement si le cache a expiré)
+    et recharge champion.json si elle diffère de celle déjà chargée.
+    """
+    loaded = riot_api.DDRAGON_VERSION_CACHE[0] if riot_api.CHAMPION_MAPPING else None
+    if loaded and riot_api.get_ddragon_latest_version() == loaded:
+        save_ddragon_snapshot()
+        return
+    riot_api.init_champion_mapping()
+    if riot_api.CHAMPION_MAPPING:
+        save_ddragon_snapshot()
+    else:
+        # échec du téléchargement : on garde l'instantané plutôt qu'une table vide
+        restore_ddragon_snapshot()
+
+
+async def warm_up() -> None:
+    started = time.perf_counter()
+    await asyncio.to_thread(get_storage().initialize)
+    guilds = await asyncio.to_thread(load_hot_tables)
+    version = await asyncio.to_thread(restore_ddragon_snapshot)
+    emblems = await asyncio.to_thread(commands.preload_emblems)
+    logging.info(
+        f"[warmup] {guilds} guilds indexed, Data Dragon snapshot {version or 'missing'}, "
+        f"{emblems} emblems loaded in {time.perf_counter() - started:.2f}s"
+    )